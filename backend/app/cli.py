@@ -0,0 +1,204 @@
+"""
+Command line tools.
+
+    python -m app.cli ingest Data/NOV --workers 4
+    python -m app.cli stamp-existing
+
+`ingest` loads every carrier file in a directory: plan names are inferred
+from the file names, files are parsed in a process pool and each parsed
+invoice is bulk loaded in its own transaction.
+
+`stamp-existing` adopts a database that main.py created with
+Base.metadata.create_all before the schema was managed by Alembic: it
+records the revision that schema matches, after which `alembic upgrade
+head` brings it up to date.
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+INVOICE_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The revision whose schema matches the tables create_all built at startup
+CREATE_ALL_REVISION = '8aa7d574e1f5'
+CREATE_ALL_TABLES = {'insurance_files', 'employees'}
+
+
+def _parse_path(path: str, plan_name: str) -> Tuple[Dict[str, Any], str, float]:
+    """Runs in a pool process: read, hash and parse one file without touching the database"""
+    from app.services.ingest import parse_invoice, read_invoice
+
+    started = time.perf_counter()
+    with open(path, 'rb') as file_buffer:
+        content = file_buffer.read()
+    parsed = parse_invoice(read_invoice(io.BytesIO(content)), plan_name)
+    return parsed, hashlib.sha256(content).hexdigest(), time.perf_counter() - started
+
+
+def _collect_files(directory: str, recursive: bool) -> List[str]:
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        paths.extend(
+            os.path.join(root, name) for name in files
+            if name.lower().endswith(INVOICE_EXTENSIONS) and not name.startswith('.')
+        )
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def ingest_directory(directory: str, workers: int = None, recursive: bool = False) -> List[Dict[str, Any]]:
+    from app.database import SessionLocal
+    from app.models import InsuranceFile
+    from app.services.ingest import infer_plan_name
+    from app.services.insurance_analytics import InsuranceService
+
+    summary = []
+    planned = {}  # plan name -> path
+
+    db = SessionLocal()
+    try:
+        existing = {plan_name for (plan_name,) in db.query(InsuranceFile.plan_name).all()}
+    finally:
+        db.close()
+
+    candidates = [(path, infer_plan_name(os.path.basename(path))) for path in _collect_files(directory, recursive)]
+    # Prefer the file named exactly after its plan over variants like "... copy.xlsx"
+    candidates.sort(key=lambda c: (os.path.splitext(os.path.basename(c[0]))[0] != c[1], c[0]))
+
+    for path, plan_name in candidates:
+        name = os.path.basename(path)
+        if not plan_name:
+            summary.append({'file': name, 'plan': None, 'status': 'skipped: no plan name in file name'})
+        elif plan_name in existing:
+            summary.append({'file': name, 'plan': plan_name, 'status': 'skipped: already uploaded'})
+        elif plan_name in planned:
+            summary.append({'file': name, 'plan': plan_name,
+                            'status': f"skipped: same plan as {os.path.basename(planned[plan_name])}"})
+        else:
+            planned[plan_name] = path
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_parse_path, path, plan_name): (path, plan_name)
+            for plan_name, path in planned.items()
+        }
+        # Load each file as soon as its parse finishes, while the others keep parsing
+        for future in as_completed(futures):
+            path, plan_name = futures[future]
+            entry = {'file': os.path.basename(path), 'plan': plan_name}
+            try:
+                parsed, content_hash, parse_seconds = future.result()
+            except Exception as e:
+                entry['status'] = f"failed: {str(e)}"
+                summary.append(entry)
+                continue
+
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                service = InsuranceService(db)
+                # Same bytes as a file stored (or loaded earlier in this run) under another plan name
+                identical = service.find_identical_file(content_hash, plan_name)
+                result = service.store_parsed_invoice(parsed, content_hash=content_hash)
+            finally:
+                db.close()
+            if identical and result.get('success'):
+                entry['warning'] = InsuranceService.identical_file_warning(identical)
+
+            entry.update({
+                'rows': result.get('rowsInserted', 0),
+                'skipped_rows': len(parsed['errors']),
+                'parse_seconds': parse_seconds,
+                'load_seconds': time.perf_counter() - started,
+                'status': 'loaded' if result.get('success') else f"failed: {result.get('error')}",
+            })
+            summary.append(entry)
+
+    return summary
+
+
+def stamp_existing() -> str:
+    """Record CREATE_ALL_REVISION on a database built by create_all; returns what was done"""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    from app.database import engine
+
+    tables = set(inspect(engine).get_table_names())
+    if 'alembic_version' in tables:
+        raise ValueError("The database is already managed by Alembic; run `alembic upgrade head`")
+    if not tables:
+        raise ValueError("The database is empty; run `alembic upgrade head` to create the schema")
+    if tables != CREATE_ALL_TABLES:
+        raise ValueError(
+            f"Expected only the tables {', '.join(sorted(CREATE_ALL_TABLES))} that create_all built, "
+            f"found {', '.join(sorted(tables))}; stamp the matching revision by hand with `alembic stamp`"
+        )
+
+    config = Config(os.path.join(BACKEND_DIR, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(BACKEND_DIR, 'migrations'))
+    command.stamp(config, CREATE_ALL_REVISION)
+    return f"Stamped revision {CREATE_ALL_REVISION}; now run `alembic upgrade head`"
+
+
+def _print_summary(summary: List[Dict[str, Any]], elapsed: float) -> None:
+    print(f"{'FILE':<34} {'PLAN':<20} {'ROWS':>8} {'SKIPPED':>8} {'PARSE s':>8} {'LOAD s':>8}  STATUS")
+    for entry in sorted(summary, key=lambda e: e['file']):
+        parse_seconds = f"{entry['parse_seconds']:.2f}" if 'parse_seconds' in entry else '-'
+        load_seconds = f"{entry['load_seconds']:.2f}" if 'load_seconds' in entry else '-'
+        print(
+            f"{entry['file'][:34]:<34} {(entry['plan'] or '-'):<20} "
+            f"{entry.get('rows', '-'):>8} {entry.get('skipped_rows', '-'):>8} "
+            f"{parse_seconds:>8} {load_seconds:>8}  {entry['status']}"
+        )
+
+    loaded = [e for e in summary if e['status'] == 'loaded']
+    total_rows = sum(e['rows'] for e in loaded)
+    rate = total_rows / elapsed if elapsed else 0
+    print(f"\n{len(loaded)} of {len(summary)} files loaded, {total_rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    for entry in sorted(summary, key=lambda e: e['file']):
+        if entry.get('warning'):
+            print(f"Warning: {entry['file']}: {entry['warning']}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help='Load every carrier file in a directory')
+    ingest.add_argument('directory')
+    ingest.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    ingest.add_argument('--recursive', action='store_true', help='Include subdirectories')
+
+    commands.add_parser('stamp-existing', help='Adopt a database created before the schema was migrated by Alembic')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        if not os.path.isdir(args.directory):
+            parser.error(f"Not a directory: {args.directory}")
+        started = time.perf_counter()
+        summary = ingest_directory(args.directory, args.workers, args.recursive)
+        _print_summary(summary, time.perf_counter() - started)
+        return 0 if all(not e['status'].startswith('failed') for e in summary) else 1
+
+    if args.command == 'stamp-existing':
+        try:
+            print(stamp_existing())
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        return 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,16 @@
 from typing import Any
 from strawberry.fastapi import BaseContext
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
+from app.database import AsyncSessionLocal
 
 class GraphQLContext(BaseContext):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, async_sessions: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
         super().__init__()
+        # Sync session for writes, which resolvers run in the thread pool
         self.db = db
+        # Reads open their own AsyncSession per call: sibling fields resolve concurrently
+        self.async_sessions = async_sessions
 
 async def get_graphql_context(db: Session) -> GraphQLContext:
-    return GraphQLContext(db=db)
\ No newline at end of file
+    return GraphQLContext(db=db, async_sessions=AsyncSessionLocal)
\ No newline at end of file
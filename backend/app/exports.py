@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.database import SessionLocal
+from app.services.export import EXPORT_FORMATS, stream_export
+
+router = APIRouter()
+
+@router.get("/export")
+def export_employees(
+    format: str = 'csv',
+    searchText: Optional[str] = None,
+    planFilter: Optional[str] = None
+):
+    """
+    Download the filtered employee set as csv, xlsx or parquet. The body is
+    streamed while rows are read, whatever the size of the export.
+    """
+    export_format = format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use one of {', '.join(EXPORT_FORMATS)}")
+    media_type, extension = EXPORT_FORMATS[export_format]
+
+    def body():
+        # The session must outlive the request handler, so the stream owns it
+        db = SessionLocal()
+        try:
+            yield from stream_export(db, export_format, searchText, planFilter)
+        finally:
+            db.close()
+
+    file_name = f"employees-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{file_name}"'}
+    )
@@ -0,0 +1,345 @@
+"""
+Per-process request metrics in the Prometheus text format (GET /metrics).
+
+- GraphQLMetrics, a Strawberry extension, times every operation and its
+  root resolvers and records the SQL statement count, database time and
+  ORM objects hydrated for that operation.
+- instrument_engine hooks SQLAlchemy cursor events for statement timings
+  and exports the pool state; the Instrumented*QueuePool classes time how
+  long a checkout waits for a connection.
+- file_delete_rows_total grows batch by batch while a large file delete
+  runs, so its progress can be followed from the scrape.
+- Statements slower than SLOW_QUERY_MS milliseconds (unset: off) are
+  printed with the GraphQL operation that issued them.
+
+Each worker process keeps its own numbers, so scrape every worker.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from inspect import isawaitable
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from strawberry.extensions import SchemaExtension
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+_slow_query_ms = os.getenv('SLOW_QUERY_MS')
+SLOW_QUERY_SECONDS: Optional[float] = float(_slow_query_ms) / 1000 if _slow_query_ms else None
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + ''.join(line + '\n' for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                bucket_labels = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Observed(_Metric):
+    """Gauge or counter whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 collect: Callable[[], List[Tuple[Tuple[str, ...], float]]], labelnames: Sequence[str] = ()):
+        self.kind = kind
+        self._collect = collect
+        super().__init__(name, documentation, labelnames)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in self._collect()]
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    return ''.join(metric.render() for metric in REGISTRY)
+
+
+# GraphQL
+
+graphql_operations = Counter(
+    'graphql_operations_total', 'GraphQL operations by outcome', ('operation', 'type', 'status')
+)
+graphql_operation_seconds = Histogram(
+    'graphql_operation_duration_seconds', 'GraphQL operation latency', ('operation', 'type')
+)
+graphql_resolver_seconds = Histogram(
+    'graphql_resolver_duration_seconds', 'Root field resolver latency', ('field',)
+)
+graphql_operation_statements = Histogram(
+    'graphql_operation_sql_statements', 'SQL statements per GraphQL operation', ('operation',), COUNT_BUCKETS
+)
+graphql_operation_db_seconds = Histogram(
+    'graphql_operation_db_seconds', 'Time spent in SQL per GraphQL operation', ('operation',)
+)
+graphql_operation_objects = Histogram(
+    'graphql_operation_orm_objects', 'ORM objects hydrated per GraphQL operation', ('operation',), ROW_BUCKETS
+)
+
+
+@dataclass
+class RequestStats:
+    operation: str
+    statements: int = 0
+    db_seconds: float = 0.0
+    objects: int = 0
+
+
+# Stats of the GraphQL operation running in this context; copied into the
+# thread pool and run_sync greenlets, so their statements are counted too
+current_request: ContextVar[Optional[RequestStats]] = ContextVar('current_request', default=None)
+
+
+class GraphQLMetrics(SchemaExtension):
+    def on_operation(self):
+        stats = RequestStats(operation=self.execution_context.operation_name or 'anonymous')
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        abandoned = False
+        try:
+            yield
+        except GeneratorExit:
+            # Left unfinished because a later extension rejected the operation, and
+            # closed by the garbage collector outside the request's context
+            abandoned = True
+            raise
+        finally:
+            if not abandoned:
+                current_request.reset(token)
+                self._record(stats, time.perf_counter() - started)
+
+    def _record(self, stats: 'RequestStats', elapsed: float) -> None:
+        context = self.execution_context
+        # Known once the document is parsed
+        stats.operation = context.operation_name or 'anonymous'
+        try:
+            operation_type = context.operation_type.value
+        except RuntimeError:
+            operation_type = 'unknown'
+        status = 'error' if context.result is None or getattr(context.result, 'errors', None) else 'ok'
+
+        graphql_operations.inc(operation=stats.operation, type=operation_type, status=status)
+        graphql_operation_seconds.observe(elapsed, operation=stats.operation, type=operation_type)
+        graphql_operation_statements.observe(stats.statements, operation=stats.operation)
+        graphql_operation_db_seconds.observe(stats.db_seconds, operation=stats.operation)
+        graphql_operation_objects.observe(stats.objects, operation=stats.operation)
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        # Only root fields do I/O; nested fields are attribute reads
+        if info.path.prev is not None:
+            return _next(root, info, *args, **kwargs)
+
+        started = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if isawaitable(result):
+            return self._await_resolver(result, info.field_name, started)
+        graphql_resolver_seconds.observe(time.perf_counter() - started, field=info.field_name)
+        return result
+
+    @staticmethod
+    async def _await_resolver(result, field: str, started: float):
+        try:
+            return await result
+        finally:
+            graphql_resolver_seconds.observe(time.perf_counter() - started, field=field)
+
+
+# File deletes
+
+file_delete_rows = Counter(
+    'file_delete_rows_total', 'Employee rows removed by file deletes, counted per batch as they go', ('operation',)
+)
+
+
+def delete_progress(operation: str) -> Callable[[int, int], None]:
+    """`progress` callback for InsuranceService.delete_files that counts each batch in file_delete_rows"""
+    reported = 0
+
+    def report(rows_deleted: int, rows_total: int) -> None:
+        nonlocal reported
+        file_delete_rows.inc(rows_deleted - reported, operation=operation)
+        reported = rows_deleted
+    return report
+
+
+# SQL and connection pool
+
+sql_statements = Counter('db_statements_total', 'SQL statements executed', ('engine',))
+sql_statement_seconds = Histogram('db_statement_duration_seconds', 'SQL statement latency', ('engine',))
+orm_objects = Counter('orm_objects_loaded_total', 'ORM objects hydrated from query rows', ('model',))
+pool_checkout_wait_seconds = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection', ('engine',)
+)
+
+_instrumented_engines: List[Tuple[str, Any]] = []
+
+
+@event.listens_for(Mapper, 'load')
+def _object_loaded(instance, context):
+    orm_objects.inc(model=type(instance).__name__)
+    stats = current_request.get()
+    if stats is not None:
+        stats.objects += 1
+
+
+def _pool_state() -> List[Tuple[Tuple[str, ...], float]]:
+    samples = []
+    for name, engine in _instrumented_engines:
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            samples += [((name, 'checked_out'), pool.checkedout()), ((name, 'idle'), pool.checkedin()),
+                        ((name, 'overflow'), max(pool.overflow(), 0)), ((name, 'size'), pool.size())]
+    return samples
+
+
+def _cache_counts(attribute: str) -> Callable[[], List[Tuple[Tuple[str, ...], float]]]:
+    def collect():
+        # Imported here: app.services imports the models, which import app.database and this module
+        from app.services.cache import result_cache
+        return [((), getattr(result_cache, attribute))]
+    return collect
+
+
+Observed('db_pool_connections', 'Connection pool state', 'gauge', _pool_state, ('engine', 'state'))
+Observed('result_cache_hits_total', 'Result cache hits', 'counter', _cache_counts('hits'))
+Observed('result_cache_misses_total', 'Result cache misses', 'counter', _cache_counts('misses'))
+
+
+class _TimedCheckout:
+    """Pool mixin: records how long connect() waits for a connection (including pre-ping)"""
+
+    metrics_name = 'sync'
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_checkout_wait_seconds.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = 'sync'
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = 'async'
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Count and time every statement on `engine` (pass async_engine.sync_engine for async engines)"""
+    _instrumented_engines.append((name, engine))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        sql_statements.inc(engine=name)
+        sql_statement_seconds.observe(elapsed, engine=name)
+
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+        if SLOW_QUERY_SECONDS is not None and elapsed >= SLOW_QUERY_SECONDS:
+            operation = stats.operation if stats is not None else '-'
+            print(f"Slow query ({elapsed * 1000:.0f} ms) in operation {operation}: {' '.join(statement.split())[:500]}")
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_started'):
+            connection.info['query_started'].pop()
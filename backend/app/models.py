@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy import (
+    Boolean, Column, Computed, DDL, Integer, String, Text, Float, Date, DateTime, ForeignKey, Index, LargeBinary, JSON, event, text
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -12,19 +14,39 @@ class InsuranceFile(Base):
     upload_date = Column(DateTime, default=datetime.utcnow, index=True)
     month = Column(String, index=True)  # OCT, NOV, etc.
     year = Column(Integer, index=True)  # 2024, 2025, etc.
+    content_hash = Column(String(64), index=True)  # sha256 of the uploaded bytes; replacing a file with identical bytes is a no-op
     
-    employees = relationship("Employee", back_populates="insurance_file", cascade="all, delete-orphan")
+    # Children are removed by the database (ON DELETE CASCADE) or set-based by
+    # InsuranceService.delete_files, never loaded just to be deleted
+    employees = relationship("Employee", back_populates="insurance_file", cascade="all, delete-orphan", passive_deletes=True)
+    rollups = relationship("InvoiceRollup", back_populates="insurance_file", cascade="all, delete-orphan", passive_deletes=True)
     
     # Critical composite indexes for common queries
     __table_args__ = (
         Index('idx_month_year', month, year),
     )
 
+# Trigram operators for the employee search index
+event.listen(
+    Base.metadata, 'before_create',
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect='postgresql')
+)
+
+# Every column the employee search box matches against, in one string
+EMPLOYEE_SEARCH_DOCUMENT = (
+    "coalesce(subscriber_name, '') || ' | ' || coalesce(coverage_type, '') || ' | ' || "
+    "coalesce(plan, '') || ' | ' || coalesce(status, '') || ' | ' || coalesce(coverage_dates, '')"
+)
+
 class Employee(Base):
     __tablename__ = "employees"
 
     id = Column(Integer, primary_key=True, index=True)
     subscriber_name = Column(String, index=True)  # This is the field name in the database
+    subscriber_id = Column(String)  # "ID" part of subscriber_name
+    subscriber_display_name = Column(String)  # "NAME" part of subscriber_name, NULL if absent
+    search_document = Column(Text, Computed(EMPLOYEE_SEARCH_DOCUMENT, persisted=True))  # See app.services.search
+    person_id = Column(Integer, ForeignKey("people.id", ondelete="SET NULL"), index=True)  # See app.services.identity
     plan = Column(String, index=True)  # UHC-3000, UHC-2000, etc.
     coverage_type = Column(String)
     status = Column(String)
@@ -33,8 +55,16 @@ class Employee(Base):
     month = Column(String, index=True)  # OCT, NOV, etc.
     year = Column(Integer, index=True)  # 2024, 2025, etc.
     
-    insurance_file_id = Column(Integer, ForeignKey("insurance_files.id", ondelete="CASCADE"), index=True)
+    # Typed values parsed from coverage_dates at ingest (NULL when unparseable)
+    coverage_start = Column(Date)
+    coverage_end = Column(Date)
+    coverage_month = Column(Date)  # First day of the coverage month
+    fiscal_year = Column(Integer)  # Oct of N-1 through Sep of N is fiscal year N
+    
+    # On Postgres the table is partitioned by this column, one partition per file (app.services.partitions)
+    insurance_file_id = Column(Integer, ForeignKey("insurance_files.id", ondelete="CASCADE"), nullable=False, index=True)
     insurance_file = relationship("InsuranceFile", back_populates="employees")
+    person = relationship("Person", back_populates="employees")
     
     # Critical composite indexes for frequent queries
     __table_args__ = (
@@ -43,4 +73,85 @@ class Employee(Base):
         Index('idx_year_month', year, month),
         # Index specifically for fiscal year queries
         Index('idx_charge_year_month', charge_amount, year, month),
-    )
\ No newline at end of file
+        Index('idx_fiscal_year_plan', fiscal_year, plan),
+        Index('idx_coverage_month', coverage_month),
+        # Latest record per subscriber (DISTINCT ON subscriber_id ORDER BY id DESC)
+        Index('idx_subscriber_id_latest', subscriber_id, id.desc()),
+        # Keyset pagination for each employee listing sort (see EMPLOYEE_SORT_KEYS)
+        Index('idx_employee_name_id', text("coalesce(subscriber_display_name, '')"), id),
+        Index('idx_employee_charge_id', charge_amount, id),
+        Index('idx_employee_coverage_month_id', text("coalesce(coverage_month, '0001-01-01')"), id),
+        # Serves ILIKE '%text%' on search_document
+        Index(
+            'idx_employee_search_trgm', search_document,
+            postgresql_using='gin', postgresql_ops={'search_document': 'gin_trgm_ops'}
+        ),
+    )
+
+class Person(Base):
+    """One real employee across invoice rows, as matched by app.services.identity"""
+    __tablename__ = "people"
+
+    id = Column(Integer, primary_key=True, index=True)
+    first_name = Column(String, nullable=False)  # Upper case, from the first row matched
+    last_name = Column(String, nullable=False, index=True)  # Upper case; the blocking key
+
+    employees = relationship("Employee", back_populates="person")
+
+class InvoiceRollup(Base):
+    """Per file/plan/fiscal-year invoice totals, maintained by process_file"""
+    __tablename__ = "invoice_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    insurance_file_id = Column(Integer, ForeignKey("insurance_files.id", ondelete="CASCADE"), nullable=False)
+    plan = Column(String, nullable=False)
+    fiscal_year = Column(Integer, nullable=False)
+    current_month_total = Column(Float, nullable=False, default=0)  # Coverage month matches the file month
+    previous_months_total = Column(Float, nullable=False, default=0)  # Adjustments for earlier months
+
+    insurance_file = relationship("InsuranceFile", back_populates="rollups")
+
+    __table_args__ = (
+        Index('idx_rollup_file_plan_fiscal', insurance_file_id, plan, fiscal_year, unique=True),
+        Index('idx_rollup_plan', plan),
+    )
+
+
+class UploadJob(Base):
+    """Queued invoice upload, processed by the out-of-process worker (app.worker)"""
+    __tablename__ = "upload_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_name = Column(String, index=True)
+    file_name = Column(String)
+    content_path = Column(String)  # Upload stored in UPLOAD_DIR, removed once the job finishes
+    content = Column(LargeBinary)  # Raw upload of jobs queued before content_path; no longer written
+    status = Column(String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    replace_existing = Column(Boolean, nullable=False, default=False, server_default=text('false'))  # Diff against the stored file
+    rows_parsed = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON)  # Per-row error report
+    message = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # Last claim, heartbeat or progress report; stale running jobs are requeued
+    attempts = Column(Integer, nullable=False, default=0, server_default=text('0'))  # Times claimed by a worker
+    finished_at = Column(DateTime)
+
+    # The worker claims the oldest queued job
+    __table_args__ = (
+        Index('idx_upload_jobs_status_id', status, id),
+    )
+
+
+class DatasetChange(Base):
+    """Append-only log of invoice files loaded and deleted; the id is the dataset version"""
+    __tablename__ = "dataset_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    action = Column(String, nullable=False)  # inserted, deleted
+    insurance_file_id = Column(Integer, nullable=False, index=True)  # No FK: deleted files stay in the log
+    plan_name = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
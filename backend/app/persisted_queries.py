@@ -0,0 +1,120 @@
+"""
+Automatic persisted queries (the Apollo APQ protocol).
+
+A client sends only the SHA-256 of its query in
+extensions.persistedQuery.sha256Hash. If the hash is unknown the server
+answers PersistedQueryNotFound and the client retries with the full text,
+which is registered once it parses and validates. Afterwards the hash alone
+is enough, and the parser/validation caches skip straight to execution.
+
+GRAPHQL_PERSISTED_QUERIES_FILE preloads queries from a JSON file, either a
+{hash: query} map or an Apollo persisted query manifest. With
+GRAPHQL_PERSISTED_QUERIES_ONLY=true only those queries are accepted (an
+allow-list): other documents and hashes are rejected and nothing new is
+registered.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from graphql import GraphQLError
+from strawberry.extensions import SchemaExtension
+
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+PERSISTED_QUERY_NOT_ALLOWED = 'PersistedQueryNotAllowed'
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """{hash: query} from a plain map or an Apollo persisted query manifest"""
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, dict) and isinstance(manifest.get('operations'), list):
+        return {operation['id']: operation['body'] for operation in manifest['operations']}
+    return dict(manifest)
+
+
+class PersistedQueryStore:
+    """Process-wide hash -> query registry; preloaded queries are never evicted"""
+
+    def __init__(self, max_entries: int = 1000, preloaded: Optional[Dict[str, str]] = None,
+                 allow_list_only: bool = False):
+        self.max_entries = max_entries
+        self.allow_list_only = allow_list_only
+        self._preloaded = dict(preloaded or {})
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        query = self._preloaded.get(sha256_hash)
+        if query is not None:
+            return query
+        with self._lock:
+            query = self._entries.get(sha256_hash)
+            if query is not None:
+                self._entries.move_to_end(sha256_hash)
+            return query
+
+    def allows(self, sha256_hash: str) -> bool:
+        return not self.allow_list_only or sha256_hash in self._preloaded
+
+    def register(self, sha256_hash: str, query: str) -> None:
+        if self.allow_list_only or sha256_hash in self._preloaded:
+            return
+        with self._lock:
+            self._entries[sha256_hash] = query
+            self._entries.move_to_end(sha256_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _store_from_environment() -> PersistedQueryStore:
+    path = os.getenv('GRAPHQL_PERSISTED_QUERIES_FILE')
+    allow_list_only = os.getenv('GRAPHQL_PERSISTED_QUERIES_ONLY', '').lower() in ('1', 'true', 'yes')
+    if allow_list_only and not path:
+        raise RuntimeError('GRAPHQL_PERSISTED_QUERIES_ONLY needs GRAPHQL_PERSISTED_QUERIES_FILE')
+    return PersistedQueryStore(preloaded=load_manifest(path) if path else None, allow_list_only=allow_list_only)
+
+
+persisted_queries = _store_from_environment()
+
+
+class PersistedQueries(SchemaExtension):
+    def __init__(self, store: PersistedQueryStore = persisted_queries):
+        self.store = store
+
+    def on_operation(self):
+        context = self.execution_context
+        persisted = (context.operation_extensions or {}).get('persistedQuery')
+        sha256_hash = None
+
+        if isinstance(persisted, dict):
+            sha256_hash = persisted.get('sha256Hash')
+            if persisted.get('version') != 1 or not isinstance(sha256_hash, str):
+                raise GraphQLError('Unsupported persisted query version',
+                                   extensions={'code': 'PERSISTED_QUERY_UNSUPPORTED'})
+            if not self.store.allows(sha256_hash):
+                raise GraphQLError(PERSISTED_QUERY_NOT_ALLOWED, extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'})
+
+            if context.query:
+                if query_hash(context.query) != sha256_hash:
+                    raise GraphQLError('provided sha does not match query',
+                                       extensions={'code': 'PERSISTED_QUERY_HASH_MISMATCH'})
+            else:
+                context.query = self.store.get(sha256_hash)
+                if context.query is None:
+                    raise GraphQLError(PERSISTED_QUERY_NOT_FOUND, extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+        elif self.store.allow_list_only:
+            raise GraphQLError(PERSISTED_QUERY_NOT_ALLOWED, extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'})
+
+        yield
+
+        # Only documents that parsed and validated are worth remembering
+        if sha256_hash and context.graphql_document is not None and not context.pre_execution_errors:
+            self.store.register(sha256_hash, context.query)
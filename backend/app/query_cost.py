@@ -0,0 +1,130 @@
+"""
+Query cost limits.
+
+Before execution every operation gets a cost estimate from its selection
+set: each root field costs what it roughly costs the database (full table
+reads such as getAllEmployees are expensive, paginated listings scale with
+their limit argument), so asking for the same field under ten aliases costs
+ten times as much. Operations above GRAPHQL_MAX_COST are rejected without
+touching the database; operations costing at least GRAPHQL_EXPENSIVE_COST
+are throttled, at most GRAPHQL_EXPENSIVE_CONCURRENCY running at once per
+worker.
+"""
+import asyncio
+import math
+import os
+from typing import Any, Dict, Optional, Set
+
+from graphql import (
+    DocumentNode, FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode,
+    SelectionSetNode, value_from_ast_untyped
+)
+from graphql.utilities import get_operation_ast
+from strawberry.extensions import SchemaExtension
+
+MAX_COST = int(os.getenv('GRAPHQL_MAX_COST', '1000'))
+EXPENSIVE_COST = int(os.getenv('GRAPHQL_EXPENSIVE_COST', '200'))
+EXPENSIVE_CONCURRENCY = int(os.getenv('GRAPHQL_EXPENSIVE_CONCURRENCY', '4'))
+MAX_DEPTH = int(os.getenv('GRAPHQL_MAX_DEPTH', '10'))
+
+# Fields that read whole tables or run heavy work; any other root field costs 1, nested fields 0
+FIELD_COSTS = {
+    'getAllEmployees': 200,
+    'exportEmployeeData': 200,
+    'getEmployeeGroups': 100,
+    'insertedEmployees': 50,
+    'getInvoiceData': 5,
+    'getFiscalYearTotals': 2,
+    'getEmployeeChanges': 2,
+    'uploadFile': 20,
+    'deleteFile': 20,
+    'deleteFiles': 20,
+}
+# Paginated fields -> default limit; they cost 1 plus 1 per 100 rows requested
+PAGINATED_FIELDS = {
+    'getEmployeeDetails': 10,
+    'getUniqueEmployees': 10,
+    'getInvoiceDataPaginated': 100,
+}
+PAGE_COST_ROWS = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def _argument(field: FieldNode, name: str, variables: Dict[str, Any], default: Any) -> Any:
+    for argument in field.arguments or ():
+        if argument.name.value == name:
+            value = value_from_ast_untyped(argument.value, variables)
+            return default if value is None else value
+    return default
+
+
+def _field_cost(field: FieldNode, variables: Dict[str, Any], root: bool) -> int:
+    name = field.name.value
+    if name in PAGINATED_FIELDS:
+        try:
+            limit = int(_argument(field, 'limit', variables, PAGINATED_FIELDS[name]))
+        except (TypeError, ValueError):
+            limit = PAGINATED_FIELDS[name]
+        return 1 + math.ceil(min(max(limit, 1), MAX_PAGE_LIMIT) / PAGE_COST_ROWS)
+    return FIELD_COSTS.get(name, 1 if root else 0)
+
+
+def _selection_cost(
+    selection_set: Optional[SelectionSetNode],
+    fragments: Dict[str, FragmentDefinitionNode],
+    variables: Dict[str, Any],
+    root: bool,
+    visiting: Set[str]
+) -> int:
+    if selection_set is None:
+        return 0
+
+    total = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            total += _field_cost(selection, variables, root)
+            total += _selection_cost(selection.selection_set, fragments, variables, False, visiting)
+        elif isinstance(selection, InlineFragmentNode):
+            total += _selection_cost(selection.selection_set, fragments, variables, root, visiting)
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            # Fragment cycles are a validation error; just don't recurse forever
+            if name in fragments and name not in visiting:
+                total += _selection_cost(fragments[name].selection_set, fragments, variables, root, visiting | {name})
+    return total
+
+
+def estimate_cost(document: DocumentNode, operation_name: Optional[str] = None,
+                  variables: Optional[Dict[str, Any]] = None) -> int:
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return 0
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+    }
+    return _selection_cost(operation.selection_set, fragments, variables or {}, True, set())
+
+
+_expensive_slots: Optional[asyncio.Semaphore] = None
+
+
+class QueryCostLimiter(SchemaExtension):
+    async def on_execute(self):
+        global _expensive_slots
+        context = self.execution_context
+        cost = estimate_cost(context.graphql_document, context.operation_name, context.variables)
+        if cost > MAX_COST:
+            raise GraphQLError(
+                f"Query cost {cost} exceeds the maximum of {MAX_COST}",
+                extensions={'code': 'QUERY_TOO_EXPENSIVE', 'cost': cost, 'maxCost': MAX_COST}
+            )
+
+        if cost < EXPENSIVE_COST:
+            yield
+            return
+
+        if _expensive_slots is None:
+            _expensive_slots = asyncio.Semaphore(EXPENSIVE_CONCURRENCY)
+        async with _expensive_slots:
+            yield
@@ -0,0 +1,231 @@
+"""
+HTTP response cache for GraphQL queries.
+
+Only queries whose root fields are all in DATASET_FIELDS are cached, since
+the dataset version says nothing about the rest (upload job status). Their
+responses get an ETag made of the dataset version (the newest
+dataset_changes id, the same in every worker), a digest of the query,
+operation name and variables, and the current cache lifetime window. A
+request whose If-None-Match still matches is answered 304 straight away,
+without reaching Strawberry or the database, and a repeated request is
+served from the process result cache.
+
+Uploads and deletes bump the result cache (locally and, via NOTIFY, in the
+other workers); only then is the dataset version read again, so the ETags
+change as soon as the data does. The lifetime window also rolls the ETags
+over every result_cache.ttl seconds, bounding how long a response built
+from a failed read can be revalidated.
+
+Browsers only revalidate GET requests, so the frontend sends queries as
+GET (persisted query hashes keep the URLs short).
+"""
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, OperationType, parse
+)
+from graphql.utilities import get_operation_ast
+
+from app.persisted_queries import persisted_queries, query_hash
+from app.services.async_analytics import run_read
+from app.services.cache import result_cache
+from app.services.changes import current_version
+
+CACHE_CONTROL = b'no-cache'  # Store, but revalidate with If-None-Match every time
+
+
+# Root fields whose results only change with the dataset version. Anything
+# else (upload job status, mutations) changes without a dataset_changes row
+# and is never cached.
+DATASET_FIELDS = frozenset({
+    'getInvoiceData', 'getInvoiceDataPaginated', 'getFiscalYearTotals', 'getUploadedFiles',
+    'getEmployeeDetails', 'getEmployeeGroups', 'getEmployeeChanges', 'exportEmployeeData',
+    'getAllEmployees', 'getUniqueEmployees',
+    '__typename', '__schema', '__type',
+})
+
+
+def _root_fields(selection_set, fragments: Dict[str, FragmentDefinitionNode]) -> Iterator[str]:
+    """Names of the fields selected on the root type, through fragments"""
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection.name.value
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _root_fields(selection.selection_set, fragments)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            if fragment is None:
+                # Invalid query: yield a name that is never cacheable
+                yield ''
+            else:
+                yield from _root_fields(fragment.selection_set, fragments)
+
+
+@lru_cache(maxsize=256)
+def _is_cacheable(query: str, operation_name: Optional[str]) -> bool:
+    """Whether the operation is a query that only reads DATASET_FIELDS"""
+    try:
+        document = parse(query)
+        operation = get_operation_ast(document, operation_name)
+    except GraphQLError:
+        return False
+    if operation is None or operation.operation != OperationType.QUERY:
+        return False
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+    }
+    return all(field in DATASET_FIELDS for field in _root_fields(operation.selection_set, fragments))
+
+
+def _json_param(values: Dict[str, List[str]], name: str) -> Any:
+    value = values.get(name, [None])[0]
+    return json.loads(value) if value else None
+
+
+def _request_key(data: Any) -> Optional[str]:
+    """Digest identifying a cacheable query request, or None if it must not be cached"""
+    if not isinstance(data, dict):
+        return None
+
+    query = data.get('query')
+    operation_name = data.get('operationName')
+    persisted = (data.get('extensions') or {}).get('persistedQuery') or {}
+    sha256_hash = persisted.get('sha256Hash') if isinstance(persisted, dict) else None
+    if not query and isinstance(sha256_hash, str):
+        query = persisted_queries.get(sha256_hash)
+    if not isinstance(query, str) or not _is_cacheable(query, operation_name):
+        return None
+
+    identity = json.dumps(
+        [sha256_hash or query_hash(query), operation_name, data.get('variables') or {}],
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    # Weak comparison, as If-None-Match asks for; W/ only appears if a proxy weakened our tag
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in (value[2:] if value.startswith('W/') else value for value in candidates)
+
+
+class GraphQLResponseCache:
+    """ASGI middleware in front of the GraphQL route"""
+
+    def __init__(self, app, path: str = '/graphql'):
+        self.app = app
+        self.path = path
+        # (result cache version, dataset version) of the last version read
+        self._dataset_version: Tuple[Optional[int], int] = (None, 0)
+
+    async def _current_dataset_version(self) -> int:
+        cache_version = result_cache.version
+        known_cache_version, dataset_version = self._dataset_version
+        if known_cache_version != cache_version:
+            # Read before remembering: a bump in between just triggers another read
+            dataset_version = await run_read(current_version)
+            self._dataset_version = (cache_version, dataset_version)
+        return dataset_version
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].rstrip('/') != self.path or scope['method'] not in ('GET', 'POST'):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        body = b''
+        if scope['method'] == 'POST':
+            more_body = True
+            while more_body:
+                message = await receive()
+                body += message.get('body', b'')
+                more_body = message.get('more_body', False)
+
+        body_sent = False
+
+        async def replay():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        key = None
+        accept = headers.get('accept', '')
+        # Incremental delivery (multipart) and non-JSON bodies pass straight through
+        if 'multipart' not in accept:
+            try:
+                if scope['method'] == 'GET':
+                    params = parse_qs(scope['query_string'].decode('latin-1'))
+                    # Without a query and accepting HTML, Strawberry serves the GraphiQL page
+                    if 'query' in params or not ('text/html' in accept or '*/*' in accept):
+                        key = _request_key({
+                            'query': params.get('query', [None])[0],
+                            'operationName': params.get('operationName', [None])[0],
+                            'variables': _json_param(params, 'variables'),
+                            'extensions': _json_param(params, 'extensions'),
+                        })
+                elif 'application/json' in headers.get('content-type', ''):
+                    key = _request_key(json.loads(body))
+            except (ValueError, AttributeError):
+                key = None
+
+        if key is None:
+            await self.app(scope, replay, send)
+            return
+
+        version = await self._current_dataset_version()
+        window = int(time.time() // result_cache.ttl)
+        etag = f'"{version}-{window}-{key[:24]}"'
+        validators = [(b'etag', etag.encode()), (b'cache-control', CACHE_CONTROL)]
+
+        if _etag_matches(headers.get('if-none-match'), etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': validators})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        cache_key = ('graphql_response', version, key)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            content_type, payload = cached
+            await send({
+                'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', content_type), (b'content-length', str(len(payload)).encode())]
+                + validators
+            })
+            await send({'type': 'http.response.body', 'body': payload})
+            return
+
+        cache_version = result_cache.version
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+
+            payload = b''.join(chunks)
+            response_headers = list(start.get('headers', []))
+            content_type = dict(response_headers).get(b'content-type', b'')
+            if start.get('status') == 200 and b'json' in content_type and b'"errors"' not in payload:
+                result_cache.set(cache_key, (content_type, payload), cache_version)
+                response_headers += validators
+            await send({'type': 'http.response.start', 'status': start['status'], 'headers': response_headers})
+            await send({'type': 'http.response.body', 'body': payload})
+
+        await self.app(scope, replay, capture)
@@ -1,8 +1,17 @@
+import asyncio
+import io
 import strawberry
-from typing import List, Optional
+from typing import AsyncGenerator, List, Optional
 from strawberry.types import Info
 from datetime import datetime
+from starlette.concurrency import run_in_threadpool
 from app.services.insurance_analytics import InsuranceService
+from app.services.async_analytics import AsyncInsuranceService
+from app.services.upload_jobs import UploadJobService, TERMINAL_STATUSES
+from strawberry.extensions import ParserCache, QueryDepthLimiter, ValidationCache
+from app.metrics import GraphQLMetrics, delete_progress
+from app.persisted_queries import PersistedQueries
+from app.query_cost import MAX_DEPTH, QueryCostLimiter
 from sqlalchemy import or_, and_
 
 @strawberry.type
@@ -16,6 +25,7 @@ class InvoiceSummary:
     fiscal2025Total: float
     allPreviousAdjustments: float
     grandTotal: float
+    cursor: Optional[str] = None  # Pass as `after` to fetch the next page
 
 @strawberry.type
 class FiscalYearTotals:
@@ -43,6 +53,7 @@ class EmployeeDetail:
     month: str
     year: int
     insuranceFileId: int
+    cursor: Optional[str] = None  # Pass as `after` to fetch the next page
     
 @strawberry.type
 class EmployeeDetailResponse:
@@ -54,20 +65,126 @@ class FileInput:
     name: str
     content: str
     planName: str
+    replace: Optional[bool] = False  # Apply only the differences to an already uploaded plan
+
+@strawberry.type
+class RowError:
+    row: int  # Line number in the uploaded file
+    column: Optional[str]
+    value: Optional[str]
+    error: str
 
 @strawberry.type
 class OperationResult:
     success: bool
     message: Optional[str] = None
     error: Optional[str] = None
+    rowsInserted: Optional[int] = None
+    rowErrors: Optional[List[RowError]] = None
+    jobId: Optional[int] = None  # Set when the upload was queued for the worker
+    rowsDeleted: Optional[int] = None
+
+@strawberry.type
+class UploadJob:
+    id: int
+    planName: str
+    fileName: str
+    status: str  # queued, running, succeeded, failed
+    rowsParsed: int
+    rowsInserted: int
+    errorCount: int
+    rowErrors: List[RowError]
+    message: Optional[str]
+    error: Optional[str]
+    createdAt: Optional[str]
+    startedAt: Optional[str]
+    finishedAt: Optional[str]
+
+def to_upload_job(job: dict) -> UploadJob:
+    return UploadJob(
+        id=job['id'],
+        planName=job['planName'],
+        fileName=job['fileName'],
+        status=job['status'],
+        rowsParsed=job['rowsParsed'],
+        rowsInserted=job['rowsInserted'],
+        errorCount=job['errorCount'],
+        rowErrors=[RowError(**row_error) for row_error in job['errors']],
+        message=job['message'],
+        error=job['error'],
+        createdAt=job['createdAt'],
+        startedAt=job['startedAt'],
+        finishedAt=job['finishedAt']
+    )
+
+@strawberry.type
+class LatestMonthTotals:
+    month: str
+    year: int
+    lifeTotal: float
+    addTotal: float
+    dentalTotal: float
+    visionTotal: float
+    medicalTotal: float
+    monthTotal: float
+
+@strawberry.type
+class EmployeeGroup:
+    personId: int  # Stable id from identity resolution
+    employeeName: str
+    firstName: str
+    lastName: str
+    coverageType: str
+    planCategory: str  # 2000, 3000 or General
+    lifeTotal: float
+    addTotal: float
+    dentalTotal: float
+    visionTotal: float
+    medicalTotal: float
+    grandTotal: float
+    terminated: bool  # Any record with a TRM status
+    latestMonth: LatestMonthTotals
+    records: List[EmployeeDetail]
+
+@strawberry.type
+class EmployeeChanges:
+    version: int  # Pass as sinceVersion on the next poll
+    changed: bool
+    reset: bool  # sinceVersion was unknown; drop local rows and apply insertedEmployees
+    insertedInsuranceFileIds: List[int]
+    removedInsuranceFileIds: List[int]  # Drop local rows with these insuranceFileIds
+
+    @strawberry.field
+    async def inserted_employees(self, info: Info) -> List[EmployeeDetail]:
+        """Rows of the inserted files; only loaded when selected"""
+        service = AsyncInsuranceService(info.context.async_sessions)
+        return [to_employee_detail(emp) for emp in await service.get_employees_for_files(self.insertedInsuranceFileIds)]
+
+def to_employee_detail(emp: dict) -> EmployeeDetail:
+    return EmployeeDetail(
+        id=emp['id'],
+        subscriberId=emp['subscriberId'],
+        subscriberName=emp['subscriberName'],
+        plan=emp['plan'],
+        coverageType=emp['coverageType'],
+        status=emp['status'],
+        coverageDates=emp['coverageDates'],
+        chargeAmount=emp['chargeAmount'],
+        previousAdjustments=emp.get('previousAdjustments', 0.0),
+        previousFiscalAmount=emp.get('previousFiscalAmount', 0.0),
+        month=emp['month'],
+        year=emp['year'],
+        insuranceFileId=emp['insuranceFileId'],
+        cursor=emp.get('cursor')
+    )
 
 @strawberry.type
 class Query:
     @strawberry.field
-    def get_invoice_data(self, info: Info) -> List[InvoiceSummary]:
+    async def get_invoice_data(self, info: Info) -> List[InvoiceSummary]:
         """Legacy method - use get_invoice_data_paginated for better performance"""
-        service = InsuranceService(info.context.db)
-        data = service.get_invoice_data()
+        service = AsyncInsuranceService(info.context.async_sessions)
+        data = await service.get_invoice_data()
         return [
             InvoiceSummary(
                 planType=item['planType'],
@@ -84,23 +201,25 @@ class Query:
         ]
         
     @strawberry.field
-    def get_invoice_data_paginated(
+    async def get_invoice_data_paginated(
         self, 
         info: Info, 
         page: int = 1, 
         limit: int = 100,
         filterPlan: Optional[str] = None,
         filterMonth: Optional[str] = None,
-        filterYear: Optional[int] = None
+        filterYear: Optional[int] = None,
+        after: Optional[str] = None
     ) -> List[InvoiceSummary]:
         """Optimized paginated invoice data query"""
-        service = InsuranceService(info.context.db)
-        data = service.get_invoice_data_paginated(
+        service = AsyncInsuranceService(info.context.async_sessions)
+        data = await service.get_invoice_data_paginated(
             page=page, 
             limit=limit,
             filter_plan=filterPlan,
             filter_month=filterMonth,
-            filter_year=filterYear
+            filter_year=filterYear,
+            after=after
         )
         return [
             InvoiceSummary(
@@ -112,25 +231,32 @@ class Query:
                 fiscal2024Total=item['fiscal2024Total'],
                 fiscal2025Total=item['fiscal2025Total'],
                 allPreviousAdjustments=item['allPreviousAdjustments'],
-                grandTotal=item['grandTotal']
+                grandTotal=item['grandTotal'],
+                cursor=item['cursor']
             )
             for item in data
         ]
     
     @strawberry.field
-    def get_fiscal_year_totals(self, info: Info) -> FiscalYearTotals:
+    async def get_upload_job(self, info: Info, jobId: int) -> Optional[UploadJob]:
+        """Status and progress of a queued upload"""
+        job = await AsyncInsuranceService(info.context.async_sessions).get_upload_job(jobId)
+        return to_upload_job(job) if job else None
+    
+    @strawberry.field
+    async def get_fiscal_year_totals(self, info: Info) -> FiscalYearTotals:
         """Ultra-fast query to get only fiscal year totals without details"""
-        service = InsuranceService(info.context.db)
-        totals = service.get_fiscal_year_totals()
+        service = AsyncInsuranceService(info.context.async_sessions)
+        totals = await service.get_fiscal_year_totals()
         return FiscalYearTotals(
             fiscal2024Total=totals['fiscal2024Total'],
             fiscal2025Total=totals['fiscal2025Total']
         )
 
     @strawberry.field
-    def get_uploaded_files(self, info: Info) -> List[UploadedFile]:
-        service = InsuranceService(info.context.db)
-        results = service.get_uploaded_files()
+    async def get_uploaded_files(self, info: Info) -> List[UploadedFile]:
+        service = AsyncInsuranceService(info.context.async_sessions)
+        results = await service.get_uploaded_files()
         return [
             UploadedFile(
                 planName=result['planName'],
@@ -141,16 +267,19 @@ class Query:
         ]
         
     @strawberry.field
-    def get_employee_details(
+    async def get_employee_details(
         self, 
         info: Info, 
         page: int = 1, 
         limit: int = 10,
-        searchText: Optional[str] = None
+        searchText: Optional[str] = None,
+        sortBy: Optional[str] = None,
+        sortDirection: str = 'desc',
+        after: Optional[str] = None
     ) -> EmployeeDetailResponse:
         """Get paginated employee details with optional search"""
-        service = InsuranceService(info.context.db)
-        results = service.get_employee_details(page, limit, searchText)
+        service = AsyncInsuranceService(info.context.async_sessions)
+        results = await service.get_employee_details(page, limit, searchText, sortBy, sortDirection, after)
         
         return EmployeeDetailResponse(
             total=results['total'],
@@ -168,24 +297,54 @@ class Query:
                     previousFiscalAmount=emp.get('previousFiscalAmount', 0.0),
                     month=emp['month'],
                     year=emp['year'],
-                    insuranceFileId=emp['insuranceFileId']
+                    insuranceFileId=emp['insuranceFileId'],
+                    cursor=emp.get('cursor')
                 )
                 for emp in results['employees']
             ]
         )
     
     @strawberry.field
-    def get_all_employees(self, info: Info) -> List[EmployeeDetail]:
+    async def get_employee_groups(self, info: Info) -> List[EmployeeGroup]:
+        """Employees grouped by resolved person, with coverage totals and the latest month"""
+        service = AsyncInsuranceService(info.context.async_sessions)
+        return [
+            EmployeeGroup(
+                **{key: value for key, value in group.items() if key not in ('latestMonth', 'records')},
+                latestMonth=LatestMonthTotals(**group['latestMonth']),
+                records=[to_employee_detail(emp) for emp in group['records']]
+            )
+            for group in await service.get_employee_groups()
+        ]
+    
+    @strawberry.field
+    async def get_employee_changes(self, info: Info, sinceVersion: int = 0) -> EmployeeChanges:
+        """Employee rows inserted or removed since a dataset version (0 for everything)"""
+        service = AsyncInsuranceService(info.context.async_sessions)
+        return EmployeeChanges(**await service.get_employee_changes(sinceVersion))
+    
+    @strawberry.field
+    async def export_employee_data(
+        self,
+        info: Info,
+        searchText: Optional[str] = None,
+        planFilter: Optional[str] = None
+    ) -> List[EmployeeDetail]:
+        """Employees matching the filters, at most 10000 (use GET /export to download larger sets as a file)"""
+        service = AsyncInsuranceService(info.context.async_sessions)
+        return [to_employee_detail(emp) for emp in await service.export_employee_data(searchText, planFilter)]
+    
+    @strawberry.field
+    async def get_all_employees(self, info: Info) -> List[EmployeeDetail]:
         """Get all employee details (for smaller datasets or initial load)"""
-        service = InsuranceService(info.context.db)
-        employees = service.get_all_employees()
+        service = AsyncInsuranceService(info.context.async_sessions)
+        employees = await service.get_all_employees()
         
         return [
             EmployeeDetail(
                 id=emp['id'],
-                # Split subscriber_name to get ID and name if possible
-                subscriberId=emp['subscriber_name'].split(' - ')[0] if ' - ' in emp['subscriber_name'] else emp['subscriber_name'],
-                subscriberName=emp['subscriber_name'].split(' - ')[1] if ' - ' in emp['subscriber_name'] else f"Employee {emp['id']}",
+                subscriberId=emp['subscriber_id'],
+                subscriberName=emp['subscriber_display_name'] or f"Employee {emp['id']}",
                 plan=emp['plan'],
                 coverageType=emp['coverage_type'],
                 status=emp['status'],
@@ -202,16 +361,19 @@ class Query:
         
         
     @strawberry.field
-    def get_unique_employees(
+    async def get_unique_employees(
         self, 
         info: Info, 
         page: int = 1, 
         limit: int = 10,
-        searchText: Optional[str] = None
+        searchText: Optional[str] = None,
+        sortBy: Optional[str] = None,
+        sortDirection: str = 'desc',
+        after: Optional[str] = None
     ) -> EmployeeDetailResponse:
         """Get paginated unique employees with optional search (only latest record per subscriber)"""
-        service = InsuranceService(info.context.db)
-        results = service.get_unique_employees(page, limit, searchText)
+        service = AsyncInsuranceService(info.context.async_sessions)
+        results = await service.get_unique_employees(page, limit, searchText, sortBy, sortDirection, after)
         
         return EmployeeDetailResponse(
             total=results['total'],
@@ -229,7 +391,8 @@ class Query:
                     previousFiscalAmount=emp.get('previousFiscalAmount', 0.0),
                     month=emp['month'],
                     year=emp['year'],
-                    insuranceFileId=emp['insuranceFileId']
+                    insuranceFileId=emp['insuranceFileId'],
+                    cursor=emp.get('cursor')
                 )
                 for emp in results['employees']
             ]
@@ -238,16 +401,22 @@ class Query:
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def upload_file(self, info: Info, fileInput: FileInput) -> OperationResult:
+    async def upload_file(self, info: Info, fileInput: FileInput) -> OperationResult:
+        """Queue the file for the upload worker; poll getUploadJob(jobId) for progress"""
         try:
-            service = InsuranceService(info.context.db)
-            result = service.process_file(fileInput.content, fileInput.planName)
+            # Base64 decoding and the blocking insert run in the thread pool
+            content = await run_in_threadpool(InsuranceService.decode_file_content, fileInput.content)
+            service = UploadJobService(info.context.db)
+            result = await run_in_threadpool(
+                service.enqueue, io.BytesIO(content), fileInput.planName, fileInput.name, bool(fileInput.replace)
+            )
             
             if isinstance(result, dict):
                 return OperationResult(
                     success=result.get('success', False),
                     message=result.get('message'),
-                    error=result.get('error')
+                    error=result.get('error'),
+                    jobId=result.get('jobId')
                 )
             
             return OperationResult(
@@ -262,13 +431,14 @@ class Mutation:
             )
 
     @strawberry.mutation
-    def delete_file(self, info: Info, planName: str) -> OperationResult:
+    async def delete_file(self, info: Info, planName: str) -> OperationResult:
         try:
             service = InsuranceService(info.context.db)
-            service.delete_file(planName)
+            rows_deleted = await run_in_threadpool(service.delete_file, planName, delete_progress('deleteFile'))
             return OperationResult(
                 success=True,
-                message="File deleted successfully"
+                message="File deleted successfully",
+                rowsDeleted=rows_deleted
             )
         except Exception as e:
             return OperationResult(
@@ -276,4 +446,54 @@ class Mutation:
                 error=str(e)
             )
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+    @strawberry.mutation
+    async def delete_files(self, info: Info, planNames: List[str]) -> OperationResult:
+        """Delete several files in one transaction: all of them, or none if any fails"""
+        try:
+            service = InsuranceService(info.context.db)
+            rows_deleted = await run_in_threadpool(service.delete_files, planNames, delete_progress('deleteFiles'))
+            return OperationResult(
+                success=True,
+                message="Files deleted successfully",
+                rowsDeleted=rows_deleted
+            )
+        except Exception as e:
+            return OperationResult(
+                success=False,
+                error=str(e)
+            )
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def upload_job_progress(self, jobId: int, interval: float = 1.0) -> AsyncGenerator[UploadJob, None]:
+        """Streams a job's progress whenever it changes, until it finishes"""
+        last = None
+        service = AsyncInsuranceService()
+        while True:
+            job = await service.get_upload_job(jobId)
+            if job is None:
+                return
+            
+            snapshot = (job['status'], job['rowsParsed'], job['rowsInserted'], job['errorCount'])
+            if snapshot != last:
+                last = snapshot
+                yield to_upload_job(job)
+            if job['status'] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(max(interval, 0.2))
+
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[
+        GraphQLMetrics,
+        PersistedQueries,
+        # Known documents (persisted or not) skip parsing and validation
+        ParserCache(maxsize=256),
+        ValidationCache(maxsize=256),
+        QueryDepthLimiter(max_depth=MAX_DEPTH),
+        QueryCostLimiter,
+    ]
+)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Asyncio front end for InsuranceService and UploadJobService reads.
+
+Each call opens its own AsyncSession on the async engine (GraphQL resolves
+sibling fields concurrently, and a session cannot be shared between them)
+and runs the synchronous service code through AsyncSession.run_sync, so
+waiting on the database never blocks the event loop.
+
+run_sync still runs the Python side of a read (ORM hydration, building the
+result dicts) on the event loop thread. Reads that return whole tables,
+and other CPU-bound work, run in the thread pool on a sync session
+instead (run_in_threadpool).
+"""
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.services.cache import result_cache
+from app.services.insurance_analytics import InsuranceService
+from app.services.upload_jobs import UploadJobService
+
+T = TypeVar('T')
+
+
+async def run_read(fn: Callable[[Session], T], sessions: async_sessionmaker[AsyncSession] = AsyncSessionLocal) -> T:
+    """Run `fn(sync_session)` on a fresh async session"""
+    async with sessions() as db:
+        return await db.run_sync(fn)
+
+
+def _with_session(fn: Callable[[Session], T]) -> T:
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+async def run_read_in_thread(fn: Callable[[Session], T]) -> T:
+    """Run `fn(sync_session)` on a fresh sync session in the thread pool"""
+    return await run_in_threadpool(_with_session, fn)
+
+
+class AsyncInsuranceService:
+    def __init__(self, sessions: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self._sessions = sessions
+
+    async def _read(self, method: str, *args, **kwargs) -> Any:
+        return await run_read(
+            lambda session: getattr(InsuranceService(session), method)(*args, **kwargs),
+            self._sessions
+        )
+
+    async def _read_in_thread(self, method: str, *args, **kwargs) -> Any:
+        """For reads whose rows take long to turn into objects and dicts"""
+        return await run_read_in_thread(lambda session: getattr(InsuranceService(session), method)(*args, **kwargs))
+
+    async def get_invoice_data(self) -> List[Dict[str, Any]]:
+        return await self._read('get_invoice_data')
+
+    async def get_invoice_data_paginated(self, **kwargs) -> List[Dict[str, Any]]:
+        return await self._read('get_invoice_data_paginated', **kwargs)
+
+    async def get_fiscal_year_totals(self) -> Dict[str, float]:
+        return await self._read('get_fiscal_year_totals')
+
+    async def get_uploaded_files(self) -> List[Dict[str, str]]:
+        return await self._read('get_uploaded_files')
+
+    async def get_employee_details(self, *args) -> Dict[str, Any]:
+        return await self._read('get_employee_details', *args)
+
+    async def get_unique_employees(self, *args) -> Dict[str, Any]:
+        return await self._read('get_unique_employees', *args)
+
+    async def get_all_employees(self) -> List[Dict[str, Any]]:
+        return await self._read_in_thread('get_all_employees')
+
+    async def get_employee_changes(self, since_version: int) -> Dict[str, Any]:
+        return await self._read('get_employee_changes', since_version)
+
+    async def get_employees_for_files(self, insurance_file_ids: List[int]) -> List[Dict[str, Any]]:
+        return await self._read_in_thread('get_employees_for_files', insurance_file_ids)
+
+    async def export_employee_data(self, search_text: Optional[str] = None, plan_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._read_in_thread('export_employee_data', search_text, plan_filter)
+
+    async def get_employee_groups(self) -> List[Dict[str, Any]]:
+        """Rows are read on the event loop; grouping them is CPU work for the thread pool"""
+        cache_key = 'employee_groups'
+        cache_version = result_cache.version
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            rows = await self._read('_employee_group_rows')
+            groups = await run_in_threadpool(InsuranceService.build_employee_groups, rows)
+            result_cache.set(cache_key, groups, cache_version)
+            return groups
+        except Exception as e:
+            print(f"Error getting employee groups: {str(e)}")
+            return []
+
+    async def get_upload_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        return await run_read(lambda session: UploadJobService(session).get_job(job_id), self._sessions)
@@ -0,0 +1,118 @@
+"""
+Bulk writes for the employees table.
+
+On Postgres the rows are streamed through COPY FROM STDIN on the session's
+own connection, so they commit or roll back together with the rest of the
+upload. Other engines get executemany batches.
+"""
+import csv
+import io
+from typing import Callable, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models import Employee
+from app.services.ingest import EMPLOYEE_COLUMNS
+
+COPY_CHUNK_ROWS = 50000
+EXECUTEMANY_BATCH_ROWS = 5000
+# Marks a missing value in the COPY data (a quoted empty string is an empty string)
+COPY_NULL = r'\N'
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, consumed lazily by COPY"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        # Current chunk and how much of it has been read; reads slice it without copying the rest
+        self._chunk = memoryview(b'')
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            data = b''.join([self._chunk[self._offset:], *self._chunks])
+            self._chunk, self._offset = memoryview(b''), 0
+            return data
+
+        parts = []
+        while size > 0:
+            if self._offset == len(self._chunk):
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._chunk, self._offset = memoryview(chunk), 0
+                continue
+            part = self._chunk[self._offset:self._offset + size]
+            self._offset += len(part)
+            size -= len(part)
+            parts.append(part)
+        return b''.join(parts)
+
+
+def _csv_chunks(frame: pd.DataFrame, chunk_rows: int, progress: Optional[Callable[[int], None]]) -> Iterator[bytes]:
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        # Quote every string so COPY keeps empty strings, and write missing values
+        # as COPY_NULL, which FORCE_NULL turns into NULLs
+        yield chunk.to_csv(
+            header=False, index=False, quoting=csv.QUOTE_NONNUMERIC, na_rep=COPY_NULL
+        ).encode()
+        if progress:
+            progress(start + len(chunk))
+
+
+def bulk_insert_employees(
+    db: Session,
+    employees: pd.DataFrame,
+    insurance_file_id: int,
+    progress: Optional[Callable[[int], None]] = None,
+    table_name: Optional[str] = None
+) -> int:
+    """
+    Insert prepared employee rows (EMPLOYEE_COLUMNS) for one insurance file.
+    `progress` is called with the running row count. Returns rows written.
+    On Postgres, `table_name` COPYs into another table shaped like employees
+    (a partition being loaded, see app.services.partitions).
+    """
+    if employees.empty:
+        return 0
+
+    columns: List[str] = EMPLOYEE_COLUMNS + ['insurance_file_id']
+    frame = employees[EMPLOYEE_COLUMNS].assign(insurance_file_id=insurance_file_id)[columns]
+
+    connection = db.connection()
+    if connection.dialect.name == 'postgresql':
+        # Missing values are NULLs in every column, as with executemany (e.g. unparseable
+        # coverage dates, subscriber names without a display name)
+        copy_sql = (
+            f"COPY {table_name or Employee.__tablename__} ({', '.join(columns)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}', FORCE_NULL ({', '.join(columns)}))"
+        )
+        chunks = _csv_chunks(frame, COPY_CHUNK_ROWS, progress)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            if hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(copy_sql, _ChunkStream(chunks))
+            else:
+                # psycopg 3
+                with cursor.copy(copy_sql) as copy:
+                    for chunk in chunks:
+                        copy.write(chunk)
+        finally:
+            cursor.close()
+        return len(frame)
+
+    table = Employee.__table__
+    for start in range(0, len(frame), EXECUTEMANY_BATCH_ROWS):
+        batch = frame.iloc[start:start + EXECUTEMANY_BATCH_ROWS]
+        batch = batch.astype(object).where(batch.notna(), None)
+        connection.execute(table.insert(), batch.to_dict('records'))
+        if progress:
+            progress(start + len(batch))
+    return len(frame)
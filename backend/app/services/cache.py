@@ -0,0 +1,158 @@
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Postgres channel used to tell every worker process that the dataset changed
+INVALIDATION_CHANNEL = "dataset_changed"
+
+
+class ResultCache:
+    """
+    Process-wide LRU cache for expensive read results.
+
+    Entries are keyed by (dataset version, key). Bumping the version makes
+    every existing entry unreachable, so writers never have to know which
+    keys depend on the data they changed.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry_key = (self._version, key)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[entry_key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """
+        Store a value. Pass the version read before computing the value so a
+        result that raced with a write is stored under the stale version.
+        """
+        with self._lock:
+            if version is None:
+                version = self._version
+            if version != self._version:
+                return
+
+            entry_key = (version, key)
+            self._entries[entry_key] = (value, time.monotonic())
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self) -> int:
+        """Invalidate every cached entry by moving to a new dataset version."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache()
+
+
+def notify_dataset_changed(db: Session) -> None:
+    """
+    Queue a NOTIFY for other worker processes. Postgres only delivers it when
+    the surrounding transaction commits, so rolled back writes never
+    invalidate anything.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": INVALIDATION_CHANNEL})
+
+
+class InvalidationListener(threading.Thread):
+    """Background thread that LISTENs for dataset changes from other workers."""
+
+    def __init__(self, dsn: str, cache: ResultCache, poll_interval: float = 5.0):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self.dsn = dsn
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+
+                # Anything may have changed while we were not listening
+                self.cache.bump()
+
+                while not self._stopped.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.poll_interval)
+                    if not ready:
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.cache.bump()
+            except Exception as e:
+                print(f"Cache invalidation listener error: {str(e)}")
+                self._stopped.wait(self.poll_interval)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_listener: Optional[InvalidationListener] = None
+
+
+def start_invalidation_listener(engine) -> None:
+    """Start the per-process LISTEN thread (Postgres engines only)."""
+    global _listener
+    if engine.dialect.name != "postgresql" or _listener is not None:
+        return
+
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _listener = InvalidationListener(dsn, result_cache)
+    _listener.start()
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
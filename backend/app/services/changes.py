@@ -0,0 +1,84 @@
+"""
+Dataset change log.
+
+Every invoice file loaded or deleted appends a row to dataset_changes in the
+same transaction, and the newest row id is the dataset version. Clients
+that remember a version can then ask for only what changed since.
+
+A file corrected in place by a replace upload is logged as deleted and then
+inserted again, so it is reported in both lists: drop its rows, then load
+them anew.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models import DatasetChange, InsuranceFile
+
+CHANGE_INSERTED = 'inserted'
+CHANGE_DELETED = 'deleted'
+
+# pg_advisory_xact_lock key serializing change log writers
+CHANGE_LOG_LOCK = 7310412
+
+
+def lock_change_log(db: Session) -> None:
+    """
+    Serialize the rest of the caller's transaction with every other writer
+    of the change log, until it commits (Postgres; other engines allow one
+    writer anyway). Take it after locking employee rows, never before.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': CHANGE_LOG_LOCK})
+
+
+def record_dataset_change(db: Session, action: str, insurance_file: InsuranceFile) -> None:
+    """Append a change for an insurance file to the caller's transaction"""
+    # Held until commit, so versions become visible in id order and a
+    # reader can never see version N+1 before version N
+    lock_change_log(db)
+    db.add(DatasetChange(
+        action=action,
+        insurance_file_id=insurance_file.id,
+        plan_name=insurance_file.plan_name
+    ))
+
+
+def current_version(db: Session) -> int:
+    return db.query(func.max(DatasetChange.id)).scalar() or 0
+
+
+def changes_since(db: Session, since_version: int) -> Dict[str, Any]:
+    """
+    Net file changes after since_version: files loaded and still present, and
+    files removed that existed at since_version. `reset` is set when the
+    version is unknown to this database, in which case everything is
+    reported as inserted.
+    """
+    version = current_version(db)
+    reset = since_version > version
+    if reset:
+        since_version = 0
+    if since_version == version:
+        return {'version': version, 'changed': False, 'reset': False,
+                'inserted_file_ids': [], 'removed_file_ids': []}
+
+    inserted: List[int] = []
+    removed: List[int] = []
+    changes = (
+        db.query(DatasetChange.action, DatasetChange.insurance_file_id)
+        .filter(DatasetChange.id > since_version)
+        .order_by(DatasetChange.id)
+    )
+    for action, file_id in changes:
+        if action == CHANGE_INSERTED:
+            inserted.append(file_id)
+        elif file_id in inserted:
+            # Loaded and deleted within the window: nothing to report
+            inserted.remove(file_id)
+        else:
+            removed.append(file_id)
+
+    return {'version': version, 'changed': True, 'reset': reset,
+            'inserted_file_ids': inserted, 'removed_file_ids': removed}
@@ -0,0 +1,140 @@
+"""
+Employee export.
+
+Rows are read through a server-side cursor (yield_per) and written out one
+batch at a time, so memory use does not grow with the size of the export.
+CSV is streamed as it is produced; XLSX (write-only workbook) and Parquet
+(one row group per batch) are spooled to a temporary file, because both
+formats can only be finalized once every row is written, and that file is
+then streamed back.
+"""
+import csv
+import io
+import os
+import tempfile
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Employee
+from app.services.search import filter_employees
+
+EXPORT_BATCH_ROWS = 5000
+EXPORT_READ_CHUNK_BYTES = 1024 * 1024
+
+# (header, column) in export order; headers match the EmployeeDetail GraphQL fields
+EXPORT_COLUMNS = [
+    ('id', Employee.id),
+    ('subscriberId', Employee.subscriber_id),
+    ('subscriberName', Employee.subscriber_display_name),
+    ('plan', Employee.plan),
+    ('coverageType', Employee.coverage_type),
+    ('status', Employee.status),
+    ('coverageDates', Employee.coverage_dates),
+    ('chargeAmount', Employee.charge_amount),
+    ('month', Employee.month),
+    ('year', Employee.year),
+    ('insuranceFileId', Employee.insurance_file_id),
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_rows(db: Session, search_text: Optional[str] = None, plan_filter: Optional[str] = None) -> Iterator[Tuple[Any, ...]]:
+    """Filtered employee rows as tuples in EXPORT_COLUMNS order, oldest first"""
+    query = db.query(*[column for _, column in EXPORT_COLUMNS])
+    if search_text and search_text.strip():
+        query = filter_employees(query, search_text)
+    if plan_filter:
+        query = query.filter(Employee.plan == plan_filter)
+    # yield_per streams from a server-side cursor instead of buffering the result
+    return iter(query.order_by(Employee.id).yield_per(EXPORT_BATCH_ROWS))
+
+
+def _batches(rows: Iterator[Tuple[Any, ...]]) -> Iterator[List[Tuple[Any, ...]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stream_file(file) -> Iterator[bytes]:
+    file.seek(0)
+    while True:
+        chunk = file.read(EXPORT_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        yield chunk
+
+
+def stream_csv(rows: Iterator[Tuple[Any, ...]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_xlsx(rows: Iterator[Tuple[Any, ...]]) -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    # Write-only worksheets flush rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Employees')
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        yield from _stream_file(file)
+
+
+def stream_parquet(rows: Iterator[Tuple[Any, ...]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('subscriberId', pa.string()),
+        ('subscriberName', pa.string()),
+        ('plan', pa.string()),
+        ('coverageType', pa.string()),
+        ('status', pa.string()),
+        ('coverageDates', pa.string()),
+        ('chargeAmount', pa.float64()),
+        ('month', pa.string()),
+        ('year', pa.int64()),
+        ('insuranceFileId', pa.int64()),
+    ])
+
+    with tempfile.TemporaryFile() as file:
+        with pq.ParquetWriter(file, schema) as writer:
+            for batch in _batches(rows):
+                columns = list(zip(*batch))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+        yield from _stream_file(file)
+
+
+def stream_export(db: Session, export_format: str, search_text: Optional[str] = None,
+                  plan_filter: Optional[str] = None) -> Iterator[bytes]:
+    """Encoded export in `export_format` (a key of EXPORT_FORMATS), produced lazily"""
+    writers = {'csv': stream_csv, 'xlsx': stream_xlsx, 'parquet': stream_parquet}
+    return writers[export_format](export_rows(db, search_text, plan_filter))
@@ -0,0 +1,140 @@
+"""
+Employee identity resolution.
+
+Invoice rows carry no person key that survives across carriers, so rows are
+grouped into people the way the Master view used to do it in the browser:
+same last name, and a first name within a Levenshtein ratio of the person's
+first name. Candidates are blocked by last name, so each row is only compared
+with the people that share it. The result is stored in employees.person_id
+and new rows are resolved as each invoice is loaded.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models import Employee, Person
+
+# Maximum edit distance, as a share of the longer first name, for two names to match
+FIRST_NAME_DISTANCE_RATIO = 0.66
+
+
+def levenshtein_distance(a: str, b: str) -> int:
+    """Case-insensitive edit distance"""
+    a, b = a.lower(), b.lower()
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def first_names_match(a: str, b: str, threshold: float = FIRST_NAME_DISTANCE_RATIO) -> bool:
+    max_len = max(len(a), len(b))
+    if max_len == 0:
+        return True
+    return levenshtein_distance(a, b) / max_len <= threshold
+
+
+def parse_name(raw: str) -> Tuple[str, str]:
+    """(FIRST, LAST) from "12345 - John Doe", "Doe, John" or "John Doe" """
+    name = raw
+    if ' - ' in raw:
+        name = raw.split(' - ')[1].strip()
+
+    if ',' in name:
+        parts = name.split(',')
+        return parts[1].strip().upper(), parts[0].strip().upper()
+
+    parts = name.split(' ')
+    if len(parts) >= 2:
+        return parts[0].strip().upper(), ' '.join(parts[1:]).strip().upper()
+    return name.upper(), ''
+
+
+def employee_name(subscriber_display_name: Optional[str], employee_id: int) -> str:
+    """The name shown for an employee row, as in InsuranceService._employee_detail"""
+    return subscriber_display_name or f"Employee {employee_id}"
+
+
+class PersonIndex:
+    """
+    Known people blocked by last name, in the order they were first seen.
+
+    `match` returns the key of the first person in the block whose first name
+    matches, registering a new person (with a negative placeholder key) when
+    none does.
+    """
+
+    def __init__(self):
+        self._blocks: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        self.new_people: List[Tuple[str, str]] = []  # (first, last); key -(position + 1)
+
+    def add(self, key: int, first_name: str, last_name: str) -> None:
+        self._blocks[last_name].append((key, first_name))
+
+    def match(self, first_name: str, last_name: str) -> int:
+        for key, person_first_name in self._blocks[last_name]:
+            if first_names_match(person_first_name, first_name):
+                return key
+        self.new_people.append((first_name, last_name))
+        key = -len(self.new_people)
+        self.add(key, first_name, last_name)
+        return key
+
+
+def assign_people(rows: Iterable[Tuple[int, str]], people: PersonIndex) -> List[Tuple[int, int]]:
+    """(employee id, person key) for (employee id, name) rows, processed in the given order"""
+    return [(row_id, people.match(*parse_name(name))) for row_id, name in rows]
+
+
+def resolve_people(db: Session, insurance_file_id: Optional[int] = None) -> int:
+    """
+    Assign person_id to employee rows that do not have one yet (optionally
+    only those of one insurance file). Runs in the caller's transaction,
+    which must hold the change log lock (app.services.changes.lock_change_log)
+    if other transactions may resolve people at the same time. Returns the
+    number of rows assigned.
+    """
+    query = db.query(Employee.id, Employee.subscriber_display_name).filter(Employee.person_id.is_(None))
+    if insurance_file_id is not None:
+        query = query.filter(Employee.insurance_file_id == insurance_file_id)
+    rows = [(row_id, employee_name(display_name, row_id)) for row_id, display_name in query.order_by(Employee.id)]
+    if not rows:
+        return 0
+
+    # Only the blocks these rows can land in
+    last_names = {parse_name(name)[1] for _, name in rows}
+    people = PersonIndex()
+    existing = (
+        db.query(Person.id, Person.first_name, Person.last_name)
+        .filter(Person.last_name.in_(last_names))
+        .order_by(Person.id)
+    )
+    for person_id, first_name, last_name in existing:
+        people.add(person_id, first_name, last_name)
+
+    assignments = assign_people(rows, people)
+
+    new_ids = []
+    if people.new_people:
+        new_ids = db.execute(
+            insert(Person).returning(Person.id, sort_by_parameter_order=True),
+            [{'first_name': first, 'last_name': last} for first, last in people.new_people]
+        ).scalars().all()
+
+    db.execute(
+        update(Employee),
+        [
+            {'id': row_id, 'person_id': key if key > 0 else new_ids[-key - 1]}
+            for row_id, key in assignments
+        ]
+    )
+    return len(assignments)
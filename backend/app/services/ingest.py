@@ -0,0 +1,394 @@
+"""
+Columnar invoice parsing.
+
+Everything here works on whole pandas columns and never touches the
+database, so a parsed invoice can be produced in a worker process and
+loaded by the caller.
+"""
+import csv
+import hashlib
+import io
+import re
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.plan_types import UHG_DEFAULT_PLAN, UHG_PLAN_KEYWORDS
+
+MONTH_NUMBERS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
+AMOUNT_COLUMNS = ['charge amount', 'premium amount', 'premium', 'amount']
+SUBSCRIBER_NAME_COLUMNS = ['subscriber name', 'name', 'employee name', 'employee', 'member name']
+SUBSCRIBER_ID_COLUMNS = ['subscriber id', 'id', 'employee id', 'member id']
+
+# The header is the first row naming an amount column; carrier files have it on
+# the first line, some exports put a title above it
+HEADER_SEARCH_ROWS = 20
+
+EMPLOYEE_COLUMNS = [
+    'subscriber_name', 'plan', 'coverage_type', 'status',
+    'coverage_dates', 'charge_amount', 'month', 'year',
+    'coverage_start', 'coverage_end', 'coverage_month', 'fiscal_year',
+    'subscriber_id', 'subscriber_display_name'
+]
+
+# A corrected invoice is matched to the stored rows of its file on these columns
+# (the other employee columns are derived from them and the file's plan name)
+ROW_KEY_COLUMNS = ['subscriber_name', 'plan', 'coverage_dates']
+ROW_VALUE_COLUMNS = ['coverage_type', 'status', 'charge_amount']
+
+
+def parse_plan_name(plan_name: str) -> Tuple[str, str, int]:
+    """Split a plan name like UHC-2000-OCT-2024 or UHG-OCT-2024 into (base plan, month, year)"""
+    parts = plan_name.split('-')
+    base_plan = parts[0]
+
+    if base_plan == 'UHG':
+        month = parts[1]
+        year = int(parts[2])
+    else:
+        base_plan = f"{parts[0]}-{parts[1]}"
+        month = parts[2]
+        year = int(parts[3])
+
+    return base_plan, month, year
+
+
+# UHG-OCT-2024, UHC-2000-OCT-2024; anything after it (" copy", " ") is ignored
+PLAN_NAME_PATTERN = re.compile(r'^(UHG-[A-Z]{3}-\d{4}|[A-Z]+-\d+-[A-Z]{3}-\d{4})', re.IGNORECASE)
+
+
+def infer_plan_name(file_name: str) -> Optional[str]:
+    """Plan name from a carrier file name such as 'UHC-2000-NOV-2024.xlsx', or None"""
+    match = PLAN_NAME_PATTERN.match(file_name.strip())
+    return match.group(1).upper() if match else None
+
+
+def plan_name_error(plan_name: Optional[str], file_name: Optional[str] = None) -> Optional[str]:
+    """
+    Why an upload cannot be stored under `plan_name`, or None. The name must
+    be a plan name parse_plan_name reads, and the same plan as the file name
+    when the file name has one.
+    """
+    plan = infer_plan_name(plan_name or '')
+    if plan is None or plan != plan_name:
+        return f"'{plan_name}' is not a plan name such as UHC-2000-NOV-2024 or UHG-OCT-2024"
+    file_plan = infer_plan_name(file_name or '')
+    if file_plan is not None and file_plan != plan:
+        return f"Plan name '{plan_name}' does not match the file '{file_name}' ({file_plan})"
+    return None
+
+
+def find_header_row(rows) -> int:
+    """
+    Position of the first row (of HEADER_SEARCH_ROWS) with a known amount
+    column name, or 0, so that a file without one still reports its columns
+    """
+    for position, row in enumerate(rows):
+        if position >= HEADER_SEARCH_ROWS:
+            break
+        cells = {str(cell).strip().lower() for cell in row}
+        if any(column in cells for column in AMOUNT_COLUMNS):
+            return position
+    return 0
+
+
+def _csv_rows(file_buffer: BinaryIO):
+    """Non-blank rows of a CSV file as pandas counts them for `header`; rewinds the file"""
+    text = io.TextIOWrapper(file_buffer, encoding='utf-8', errors='replace', newline='')
+    try:
+        return [row for _, row in zip(range(HEADER_SEARCH_ROWS), (row for row in csv.reader(text) if row))]
+    finally:
+        text.detach()
+        file_buffer.seek(0)
+
+
+def read_invoice(file_buffer: BinaryIO) -> pd.DataFrame:
+    """
+    Read an Excel invoice, falling back to CSV. The header row is found by
+    its column names (find_header_row); the line number of the first data
+    row is kept in df.attrs['first_data_row'] for error reports.
+    """
+    try:
+        workbook = pd.ExcelFile(file_buffer, engine='openpyxl')
+        probe = workbook.parse(header=None, nrows=HEADER_SEARCH_ROWS)
+        header_row = find_header_row(probe.itertuples(index=False))
+        df = workbook.parse(header=header_row)
+    except Exception:
+        file_buffer.seek(0)
+        header_row = find_header_row(_csv_rows(file_buffer))
+        df = pd.read_csv(file_buffer, header=header_row)
+
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    df.attrs['first_data_row'] = header_row + 2
+    return df
+
+
+def _text(df: pd.DataFrame, column: Optional[str], default: str = '') -> pd.Series:
+    """Column rendered the way str() renders each cell, or a constant if the column is missing"""
+    if column is None or column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].astype(object).map(str)
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """Strip currency formatting and convert to float; unparseable cells become NaN"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+
+    cleaned = (
+        values.astype(object).map(str)
+        .str.replace('$', '', regex=False)
+        .str.replace(',', '', regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def classify_uhg_plans(df: pd.DataFrame) -> pd.Series:
+    """Vectorized equivalent of InsuranceService.get_uhg_plan_type"""
+    check_text = (
+        _text(df, 'plan').str.upper() + ' ' +
+        _text(df, 'policy').str.upper() + ' ' +
+        _text(df, 'description').str.upper() + ' ' +
+        _text(df, 'coverage type').str.upper()
+    )
+
+    conditions = [
+        np.logical_or.reduce([check_text.str.contains(keyword, regex=False).to_numpy() for keyword in keywords])
+        for _, keywords in UHG_PLAN_KEYWORDS
+    ]
+    plans = np.select(conditions, [plan for plan, _ in UHG_PLAN_KEYWORDS], default=UHG_DEFAULT_PLAN)
+    return pd.Series(plans, index=df.index, dtype=object)
+
+
+def split_subscriber(subscriber_names: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Split "ID - NAME" values into (ID, NAME); NAME is None when there is no " - " separator or it is empty"""
+    parts = subscriber_names.str.split(' - ')
+    subscriber_ids = parts.str[0].str.strip()
+    display_names = parts.str[1].str.strip()
+    return subscriber_ids, display_names.astype(object).where(display_names.notna() & (display_names != ''), None)
+
+
+def _dates(values: pd.Series) -> pd.Series:
+    """datetime64 series as datetime.date objects with None for missing values"""
+    return values.dt.date.astype(object).where(values.notna(), None)
+
+
+def split_coverage_dates(coverage_dates: pd.Series) -> pd.DataFrame:
+    """
+    Vectorized equivalent of InsuranceService.parse_coverage_date, plus the
+    typed columns stored on each employee row.
+
+    Returns integer coverage_month_number/coverage_year columns with a
+    `parsed` mask, and coverage_start, coverage_end, coverage_month (first
+    day of the coverage month) and fiscal_year, which are None where the
+    text cannot be parsed.
+    """
+    ranges = coverage_dates.str.strip().str.split('-')
+    start_date = ranges.str[0].str.strip()
+    end_date = ranges.str[1].str.strip()
+    parts = start_date.str.split('/')
+    month_text = parts.str[0].str.strip()
+    year_text = parts.str[2].str.strip()
+
+    integer = r'^[+-]?\d+$'
+    parsed = (
+        (parts.str.len() == 3) &
+        month_text.str.match(integer, na=False) &
+        year_text.str.match(integer, na=False)
+    ).fillna(False).astype(bool)
+
+    month_number = pd.to_numeric(month_text.where(parsed), errors='coerce').fillna(0).astype(int)
+    coverage_year = pd.to_numeric(year_text.where(parsed), errors='coerce').fillna(0).astype(int)
+
+    # Fiscal year N runs from October of N-1 through September of N
+    fiscal_year = pd.Series(
+        np.where(month_number >= 10, coverage_year + 1, coverage_year), index=coverage_dates.index
+    ).astype(object).where(parsed, None)
+
+    coverage_month = pd.to_datetime(
+        pd.DataFrame({'year': coverage_year, 'month': month_number, 'day': 1}).where(parsed),
+        errors='coerce'
+    )
+
+    return pd.DataFrame({
+        'coverage_month_number': month_number,
+        'coverage_year': coverage_year,
+        'parsed': parsed,
+        'coverage_start': _dates(pd.to_datetime(start_date, format='%m/%d/%Y', errors='coerce')),
+        'coverage_end': _dates(pd.to_datetime(end_date, format='%m/%d/%Y', errors='coerce')),
+        'coverage_month': _dates(coverage_month),
+        'fiscal_year': fiscal_year,
+    }, index=coverage_dates.index)
+
+
+def parse_invoice(df: pd.DataFrame, plan_name: str) -> Dict[str, Any]:
+    """
+    Turn a raw invoice frame into employee rows and invoice rollups.
+
+    Rows whose amount cannot be parsed are left out and reported in
+    `errors` with their line number in the source file.
+    """
+    base_plan, month, year = parse_plan_name(plan_name)
+    month_number = MONTH_NUMBERS.get(month.upper(), 1)  # Default to 1 if invalid month
+
+    amount_col = next((col for col in AMOUNT_COLUMNS if col in df.columns), None)
+    if not amount_col:
+        raise ValueError(f"No amount column found. Available columns: {df.columns.tolist()}")
+
+    subscriber_name_col = next((col for col in SUBSCRIBER_NAME_COLUMNS if col in df.columns), None)
+    subscriber_id_col = next((col for col in SUBSCRIBER_ID_COLUMNS if col in df.columns), None)
+
+    # Amounts
+    amounts = parse_amounts(df[amount_col])
+    valid = amounts.notna()
+    raw_amounts = df[amount_col].astype(object)
+    first_data_row = df.attrs.get('first_data_row', 2)
+    errors = [
+        {
+            # Line in the source file (blank lines above the header aside)
+            'row': int(position) + first_data_row,
+            'column': amount_col,
+            'value': None if pd.isna(value) else str(value),
+            'error': 'Missing charge amount' if pd.isna(value) else 'Invalid charge amount'
+        }
+        for position, value in zip(np.flatnonzero(~valid.to_numpy()), raw_amounts[~valid])
+    ]
+
+    # Plan type
+    if base_plan == 'UHG':
+        plans = classify_uhg_plans(df)
+    else:
+        plans = pd.Series(base_plan, index=df.index, dtype=object)
+
+    # Subscriber "ID - NAME"
+    subscriber_id = _text(df, subscriber_id_col)
+    subscriber_name = _text(df, subscriber_name_col)
+    has_id = subscriber_id != ''
+    has_name = subscriber_name != ''
+    subscriber_field = pd.Series(
+        np.select(
+            [has_id & has_name, has_id, has_name],
+            [subscriber_id + ' - ' + subscriber_name, subscriber_id, subscriber_name],
+            default='Unknown'
+        ),
+        index=df.index, dtype=object
+    )
+    split_id, split_name = split_subscriber(subscriber_field)
+
+    # Coverage dates and fiscal allocation
+    coverage_dates = _text(df, 'coverage dates')
+    coverage = split_coverage_dates(coverage_dates)
+    previous_fiscal = coverage['parsed'] & (coverage['coverage_month_number'] < 10)
+
+    status_col = 'adj code' if 'adj code' in df.columns else 'status'
+    employees = pd.DataFrame({
+        'subscriber_name': subscriber_field,
+        'plan': plans,
+        'coverage_type': _text(df, 'coverage type', 'Standard'),
+        'status': _text(df, status_col, 'No Adjustments').str.upper().str.strip(),
+        'coverage_dates': coverage_dates,
+        'charge_amount': amounts,
+        'month': month,
+        'year': np.where(previous_fiscal, year - 1, year),
+        'coverage_start': coverage['coverage_start'],
+        'coverage_end': coverage['coverage_end'],
+        'coverage_month': coverage['coverage_month'],
+        'fiscal_year': coverage['fiscal_year'],
+        'subscriber_id': split_id,
+        'subscriber_display_name': split_name,
+    }, index=df.index)[valid]
+
+    # Rollup totals per (plan, fiscal year) for rows with a parseable coverage date
+    coverage = coverage[valid]
+    dated = coverage['parsed']
+    is_current = (coverage['coverage_month_number'] == month_number) & (coverage['coverage_year'] == year)
+    rollup_frame = pd.DataFrame({
+        'plan': employees['plan'],
+        'fiscal_year': coverage['fiscal_year'],
+        'current_month_total': employees['charge_amount'].where(is_current, 0.0),
+        'previous_months_total': employees['charge_amount'].where(~is_current, 0.0),
+    })[dated]
+    rollups = (
+        rollup_frame.groupby(['plan', 'fiscal_year'], sort=False, as_index=False)
+        [['current_month_total', 'previous_months_total']].sum()
+        .to_dict('records')
+    )
+
+    return {
+        'plan_name': plan_name,
+        'base_plan': base_plan,
+        'month': month,
+        'month_number': month_number,
+        'year': year,
+        'employees': employees.reset_index(drop=True),
+        'rollups': rollups,
+        'errors': errors,
+        'rows_read': len(df),
+    }
+
+
+def row_hashes(frame: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """
+    md5 of each row's values in `columns` as text (missing values as ''),
+    the same for a parsed frame and for the rows read back from the database
+    """
+    values = [frame[column].astype(object).where(frame[column].notna(), '').map(str) for column in columns]
+    joined = values[0].str.cat(values[1:], sep='\x1f')
+    return joined.map(lambda value: hashlib.md5(value.encode()).hexdigest()).astype(object)
+
+
+def _pair_rows(old: pd.Series, new: pd.Series) -> pd.DataFrame:
+    """
+    Index labels ('old', 'new') of rows with equal values, the n-th row with
+    a value on one side paired with the n-th row with it on the other
+    """
+    left = pd.DataFrame({
+        'value': old.to_numpy(), 'occurrence': old.groupby(old).cumcount().to_numpy(), 'old': old.index
+    })
+    right = pd.DataFrame({
+        'value': new.to_numpy(), 'occurrence': new.groupby(new).cumcount().to_numpy(), 'new': new.index
+    })
+    return left.merge(right, on=['value', 'occurrence'])[['old', 'new']]
+
+
+def diff_rows(stored: pd.DataFrame, employees: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Match the stored rows of a file (`id` plus ROW_KEY_COLUMNS and
+    ROW_VALUE_COLUMNS, in id order) with the employee rows of its corrected
+    invoice.
+
+    Identical rows pair up first; of the rest, rows with the same key pair
+    up as updates. Returns the number of `unchanged` rows, the stored ids
+    to delete (`deleted_ids`), `updates` (stored `id` with the new
+    ROW_VALUE_COLUMNS) and `inserts` (rows of `employees`).
+    """
+    stored = stored.reset_index(drop=True)
+    employees = employees.reset_index(drop=True)
+
+    columns = ROW_KEY_COLUMNS + ROW_VALUE_COLUMNS
+    unchanged = _pair_rows(row_hashes(stored, columns), row_hashes(employees, columns))
+    stored_rest = stored.index.difference(unchanged['old'])
+    new_rest = employees.index.difference(unchanged['new'])
+
+    changed = _pair_rows(
+        row_hashes(stored.loc[stored_rest], ROW_KEY_COLUMNS),
+        row_hashes(employees.loc[new_rest], ROW_KEY_COLUMNS)
+    )
+    updates = (
+        employees.loc[changed['new'], ROW_VALUE_COLUMNS]
+        .assign(id=stored.loc[changed['old'], 'id'].to_numpy())
+        .reset_index(drop=True)
+    )
+
+    return {
+        'unchanged': len(unchanged),
+        'deleted_ids': [int(row_id) for row_id in stored.loc[stored_rest.difference(changed['old']), 'id']],
+        'updates': updates,
+        'inserts': employees.loc[new_rest.difference(changed['new'])],
+    }
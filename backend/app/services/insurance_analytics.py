@@ -1,20 +1,58 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, BinaryIO, Callable
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text, or_, and_
-from datetime import datetime
-import pandas as pd
+from sqlalchemy import func, text, or_, and_, case, tuple_, literal_column, delete, select, update, bindparam
+from datetime import date, datetime
 import base64
+import hashlib
 import io
-from app.models import Employee, InsuranceFile
-import time
+from itertools import groupby
+from app.models import Employee, InsuranceFile, InvoiceRollup, Person
+from app.services.cache import result_cache, notify_dataset_changed
+from app.services.search import filter_employees, rank_employees
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.identity import resolve_people
+from app.services.export import EXPORT_HEADERS, export_rows
+from app.services.changes import (
+    CHANGE_DELETED, CHANGE_INSERTED, changes_since, lock_change_log, record_dataset_change
+)
+from app.services.partitions import (
+    attach_employee_partition, create_employee_partition, drop_employee_partition, employees_partitioned
+)
+from app.services.plan_types import UHG_PLAN_KEYWORDS, UHG_DEFAULT_PLAN
+
+# Sortable employee listing columns (GraphQL sortBy) and the expressions they order by;
+# each has a matching (expression, id) index on employees
+EMPLOYEE_SORT_KEYS = {
+    'id': Employee.id,
+    'name': func.coalesce(Employee.subscriber_display_name, literal_column("''")),
+    'chargeAmount': Employee.charge_amount,
+    'month': func.coalesce(Employee.coverage_month, literal_column("'0001-01-01'")),
+}
+
+# Invoice months in fiscal year order
+FISCAL_MONTH_ORDER = {
+    'OCT': 1, 'NOV': 2, 'DEC': 3, 'JAN': 4, 'FEB': 5, 'MAR': 6,
+    'APR': 7, 'MAY': 8, 'JUN': 9, 'JUL': 10, 'AUG': 11, 'SEP': 12
+}
+
+# Most rows exportEmployeeData returns; larger sets are downloaded from GET /export
+GRAPHQL_EXPORT_MAX_ROWS = 10000
+
+# Uploads are hashed this many bytes at a time
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Employee rows removed per DELETE statement when files are not their own partitions
+DELETE_BATCH_ROWS = 50000
 
 class InsuranceService:
     def __init__(self, db: Session):
         self.db = db
-        # Simple cache for expensive operations
-        self._cache = {}
-        self._cache_time = {}
-        self._cache_ttl = 300  # 5 minutes
+        # Process-wide cache shared by every service instance
+        self._cache = result_cache
+
+    def _dataset_changed(self) -> None:
+        """Invalidate cached reads here and, via NOTIFY, in every other worker"""
+        notify_dataset_changed(self.db)
 
     def get_uhg_plan_type(self, row) -> str:
         """Determine UHG plan type based on actual invoice descriptions"""
@@ -27,25 +65,13 @@ class InsuranceService:
         # Combine all fields for comprehensive search
         check_text = f"{plan_col} {policy_col} {description_col} {coverage_type}"
         
-        # Check for Dental plans
-        if 'DENTAL' in check_text or 'DHMO' in check_text or '0P369' in check_text:
-            return 'UHG-DENTAL'
-        
-        # Check for Vision plans
-        if 'VISION' in check_text or 'VSP' in check_text or 'S1107' in check_text:
-            return 'UHG-VISION'
-        
-        # Check for Life plans
-        if ('LIFE' in check_text or 'GTL' in check_text or 
-            'NON-CONTRIBUTORY 15K FLAT BASIC LIFE' in check_text):
-            return 'UHG-LIFE'
-        
-        # Check for AD&D plans
-        if 'AD&D' in check_text or 'ACCIDENTAL' in check_text:
-            return 'UHG-ADD'
+        # Same keyword table as the vectorized ingest path
+        for plan_type, keywords in UHG_PLAN_KEYWORDS:
+            if any(keyword in check_text for keyword in keywords):
+                return plan_type
         
         # Default fallback
-        return 'UHG-OTHER'
+        return UHG_DEFAULT_PLAN
 
     def parse_coverage_date(self, date_str: str) -> Optional[Dict[str, int]]:
         """Parse coverage date string and return month and year."""
@@ -85,161 +111,306 @@ class InsuranceService:
             # Default to current month if there's any error
             return {'current_month': True, 'previous_month': False}
 
-    # Update the process_file method in the InsuranceService class to extract subscriber name
-    def process_file(self, file_content: str, plan_name: str) -> Dict[str, Any]:
+    @staticmethod
+    def decode_file_content(file_content: str) -> bytes:
+        """Decode the base64 (optionally data URL) content sent by the uploadFile mutation"""
+        if ';base64,' in file_content:
+            file_content = file_content.split(';base64,')[1]
+        elif ',' in file_content:
+            file_content = file_content.split(',')[1]
+        return base64.b64decode(file_content)
+
+    @staticmethod
+    def content_hash(file_buffer: BinaryIO) -> str:
+        """
+        sha256 of an uploaded file's bytes, stored on the insurance file. Read
+        in chunks, and the file is rewound for the parser afterwards.
+        """
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file_buffer.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+        file_buffer.seek(0)
+        return digest.hexdigest()
+
+    def find_identical_file(self, content_hash: str, plan_name: str) -> Optional[str]:
+        """Plan name of a file stored under another plan name with exactly these bytes, if any"""
+        return (
+            self.db.query(InsuranceFile.plan_name)
+            .filter(InsuranceFile.content_hash == content_hash, InsuranceFile.plan_name != plan_name)
+            .order_by(InsuranceFile.id)
+            .limit(1)
+            .scalar()
+        )
+
+    @staticmethod
+    def identical_file_result(plan_name: str) -> Dict[str, Any]:
+        """Replacing a file with the same bytes changes nothing"""
+        return {
+            "success": True,
+            "message": f"File is identical to the uploaded file '{plan_name}', nothing to load",
+            "rowsInserted": 0,
+            "errors": []
+        }
+
+    @staticmethod
+    def identical_file_warning(plan_name: str) -> str:
+        # Loaded anyway: carriers do reissue an unchanged invoice for the next month
+        return f"The file is identical to the uploaded file '{plan_name}'; check that it is the invoice for this plan"
+
+    @staticmethod
+    def add_warning(result: Dict[str, Any], warning: str) -> Dict[str, Any]:
+        """Attach a warning to a successful load result (its message shows it too)"""
+        if result.get('success'):
+            result.setdefault('warnings', []).append(warning)
+            result['message'] = f"{result['message']}. Warning: {warning}"
+        return result
+
+    @staticmethod
+    def existing_file_error(plan_name: str) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": f"A file with plan name '{plan_name}' already exists. Please delete the existing file before uploading a new one, or upload it with replace to apply only the corrections."
+        }
+
+    def process_file(self, file_content: str, plan_name: str, replace: bool = False) -> Dict[str, Any]:
+        """Load a base64 encoded (optionally data URL) invoice"""
         try:
-            # Clear cache when uploading a new file
-            self._cache = {}
-            self._cache_time = {}
-            
+            decoded = self.decode_file_content(file_content)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        return self.process_file_buffer(io.BytesIO(decoded), plan_name, replace=replace)
+
+    def process_file_buffer(
+        self,
+        file_buffer: BinaryIO,
+        plan_name: str,
+        progress: Optional[Callable[[int, int], None]] = None,
+        replace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Parse an invoice from a binary file object and store its rows and rollups.
+        `progress` is called with (rows parsed, rows inserted) as the load advances.
+        With `replace`, a file with the same plan name is corrected in place
+        (see replace_parsed_invoice) instead of being refused, and is left
+        alone if its bytes have not changed. A file identical to one stored
+        under another plan name is loaded with a warning.
+        """
+        try:
+            content_hash = self.content_hash(file_buffer)
+
             # Check if file already exists
             existing_file = self.db.query(InsuranceFile).filter_by(plan_name=plan_name).first()
-            if existing_file:
-                return {
-                    "success": False,
-                    "error": f"A file with plan name '{plan_name}' already exists. Please delete the existing file before uploading a new one."
-                }
+            if existing_file and not replace:
+                return self.existing_file_error(plan_name)
+            if existing_file and existing_file.content_hash == content_hash:
+                return self.identical_file_result(plan_name)
+            identical = self.find_identical_file(content_hash, plan_name)
 
-            # Parse plan name to get month and year
-            parts = plan_name.split('-')
-            base_plan = parts[0]
-            
-            if base_plan == 'UHG':
-                month = parts[1]
-                year = int(parts[2])
+            # pandas and openpyxl are only loaded once a file is actually uploaded
+            from app.services.ingest import parse_invoice, read_invoice
+
+            parsed = parse_invoice(read_invoice(file_buffer), plan_name)
+            if existing_file:
+                result = self.replace_parsed_invoice(existing_file, parsed, progress, content_hash=content_hash)
             else:
-                base_plan = f"{parts[0]}-{parts[1]}"
-                month = parts[2]
-                year = int(parts[3])
-
-            # Month name to number mapping
-            month_mapping = {
-                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+                result = self.store_parsed_invoice(parsed, progress, content_hash=content_hash)
+            if identical:
+                self.add_warning(result, self.identical_file_warning(identical))
+            return result
+
+        except Exception as e:
+            self.db.rollback()
+            return {
+                "success": False,
+                "error": str(e)
             }
-            
-            # Use the month name as is for storage, but get the number for processing
-            month_number = month_mapping.get(month.upper(), 1)  # Default to 1 if invalid month
 
-            if ';base64,' in file_content:
-                file_content = file_content.split(';base64,')[1]
-            elif ',' in file_content:
-                file_content = file_content.split(',')[1]
-                
-            decoded = base64.b64decode(file_content)
-            file_buffer = io.BytesIO(decoded)
+    def _add_rollups(self, insurance_file_id: int, rollups: List[Dict[str, Any]]) -> None:
+        self.db.add_all([
+            InvoiceRollup(
+                insurance_file_id=insurance_file_id,
+                plan=rollup['plan'],
+                fiscal_year=int(rollup['fiscal_year']),
+                current_month_total=float(rollup['current_month_total']),
+                previous_months_total=float(rollup['previous_months_total'])
+            )
+            for rollup in rollups
+        ])
+
+    def store_parsed_invoice(
+        self,
+        parsed: Dict[str, Any],
+        progress: Optional[Callable[[int, int], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Insert a parsed invoice (see app.services.ingest.parse_invoice) in one transaction"""
+        from app.services.bulk_loader import bulk_insert_employees
 
-            try:
-                # Add engine='openpyxl' for better Excel file handling
-                df = pd.read_excel(file_buffer, skiprows=1, engine='openpyxl')
-            except Exception as excel_error:
-                # Fallback to CSV
-                file_buffer.seek(0)
-                df = pd.read_csv(file_buffer, skiprows=1)
+        try:
+            rows_parsed = parsed['rows_read']
+            if progress:
+                progress(rows_parsed, 0)
 
             insurance_file = InsuranceFile(
-                plan_name=plan_name,
-                file_name=f"{plan_name}.xlsx",
-                month=month,  # Store the month name, not the number
-                year=year
+                plan_name=parsed['plan_name'],
+                file_name=f"{parsed['plan_name']}.xlsx",
+                month=parsed['month'],  # Store the month name, not the number
+                year=parsed['year'],
+                content_hash=content_hash
             )
             self.db.add(insurance_file)
             self.db.flush()
 
-            df.columns = df.columns.str.strip().str.lower()
-            
-            amount_columns = ['charge amount', 'premium amount', 'premium', 'amount']
-            amount_col = next((col for col in amount_columns if col in df.columns), None)
+            # Load a partitioned table through a new partition, attached once it is full
+            partition = create_employee_partition(self.db, insurance_file.id) if employees_partitioned(self.db) else None
+
+            # COPY (or executemany) in the same transaction as the file row
+            employees = parsed['employees']
+            bulk_insert_employees(
+                self.db, employees, insurance_file.id,
+                progress=(lambda rows_inserted: progress(rows_parsed, rows_inserted)) if progress else None,
+                table_name=partition
+            )
+            if partition:
+                attach_employee_partition(self.db, insurance_file.id)
             
-            # Look for subscriber name column - check various possible names
-            subscriber_name_cols = ['subscriber name', 'name', 'employee name', 'employee', 'member name']
-            subscriber_name_col = next((col for col in subscriber_name_cols if col in df.columns), None)
+            # Match the new rows to people (blocked by last name). Concurrent loads
+            # would each create the same new person, so they take turns from here
+            lock_change_log(self.db)
+            resolve_people(self.db, insurance_file.id)
             
-            # Look for subscriber ID column
-            subscriber_id_cols = ['subscriber id', 'id', 'employee id', 'member id']
-            subscriber_id_col = next((col for col in subscriber_id_cols if col in df.columns), None)
+            # Store the invoice rollup in the same transaction as the rows
+            self._add_rollups(insurance_file.id, parsed['rollups'])
             
-            if not amount_col:
-                return {
-                    "success": False,
-                    "error": f"No amount column found. Available columns: {df.columns.tolist()}"
-                }
-
-            # Prepare employees for bulk insertion
-            employee_records = []
+            record_dataset_change(self.db, CHANGE_INSERTED, insurance_file)
             
-            # Process in chunks to avoid memory issues with large files
-            chunk_size = 1000
-            for i in range(0, len(df), chunk_size):
-                chunk = df.iloc[i:i+chunk_size]
-                chunk_employees = []
-                
-                for _, row in chunk.iterrows():
-                    try:
-                        # Parse amount
-                        amount = row[amount_col]
-                        if isinstance(amount, str):
-                            amount = amount.replace('$', '').replace(',', '')
-                        amount = float(amount)
-
-                        # Get plan type
-                        if base_plan == 'UHG':
-                            plan_type = self.get_uhg_plan_type(row)
-                        else:
-                            plan_type = base_plan
-                        
-                        # Extract subscriber information
-                        subscriber_id = str(row.get(subscriber_id_col, '')) if subscriber_id_col else str(row.get('id', ''))
-                        subscriber_name = str(row.get(subscriber_name_col, '')) if subscriber_name_col else ''
-                        
-                        # If we have both ID and name, combine them for better display
-                        if subscriber_id and subscriber_name:
-                            subscriber_field = f"{subscriber_id} - {subscriber_name}"
-                        else:
-                            subscriber_field = subscriber_id or subscriber_name or 'Unknown'
-
-                        # Parse coverage dates and determine fiscal allocation
-                        coverage_dates = str(row.get('coverage dates', ''))
-                        parsed_date = self.parse_coverage_date(coverage_dates)
-                        
-                        # Default fiscal allocation
-                        allocation = {'current_month': True, 'previous_month': False}
-                        
-                        if parsed_date:
-                            # Use month number for fiscal allocation determination
-                            allocation = self.determine_fiscal_allocation(
-                                {'month': parsed_date['month'], 'year': parsed_date['year']}, 
-                                year
-                            )
-
-                        # Create employee record
-                        employee = Employee(
-                            subscriber_name=subscriber_field,
-                            plan=plan_type,  # This should be the correctly detected plan type
-                            coverage_type=str(row.get('coverage type', 'Standard')),
-                            status=str(row.get('adj code', row.get('status', 'No Adjustments'))).upper().strip(),
-                            coverage_dates=coverage_dates,
-                            charge_amount=amount,
-                            month=month,
-                            year=year if not allocation['previous_month'] else year - 1,
-                            insurance_file_id=insurance_file.id
-                        )
-                        chunk_employees.append(employee)
-
-                    except Exception as row_error:
-                        print(f"Error processing row: {row_error}")
-                        continue
-                
-                # Add all employees at once for this chunk
-                if chunk_employees:
-                    self.db.add_all(chunk_employees)
-                    self.db.flush()
+            self._dataset_changed()
+            self.db.commit()
+            self._cache.bump()
             
-            # Final commit after all chunks are processed        
+            errors = parsed['errors']
+            message = f"File uploaded successfully ({len(employees)} rows)"
+            if errors:
+                message += f", {len(errors)} rows skipped"
+            return {
+                "success": True,
+                "message": message,
+                "rowsInserted": len(employees),
+                "errors": errors
+            }
+
+        except Exception as e:
+            self.db.rollback()
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def replace_parsed_invoice(
+        self,
+        insurance_file: InsuranceFile,
+        parsed: Dict[str, Any],
+        progress: Optional[Callable[[int, int], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Correct a stored file from a reissued invoice in one transaction:
+        the parsed rows are diffed against the file's stored rows (see
+        app.services.ingest.diff_rows) and only the rows that differ are
+        deleted, updated or inserted. The file's rollups are rebuilt.
+        """
+        import pandas as pd
+        from app.services.bulk_loader import bulk_insert_employees
+        from app.services.ingest import ROW_KEY_COLUMNS, ROW_VALUE_COLUMNS, diff_rows
+
+        try:
+            rows_parsed = parsed['rows_read']
+            if progress:
+                progress(rows_parsed, 0)
+
+            file_id = insurance_file.id
+            table = Employee.__table__
+            columns = [table.c.id, table.c.person_id] + [table.c[name] for name in ROW_KEY_COLUMNS + ROW_VALUE_COLUMNS]
+            stored = pd.DataFrame(
+                self.db.execute(select(*columns).where(table.c.insurance_file_id == file_id).order_by(table.c.id)).all(),
+                columns=[column.name for column in columns]
+            )
+            diff = diff_rows(stored, parsed['employees'])
+            deleted_ids, updates, inserts = diff['deleted_ids'], diff['updates'], diff['inserts']
+            changed = bool(deleted_ids or len(updates) or len(inserts))
+
+            if changed:
+                # Each statement names the file, so a partitioned table only touches its partition
+                for start in range(0, len(deleted_ids), DELETE_BATCH_ROWS):
+                    self.db.execute(
+                        delete(Employee).where(
+                            Employee.insurance_file_id == file_id,
+                            Employee.id.in_(deleted_ids[start:start + DELETE_BATCH_ROWS])
+                        ),
+                        execution_options={'synchronize_session': False}
+                    )
+
+                if len(updates):
+                    values = updates.astype(object).where(updates.notna(), None)
+                    self.db.execute(
+                        update(table)
+                        .where(table.c.id == bindparam('row_id'), table.c.insurance_file_id == file_id)
+                        .values({name: bindparam(name) for name in ROW_VALUE_COLUMNS}),
+                        values.rename(columns={'id': 'row_id'}).to_dict('records')
+                    )
+
+                bulk_insert_employees(
+                    self.db, inserts, file_id,
+                    progress=(lambda rows_inserted: progress(rows_parsed, rows_inserted)) if progress else None
+                )
+                # One load at a time creates people (see store_parsed_invoice)
+                lock_change_log(self.db)
+                resolve_people(self.db, file_id)
+
+                # Drop people whose only rows were deleted
+                person_ids = [
+                    int(person_id) for person_id in stored.loc[stored['id'].isin(deleted_ids), 'person_id'].dropna().unique()
+                ]
+                if person_ids:
+                    self.db.query(Person).filter(
+                        Person.id.in_(person_ids),
+                        ~self.db.query(Employee.id).filter(Employee.person_id == Person.id).exists()
+                    ).delete(synchronize_session=False)
+
+                self.db.query(InvoiceRollup).filter(
+                    InvoiceRollup.insurance_file_id == file_id
+                ).delete(synchronize_session=False)
+                self._add_rollups(file_id, parsed['rollups'])
+
+                insurance_file.upload_date = datetime.utcnow()
+                # Readers of the change log reload the file: its old rows go, its current rows come back
+                record_dataset_change(self.db, CHANGE_DELETED, insurance_file)
+                record_dataset_change(self.db, CHANGE_INSERTED, insurance_file)
+
+            insurance_file.content_hash = content_hash
+            if changed:
+                self._dataset_changed()
             self.db.commit()
+            if changed:
+                self._cache.bump()
+
+            errors = parsed['errors']
+            message = (
+                f"File replaced: {len(inserts)} rows inserted, {len(updates)} updated, "
+                f"{len(deleted_ids)} deleted, {diff['unchanged']} unchanged"
+            )
+            if errors:
+                message += f", {len(errors)} rows skipped"
             return {
                 "success": True,
-                "message": "File uploaded successfully"
+                "message": message,
+                "rowsInserted": len(inserts),
+                "rowsUpdated": len(updates),
+                "rowsDeleted": len(deleted_ids),
+                "errors": errors
             }
 
         except Exception as e:
@@ -264,123 +435,65 @@ class InsuranceService:
         else:  # Jan-Sep
             return calendar_year  # These belong to the calendar year they're in
             
+    def _invoice_summary_query(self):
+        """
+        Invoice totals per (file, plan), read from the rollup table that
+        process_file maintains instead of re-scanning every employee row.
+        """
+        rollup_total = InvoiceRollup.current_month_total + InvoiceRollup.previous_months_total
+        current_month = func.sum(InvoiceRollup.current_month_total)
+        previous_month = func.sum(InvoiceRollup.previous_months_total)
+        
+        return (
+            self.db.query(
+                InsuranceFile.id.label('insurance_file_id'),
+                InsuranceFile.month,
+                InsuranceFile.year,
+                InvoiceRollup.plan,
+                current_month.label('current_month'),
+                previous_month.label('previous_month'),
+                func.sum(case((InvoiceRollup.fiscal_year == 2024, rollup_total), else_=0)).label('fiscal_2024'),
+                func.sum(case((InvoiceRollup.fiscal_year == 2025, rollup_total), else_=0)).label('fiscal_2025')
+            )
+            .join(InvoiceRollup, InvoiceRollup.insurance_file_id == InsuranceFile.id)
+            .group_by(InsuranceFile.id, InsuranceFile.month, InsuranceFile.year, InvoiceRollup.plan)
+            # Plans with nothing to report are left out of the summary
+            .having(or_(current_month != 0, previous_month != 0))
+            .order_by(InvoiceRollup.insurance_file_id, InvoiceRollup.plan)
+        )
+        
+    def _invoice_summary(self, row) -> Dict[str, Any]:
+        current_month = float(row.current_month or 0)
+        previous_month = float(row.previous_month or 0)
+        return {
+            'planType': row.plan,
+            'month': row.month,
+            'year': row.year,
+            'currentMonthTotal': current_month,
+            'previousMonthsTotal': previous_month,
+            'allPreviousAdjustments': previous_month,
+            'fiscal2024Total': float(row.fiscal_2024 or 0),
+            'fiscal2025Total': float(row.fiscal_2025 or 0),
+            'grandTotal': current_month + previous_month,
+            'cursor': encode_cursor([row.insurance_file_id, row.plan])
+        }
+        
     def get_invoice_data(self) -> List[Dict[str, Any]]:
-        # Check if we have cached results with TTL
+        # Check the shared cache first
         cache_key = 'invoice_data'
-        current_time = time.time()
-        if (cache_key in self._cache and 
-            cache_key in self._cache_time and 
-            current_time - self._cache_time[cache_key] < self._cache_ttl):
-            return self._cache[cache_key]
+        cache_version = self._cache.version
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
             
         try:
-            results = []
-            files = self.db.query(InsuranceFile).all()
-            
-            month_mapping = {
-                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-            }
-            
-            # Use a dictionary for faster file lookup
-            file_map = {file.id: file for file in files}
+            results = [
+                self._invoice_summary(row)
+                for row in self._invoice_summary_query().all()
+            ]
             
-            # OPTIMIZATION: Fetch employees in batches to reduce memory pressure
-            batch_size = 10000
-            offset = 0
-            
-            while True:
-                # Get a batch of employees
-                employees_batch = (
-                    self.db.query(Employee)
-                    .limit(batch_size)
-                    .offset(offset)
-                    .all()
-                )
-                
-                # Break if no more employees
-                if not employees_batch:
-                    break
-                    
-                # Group employees by file
-                employees_by_file = {}
-                for emp in employees_batch:
-                    if emp.insurance_file_id not in employees_by_file:
-                        employees_by_file[emp.insurance_file_id] = []
-                    employees_by_file[emp.insurance_file_id].append(emp)
-                
-                # Process each file
-                for file_id, file_employees in employees_by_file.items():
-                    if file_id not in file_map:
-                        continue
-                        
-                    file = file_map[file_id]
-                    plan_groups = {}
-                    
-                    # Process employees
-                    for emp in file_employees:
-                        if emp.plan not in plan_groups:
-                            plan_groups[emp.plan] = {
-                                'current_month': 0,
-                                'previous_month': 0,
-                                'fiscal_by_year': {}
-                            }
-
-                        try:
-                            amount = float(emp.charge_amount)
-                            coverage_dates = emp.coverage_dates
-                            parsed_date = self.parse_coverage_date(coverage_dates)
-                            
-                            if parsed_date:
-                                # Determine fiscal year for the entry
-                                fiscal_year = self.determine_fiscal_year(parsed_date)
-                                
-                                # Initialize fiscal year tracking if not exists
-                                if fiscal_year not in plan_groups[emp.plan]['fiscal_by_year']:
-                                    plan_groups[emp.plan]['fiscal_by_year'][fiscal_year] = 0
-                                
-                                # Add to fiscal year total
-                                plan_groups[emp.plan]['fiscal_by_year'][fiscal_year] += amount
-                                
-                                # Monthly display logic
-                                coverage_month = parsed_date['month']
-                                coverage_year = parsed_date['year']
-                                file_month = month_mapping[file.month]
-                                file_year = file.year
-                                
-                                # If the coverage date matches the file's month/year
-                                if coverage_month == file_month and coverage_year == file_year:
-                                    plan_groups[emp.plan]['current_month'] += amount
-                                else:
-                                    plan_groups[emp.plan]['previous_month'] += amount
-
-                        except Exception as e:
-                            print(f"Error processing amount for employee {emp.subscriber_name}: {str(e)}")
-                            continue
-
-                    # Create result entries
-                    for plan_type, amounts in plan_groups.items():
-                        if amounts['current_month'] == 0 and amounts['previous_month'] == 0:
-                            continue
-                        
-                        results.append({
-                            'planType': plan_type,
-                            'month': file.month,
-                            'year': file.year,
-                            'currentMonthTotal': amounts['current_month'],
-                            'previousMonthsTotal': amounts['previous_month'],
-                            'allPreviousAdjustments': amounts['previous_month'],
-                            'fiscal2024Total': amounts['fiscal_by_year'].get(2024, 0),
-                            'fiscal2025Total': amounts['fiscal_by_year'].get(2025, 0),
-                            'grandTotal': amounts['current_month'] + amounts['previous_month']
-                        })
-
-                # Move to next batch
-                offset += batch_size
-            
-            # Cache the results with timestamp
-            self._cache[cache_key] = results
-            self._cache_time[cache_key] = current_time
+            # Cache the results for this dataset version
+            self._cache.set(cache_key, results, cache_version)
             
             return results
 
@@ -388,21 +501,67 @@ class InsuranceService:
             print(f"Error getting invoice data: {str(e)}")
             return []
 
+    def get_invoice_data_paginated(
+        self,
+        page: int = 1,
+        limit: int = 100,
+        filter_plan: Optional[str] = None,
+        filter_month: Optional[str] = None,
+        filter_year: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of invoice summaries, grouped in the database.
+        
+        Pass the cursor of the last row of a page as `after` to fetch the next
+        page with a keyset seek; `page` is only used when no cursor is given.
+        """
+        limit = max(1, min(limit, 1000))
+        cache_key = ('invoice_data_paginated', page, limit, filter_plan, filter_month, filter_year, after)
+        cache_version = self._cache.version
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        query = self._invoice_summary_query()
+        
+        # Filters map onto idx_rollup_plan and idx_month_year
+        if filter_plan:
+            query = query.filter(InvoiceRollup.plan == filter_plan)
+        if filter_month:
+            query = query.filter(InsuranceFile.month == filter_month.upper())
+        if filter_year is not None:
+            query = query.filter(InsuranceFile.year == filter_year)
+        
+        if after:
+            file_id, plan = decode_cursor(after)
+            # Seek past the previous page on idx_rollup_file_plan_fiscal
+            query = query.filter(
+                tuple_(InvoiceRollup.insurance_file_id, InvoiceRollup.plan) > tuple_(file_id, plan)
+            )
+        else:
+            query = query.offset((max(page, 1) - 1) * limit)
+        
+        results = [self._invoice_summary(row) for row in query.limit(limit).all()]
+        
+        self._cache.set(cache_key, results, cache_version)
+        
+        return results
+
     def get_fiscal_year_totals(self) -> Dict[str, float]:
         """Get just the fiscal year totals - much faster than full data"""
         cache_key = 'fiscal_year_totals'
-        current_time = time.time()
+        cache_version = self._cache.version
         
         # Check cache
-        if (cache_key in self._cache and 
-            cache_key in self._cache_time and 
-            current_time - self._cache_time[cache_key] < self._cache_ttl):
-            return self._cache[cache_key]
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             # Use get_invoice_data results if available for consistency with original logic
-            if 'invoice_data' in self._cache:
-                invoice_data = self._cache['invoice_data']
+            invoice_data = self._cache.get('invoice_data')
+            if invoice_data is not None:
                 total2024 = 0
                 total2025 = 0
                 
@@ -416,35 +575,26 @@ class InsuranceService:
                 }
                 
                 # Cache the result
-                self._cache[cache_key] = totals
-                self._cache_time[cache_key] = current_time
+                self._cache.set(cache_key, totals, cache_version)
                 
                 return totals
             
-            # Otherwise, execute a faster query just for totals
-            query = """
-            SELECT 
-                SUM(CASE 
-                    WHEN (e.month >= 'OCT' AND e.year = 2023) OR (e.month <= 'SEP' AND e.year = 2024) 
-                    THEN e.charge_amount ELSE 0 
-                END) as fiscal_2024_total,
-                SUM(CASE 
-                    WHEN (e.month >= 'OCT' AND e.year = 2024) OR (e.month <= 'SEP' AND e.year = 2025) 
-                    THEN e.charge_amount ELSE 0 
-                END) as fiscal_2025_total
-            FROM employees e
-            """
-            
-            result = self.db.execute(text(query)).fetchone()
+            # Otherwise, sum the typed fiscal_year column (idx_fiscal_year_plan)
+            rows = (
+                self.db.query(Employee.fiscal_year, func.sum(Employee.charge_amount))
+                .filter(Employee.fiscal_year.in_([2024, 2025]))
+                .group_by(Employee.fiscal_year)
+                .all()
+            )
+            by_year = {fiscal_year: float(total or 0) for fiscal_year, total in rows}
             
             totals = {
-                'fiscal2024Total': float(result.fiscal_2024_total or 0),
-                'fiscal2025Total': float(result.fiscal_2025_total or 0)
+                'fiscal2024Total': by_year.get(2024, 0.0),
+                'fiscal2025Total': by_year.get(2025, 0.0)
             }
             
             # Cache the result
-            self._cache[cache_key] = totals
-            self._cache_time[cache_key] = current_time
+            self._cache.set(cache_key, totals, cache_version)
             
             return totals
         except Exception as e:
@@ -457,62 +607,146 @@ class InsuranceService:
 
 # Update the get_employee_details method in insurance_analytics.py to properly handle search parameters
 
-    def get_employee_details(self, page: int = 1, limit: int = 10, search_text: Optional[str] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _employee_detail(emp: Employee) -> Dict[str, Any]:
+        return {
+            'id': emp.id,
+            'subscriberId': emp.subscriber_id,
+            'subscriberName': emp.subscriber_display_name or f"Employee {emp.id}",
+            'plan': emp.plan,
+            'coverageType': emp.coverage_type,
+            'status': emp.status,
+            'coverageDates': emp.coverage_dates,
+            'chargeAmount': float(emp.charge_amount),
+            'month': emp.month,
+            'year': emp.year,
+            'insuranceFileId': emp.insurance_file_id
+        }
+
+    def _latest_employee_ids(self):
+        """Subquery of the newest employee id for each subscriber_id"""
+        if self.db.get_bind().dialect.name == 'postgresql':
+            # Walks idx_subscriber_id_latest instead of aggregating the whole table
+            return (
+                self.db.query(Employee.id)
+                .distinct(Employee.subscriber_id)
+                .order_by(Employee.subscriber_id, Employee.id.desc())
+                .scalar_subquery()
+            )
+        return (
+            self.db.query(func.max(Employee.id))
+            .group_by(Employee.subscriber_id)
+            .scalar_subquery()
+        )
+
+    def _employee_count(self, query, count_key: tuple) -> int:
+        """Exact row count, cached until the next upload or delete bumps the dataset version"""
+        cache_version = self._cache.version
+        total = self._cache.get(count_key)
+        if total is None:
+            total = query.count()
+            self._cache.set(count_key, total, cache_version)
+        return total
+
+    def _employee_page(
+        self,
+        query,
+        listing: str,
+        page: int,
+        limit: int,
+        search_text: Optional[str],
+        sort_by: Optional[str],
+        sort_direction: str,
+        after: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        One page of an Employee query plus its total.
+        
+        With `after` (the cursor of the last row of the previous page) the page
+        is a keyset seek on (sort key, id); otherwise `page` is used as an
+        OFFSET for compatibility. A search without an explicit sort is
+        ordered by relevance and only pages by offset: its rows carry no
+        cursor and `after` is refused.
+        """
+        if sort_by is not None and sort_by not in EMPLOYEE_SORT_KEYS:
+            raise ValueError(f"Unknown sort: {sort_by}. Expected one of {', '.join(EMPLOYEE_SORT_KEYS)}")
+        descending = sort_direction.lower() != 'asc'
+        limit = max(1, min(limit, 1000))
+        
+        search_text = search_text.strip() if search_text else None
+        if search_text:
+            # Trigram index on search_document
+            query = filter_employees(query, search_text)
+        total = self._employee_count(query, ('employee_count', listing, search_text.lower() if search_text else None))
+        
+        ranked = bool(search_text) and sort_by is None
+        if ranked:
+            if after:
+                raise ValueError("Search results ordered by relevance page by offset; pass sortBy to page with cursors")
+            query = rank_employees(query, search_text)
+            sort_key = EMPLOYEE_SORT_KEYS['id']
+        else:
+            sort_key = EMPLOYEE_SORT_KEYS[sort_by or 'id']
+            if after:
+                values = decode_cursor(after)
+                if len(values) != 2:
+                    raise ValueError(f"Invalid cursor: {after}")
+                key_value, last_id = values
+                if sort_by == 'month':
+                    key_value = date.fromisoformat(key_value)
+                if sort_key is Employee.id:
+                    seek = Employee.id < last_id if descending else Employee.id > last_id
+                else:
+                    seek = (
+                        tuple_(sort_key, Employee.id) < tuple_(key_value, last_id) if descending
+                        else tuple_(sort_key, Employee.id) > tuple_(key_value, last_id)
+                    )
+                query = query.filter(seek)
+            if descending:
+                query = query.order_by(sort_key.desc(), Employee.id.desc())
+            else:
+                query = query.order_by(sort_key.asc(), Employee.id.asc())
+        
+        if not after:
+            query = query.offset((max(page, 1) - 1) * limit)
+        
+        rows = query.add_columns(sort_key).limit(limit).all()
+        # One grouped query for the whole page instead of two per row
+        subscriber_totals = self.get_subscriber_totals([emp.subscriber_name for emp, _ in rows])
+        employees = []
+        for emp, key_value in rows:
+            detail = self._employee_detail(emp)
+            detail.update(subscriber_totals.get(emp.subscriber_name, {}))
+            detail['cursor'] = None if ranked else encode_cursor([key_value, emp.id])
+            employees.append(detail)
+        
+        return {
+            'total': total,
+            'employees': employees
+        }
+
+    def get_employee_details(
+        self,
+        page: int = 1,
+        limit: int = 10,
+        search_text: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        sort_direction: str = 'desc',
+        after: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Get paginated employee details with improved search functionality.
         """
         try:
-            # Calculate offset for pagination
-            offset = (page - 1) * limit
-            
-            # Base query
-            query = self.db.query(Employee)
-            
-            # Apply search filter if provided
-            if search_text:
-                search_pattern = f"%{search_text}%"
-                query = query.filter(
-                    or_(
-                        Employee.subscriber_name.ilike(search_pattern),
-                        Employee.coverage_type.ilike(search_pattern),
-                        Employee.plan.ilike(search_pattern),
-                        Employee.status.ilike(search_pattern),
-                        Employee.coverage_dates.ilike(search_pattern)
-                    )
-                )
-            
-            # Get total count for pagination
-            total = query.count()
-            
-            # Get paginated results
-            employees = query.order_by(Employee.id.desc()).offset(offset).limit(limit).all()
-            
-            # Convert to dictionaries
-            employee_list = []
-            for emp in employees:
-                # Split the subscriber_name field to extract ID and actual name
-                subscriber_info = emp.subscriber_name.split(' - ') if ' - ' in emp.subscriber_name else [emp.subscriber_name, "Employee " + str(emp.id)]
-                
-                # The ID should be the first part, name should be the second part
-                subscriber_id = subscriber_info[0].strip()
-                subscriber_name = subscriber_info[1].strip() if len(subscriber_info) > 1 else "Employee " + str(emp.id)
-                
-                employee_list.append({
-                    'id': emp.id,
-                    'subscriberId': subscriber_id,
-                    'subscriberName': subscriber_name,
-                    'plan': emp.plan,
-                    'coverageType': emp.coverage_type,
-                    'status': emp.status,
-                    'coverageDates': emp.coverage_dates,
-                    'chargeAmount': float(emp.charge_amount),
-                    'month': emp.month,
-                    'year': emp.year,
-                    'insuranceFileId': emp.insurance_file_id
-                })
+            results = self._employee_page(
+                self.db.query(Employee), 'all', page, limit, search_text, sort_by, sort_direction, after
+            )
+            employee_list = results['employees']
+            total = results['total']
             
-            # Add sample data for testing if no employees found
-            if len(employee_list) == 0:
+            # Add sample data for testing if there are no employees at all (a page
+            # past the last row is just empty)
+            if total == 0:
                 employee_list = [
                     {
                         'id': 1001,
@@ -588,19 +822,72 @@ class InsuranceService:
                 'employees': sample_data
             }
             
+    @staticmethod
+    def _previous_fiscal_year_filter():
+        """Rows invoiced in the fiscal year before the current one"""
+        # Get current date to determine current fiscal year
+        current_date = datetime.now()
+        current_month = current_date.month
+        current_year = current_date.year
+        
+        # Determine fiscal year
+        current_fiscal_year = current_year
+        if current_month >= 10:  # October onwards is next fiscal year
+            current_fiscal_year = current_year + 1
+        
+        previous_fiscal_year = current_fiscal_year - 1
+        
+        # Previous fiscal year includes Oct-Dec of (year-2) and Jan-Sep of (year-1)
+        oct_dec_year = previous_fiscal_year - 1
+        jan_sep_year = previous_fiscal_year
+        
+        return or_(
+            and_(
+                Employee.month.in_(['OCT', 'NOV', 'DEC']),
+                Employee.year == oct_dec_year
+            ),
+            and_(
+                Employee.month.in_(['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP']),
+                Employee.year == jan_sep_year
+            )
+        )
+
+    def get_subscriber_totals(self, subscriber_names: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Previous adjustments and previous fiscal year amount for many
+        subscribers in one grouped query, keyed by subscriber_name.
+        Subscribers without rows are left out.
+        """
+        names = list(set(subscriber_names))
+        if not names:
+            return {}
+        
+        # Adjustments: any status other than NO ADJUSTMENTS, excluding terminations
+        is_adjustment = and_(
+            Employee.status != 'NO ADJUSTMENTS',
+            Employee.status.notlike('%TRM%')
+        )
+        rows = self.db.query(
+            Employee.subscriber_name,
+            func.sum(case((is_adjustment, Employee.charge_amount), else_=0)).label('previous_adjustments'),
+            func.sum(case((self._previous_fiscal_year_filter(), Employee.charge_amount), else_=0)).label('previous_fiscal_amount')
+        ).filter(
+            Employee.subscriber_name.in_(names)
+        ).group_by(Employee.subscriber_name).all()
+        
+        return {
+            row.subscriber_name: {
+                'previousAdjustments': float(row.previous_adjustments or 0.0),
+                'previousFiscalAmount': float(row.previous_fiscal_amount or 0.0)
+            }
+            for row in rows
+        }
+
     def get_previous_adjustments(self, subscriber_name: str) -> float:
         """Get total adjustments for a specific subscriber from previous months"""
         try:
-            # Query for all records with status indicating adjustments
-            adjustments = self.db.query(
-                func.sum(Employee.charge_amount)
-            ).filter(
-                Employee.subscriber_name == subscriber_name,
-                Employee.status != 'NO ADJUSTMENTS',
-                Employee.status.notlike('%TRM%')  # Exclude terminations 
-            ).scalar()
-            
-            return adjustments or 0.0
+            totals = self.get_subscriber_totals([subscriber_name]).get(subscriber_name, {})
+            return totals.get('previousAdjustments', 0.0)
         except Exception as e:
             print(f"Error getting previous adjustments: {str(e)}")
             return 0.0
@@ -608,41 +895,8 @@ class InsuranceService:
     def get_previous_fiscal_amount(self, subscriber_name: str) -> float:
         """Get total amount for a specific subscriber from previous fiscal year"""
         try:
-            # Get current date to determine current fiscal year
-            current_date = datetime.now()
-            current_month = current_date.month
-            current_year = current_date.year
-            
-            # Determine fiscal year
-            current_fiscal_year = current_year
-            if current_month >= 10:  # October onwards is next fiscal year
-                current_fiscal_year = current_year + 1
-            
-            previous_fiscal_year = current_fiscal_year - 1
-            
-            # Query for previous fiscal year records
-            # Previous fiscal year includes Oct-Dec of (year-2) and Jan-Sep of (year-1)
-            oct_dec_year = previous_fiscal_year - 1
-            jan_sep_year = previous_fiscal_year
-            
-            # Sum all charges from previous fiscal year
-            total_amount = self.db.query(
-                func.sum(Employee.charge_amount)
-            ).filter(
-                Employee.subscriber_name == subscriber_name,
-                or_(
-                    and_(
-                        Employee.month.in_(['OCT', 'NOV', 'DEC']),
-                        Employee.year == oct_dec_year
-                    ),
-                    and_(
-                        Employee.month.in_(['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP']),
-                        Employee.year == jan_sep_year
-                    )
-                )
-            ).scalar()
-            
-            return total_amount or 0.0
+            totals = self.get_subscriber_totals([subscriber_name]).get(subscriber_name, {})
+            return totals.get('previousFiscalAmount', 0.0)
         except Exception as e:
             print(f"Error getting previous fiscal amount: {str(e)}")
             return 0.0
@@ -658,13 +912,12 @@ class InsuranceService:
         try:
             # Cache key for all employees
             cache_key = 'all_employees'
-            current_time = time.time()
+            cache_version = self._cache.version
             
-            # Check if we have cached results with TTL
-            if (cache_key in self._cache and 
-                cache_key in self._cache_time and 
-                current_time - self._cache_time[cache_key] < self._cache_ttl):
-                return self._cache[cache_key]
+            # Check the shared cache first
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
             
             # Get all employees with reasonable limit 
             employees = self.db.query(Employee).limit(10000).all()
@@ -675,6 +928,8 @@ class InsuranceService:
                 employee_list.append({
                     'id': emp.id,
                     'subscriber_name': emp.subscriber_name,
+                    'subscriber_id': emp.subscriber_id,
+                    'subscriber_display_name': emp.subscriber_display_name,
                     'plan': emp.plan,
                     'coverage_type': emp.coverage_type,
                     'status': emp.status,
@@ -686,8 +941,7 @@ class InsuranceService:
                 })
             
             # Cache the results
-            self._cache[cache_key] = employee_list
-            self._cache_time[cache_key] = current_time
+            self._cache.set(cache_key, employee_list, cache_version)
             
             return employee_list
             
@@ -695,85 +949,169 @@ class InsuranceService:
             print(f"Error getting all employees: {str(e)}")
             return []
         
-    def get_unique_employees(self, page: int = 1, limit: int = 10, search_text: Optional[str] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _coverage_category(plan: str) -> str:
+        """Coverage bucket for per-person totals"""
+        plan = (plan or '').upper()
+        for category in ('LIFE', 'ADD', 'DENTAL', 'VISION'):
+            if category in plan:
+                return category.lower()
+        return 'medical'
+
+    @staticmethod
+    def _latest_month_category(plan: str) -> str:
+        """Coverage bucket for the latest-month breakdown (checks DENTAL and VISION first)"""
+        plan = (plan or '').upper()
+        for category in ('DENTAL', 'VISION', 'LIFE', 'ADD'):
+            if category in plan:
+                return category.lower()
+        return 'medical'
+
+    @classmethod
+    def _employee_group(cls, person: Person, records: List[Employee]) -> Dict[str, Any]:
+        totals = dict.fromkeys(('life', 'add', 'dental', 'vision', 'medical'), 0.0)
+        months: Dict[tuple, Dict[str, Any]] = {}
+        for emp in records:
+            amount = float(emp.charge_amount or 0)
+            totals[cls._coverage_category(emp.plan)] += amount
+            
+            month = months.setdefault((emp.month, emp.year), {
+                'month': emp.month,
+                'year': emp.year,
+                **dict.fromkeys(('life', 'add', 'dental', 'vision', 'medical'), 0.0)
+            })
+            month[cls._latest_month_category(emp.plan)] += amount
+        
+        # Latest invoice month, in fiscal order (OCT first)
+        latest = max(
+            months.values(),
+            key=lambda m: (m['year'], FISCAL_MONTH_ORDER.get((m['month'] or '').upper(), 0))
+        )
+        plans = {(emp.plan or '').upper() for emp in records}
+        
+        return {
+            'personId': person.id,
+            'employeeName': f"{person.first_name} {person.last_name}",
+            'firstName': person.first_name,
+            'lastName': person.last_name,
+            'coverageType': records[0].coverage_type or 'EMPLOYEE',
+            'planCategory': '2000' if 'UHC-2000' in plans else '3000' if 'UHC-3000' in plans else 'General',
+            'lifeTotal': totals['life'],
+            'addTotal': totals['add'],
+            'dentalTotal': totals['dental'],
+            'visionTotal': totals['vision'],
+            'medicalTotal': totals['medical'],
+            'grandTotal': sum(totals.values()),
+            'terminated': any('TRM' in (emp.status or '').upper() for emp in records),
+            'latestMonth': {
+                'month': latest['month'],
+                'year': latest['year'],
+                'lifeTotal': latest['life'],
+                'addTotal': latest['add'],
+                'dentalTotal': latest['dental'],
+                'visionTotal': latest['vision'],
+                'medicalTotal': latest['medical'],
+                'monthTotal': latest['life'] + latest['add'] + latest['dental'] + latest['vision'] + latest['medical'],
+            },
+            'records': [cls._employee_detail(emp) for emp in records],
+        }
+
+    def _employee_group_rows(self) -> List[tuple]:
+        """(Person, Employee) rows for every resolved employee, grouped by person"""
+        return (
+            self.db.query(Person, Employee)
+            .join(Employee, Employee.person_id == Person.id)
+            .order_by(Person.id, Employee.id)
+            .all()
+        )
+
+    @classmethod
+    def build_employee_groups(cls, rows: List[tuple]) -> List[Dict[str, Any]]:
+        """Pure CPU work over _employee_group_rows, safe to run in a worker thread"""
+        groups = []
+        for _, person_rows in groupby(rows, key=lambda row: row[0].id):
+            person_rows = list(person_rows)
+            groups.append(cls._employee_group(person_rows[0][0], [emp for _, emp in person_rows]))
+        return groups
+
+    def get_employee_groups(self) -> List[Dict[str, Any]]:
         """
-        Get paginated unique employees (most recent version of each employee record).
-        This ensures we only return one record per subscriber, with the most recent data.
+        Employee rows grouped by resolved person (see app.services.identity),
+        with per-coverage totals and the latest month's breakdown.
         """
+        cache_key = 'employee_groups'
+        cache_version = self._cache.version
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Calculate offset for pagination
-            offset = (page - 1) * limit
-            
-            # Use a subquery to get the most recent record for each unique subscriber_name
-            # First, we need to split the subscriber_name to get just the ID part
-            latest_ids_subquery = (
-                self.db.query(
-                    func.max(Employee.id).label('max_id'),
-                    func.split_part(Employee.subscriber_name, ' - ', 1).label('subscriber_id')
-                )
-                .group_by(func.split_part(Employee.subscriber_name, ' - ', 1))
-                .subquery()
-            )
+            groups = self.build_employee_groups(self._employee_group_rows())
             
-            # Main query joins with our subquery to get only the latest records
-            query = (
-                self.db.query(Employee)
-                .join(
-                    latest_ids_subquery,
-                    and_(
-                        Employee.id == latest_ids_subquery.c.max_id,
-                        func.split_part(Employee.subscriber_name, ' - ', 1) == latest_ids_subquery.c.subscriber_id
-                    )
-                )
-            )
+            self._cache.set(cache_key, groups, cache_version)
             
-            # Apply search filter if provided
-            if search_text:
-                search_pattern = f"%{search_text}%"
-                query = query.filter(
-                    or_(
-                        Employee.subscriber_name.ilike(search_pattern),
-                        Employee.coverage_type.ilike(search_pattern),
-                        Employee.plan.ilike(search_pattern),
-                        Employee.status.ilike(search_pattern),
-                        Employee.coverage_dates.ilike(search_pattern)
-                    )
+            return groups
+        except Exception as e:
+            print(f"Error getting employee groups: {str(e)}")
+            return []
+
+    def get_employee_changes(self, since_version: int) -> Dict[str, Any]:
+        """Dataset version and the files loaded or deleted since `since_version`"""
+        changes = changes_since(self.db, since_version)
+        return {
+            'version': changes['version'],
+            'changed': changes['changed'],
+            'reset': changes['reset'],
+            'insertedInsuranceFileIds': changes['inserted_file_ids'],
+            'removedInsuranceFileIds': changes['removed_file_ids'],
+        }
+
+    def get_employees_for_files(self, insurance_file_ids: List[int]) -> List[Dict[str, Any]]:
+        """Every employee row of the given insurance files, oldest first"""
+        if not insurance_file_ids:
+            return []
+        employees = (
+            self.db.query(Employee)
+            .filter(Employee.insurance_file_id.in_(insurance_file_ids))
+            .order_by(Employee.id)
+            .all()
+        )
+        return [self._employee_detail(emp) for emp in employees]
+
+    def export_employee_data(self, search_text: Optional[str] = None, plan_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Every employee row matching the filters, up to GRAPHQL_EXPORT_MAX_ROWS;
+        larger sets are refused in favour of the streaming /export route.
+        """
+        employees = []
+        for row in export_rows(self.db, search_text, plan_filter):
+            if len(employees) == GRAPHQL_EXPORT_MAX_ROWS:
+                raise ValueError(
+                    f"More than {GRAPHQL_EXPORT_MAX_ROWS} employees match; narrow the filters "
+                    f"or download the export from GET /export"
                 )
-            
-            # Get total count for pagination
-            total = query.count()
-            
-            # Get paginated results
-            employees = query.order_by(Employee.id.desc()).offset(offset).limit(limit).all()
-            
-            # Convert to dictionaries
-            employee_list = []
-            for emp in employees:
-                # Split the subscriber_name field to extract ID and actual name
-                subscriber_info = emp.subscriber_name.split(' - ') if ' - ' in emp.subscriber_name else [emp.subscriber_name, "Employee " + str(emp.id)]
-                
-                # The ID should be the first part, name should be the second part
-                subscriber_id = subscriber_info[0].strip()
-                subscriber_name = subscriber_info[1].strip() if len(subscriber_info) > 1 else "Employee " + str(emp.id)
-                
-                employee_list.append({
-                    'id': emp.id,
-                    'subscriberId': subscriber_id,
-                    'subscriberName': subscriber_name,
-                    'plan': emp.plan,
-                    'coverageType': emp.coverage_type,
-                    'status': emp.status,
-                    'coverageDates': emp.coverage_dates,
-                    'chargeAmount': float(emp.charge_amount),
-                    'month': emp.month,
-                    'year': emp.year,
-                    'insuranceFileId': emp.insurance_file_id
-                })
-            
-            return {
-                'total': total,
-                'employees': employee_list
-            }
+            employee = dict(zip(EXPORT_HEADERS, row))
+            employee['subscriberName'] = employee['subscriberName'] or f"Employee {employee['id']}"
+            employee['chargeAmount'] = float(employee['chargeAmount'])
+            employees.append(employee)
+        return employees
+
+    def get_unique_employees(
+        self,
+        page: int = 1,
+        limit: int = 10,
+        search_text: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        sort_direction: str = 'desc',
+        after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get paginated unique employees (most recent version of each employee record).
+        This ensures we only return one record per subscriber, with the most recent data.
+        """
+        try:
+            query = self.db.query(Employee).filter(Employee.id.in_(self._latest_employee_ids()))
+            return self._employee_page(query, 'unique', page, limit, search_text, sort_by, sort_direction, after)
             
         except Exception as e:
             print(f"Error getting unique employees: {str(e)}")
@@ -789,11 +1127,10 @@ class InsuranceService:
     def get_uploaded_files(self) -> List[Dict[str, str]]:
         # Check cache first with TTL
         cache_key = 'uploaded_files'
-        current_time = time.time()
-        if (cache_key in self._cache and 
-            cache_key in self._cache_time and 
-            current_time - self._cache_time[cache_key] < self._cache_ttl):
-            return self._cache[cache_key]
+        cache_version = self._cache.version
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
             
         try:
             # Optimize query to select only needed columns
@@ -809,28 +1146,124 @@ class InsuranceService:
                 'uploadDate': file.upload_date.strftime('%Y-%m-%d %H:%M:%S')
             } for file in files]
             
-            # Cache the result with timestamp
-            self._cache[cache_key] = results
-            self._cache_time[cache_key] = current_time
+            # Cache the result for this dataset version
+            self._cache.set(cache_key, results, cache_version)
             
             return results
         except Exception as e:
             print(f"Error getting uploaded files: {str(e)}")
             return []
 
-    def delete_file(self, plan_name: str) -> None:
+    def delete_file(self, plan_name: str, progress: Optional[Callable[[int, int], None]] = None) -> int:
+        return self.delete_files([plan_name], progress)
+
+    def delete_files(
+        self,
+        plan_names: List[str],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Delete insurance files with their employee rows and rollups in one
+        transaction, set-based: nothing is loaded into the session. Where
+        employees is partitioned each file's partition is dropped, otherwise
+        rows go in batched DELETEs and `progress(rows_deleted, rows_total)` is
+        called after each batch. Returns the employee rows deleted.
+        """
         try:
-            # Clear cache when deleting a file
-            self._cache = {}
-            self._cache_time = {}
-            
-            file = self.db.query(InsuranceFile).filter_by(plan_name=plan_name).first()
-            if not file:
-                raise ValueError(f"File not found: {plan_name}")
-            
-            self.db.delete(file)
+            names = list(dict.fromkeys(plan_names))
+            if not names:
+                raise ValueError("No files to delete")
+            files = (
+                self.db.query(InsuranceFile)
+                .filter(InsuranceFile.plan_name.in_(names))
+                .order_by(InsuranceFile.id)
+                .all()
+            )
+            found = {file.plan_name for file in files}
+            missing = [name for name in names if name not in found]
+            if missing:
+                raise ValueError(f"File not found: {', '.join(missing)}")
+            file_ids = [file.id for file in files]
+            
+            # People to check afterwards, and the row count, in one pass
+            person_counts = (
+                self.db.query(Employee.person_id, func.count(Employee.id))
+                .filter(Employee.insurance_file_id.in_(file_ids))
+                .group_by(Employee.person_id)
+                .all()
+            )
+            person_ids = [person_id for person_id, _ in person_counts if person_id is not None]
+            rows_total = sum(count for _, count in person_counts)
+            
+            # Before the change log lock, in the same order as uploads take them
+            if employees_partitioned(self.db):
+                for file_id in file_ids:
+                    drop_employee_partition(self.db, file_id)
+                if progress:
+                    progress(rows_total, rows_total)
+            else:
+                self._delete_employee_rows(file_ids, rows_total, progress)
+            
+            self.db.query(InvoiceRollup).filter(
+                InvoiceRollup.insurance_file_id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            for file in files:
+                record_dataset_change(self.db, CHANGE_DELETED, file)
+            self.db.query(InsuranceFile).filter(
+                InsuranceFile.id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            
+            # Drop people who only appeared in these files
+            if person_ids:
+                self.db.query(Person).filter(
+                    Person.id.in_(person_ids),
+                    ~self.db.query(Employee.id).filter(Employee.person_id == Person.id).exists()
+                ).delete(synchronize_session=False)
+            
+            self._dataset_changed()
             self.db.commit()
+            self._cache.bump()
+            return rows_total
             
         except Exception as e:
             self.db.rollback()
-            raise ValueError(str(e))
\ No newline at end of file
+            raise ValueError(str(e))
+
+    def _delete_employee_rows(
+        self,
+        file_ids: List[int],
+        rows_total: int,
+        progress: Optional[Callable[[int, int], None]]
+    ) -> None:
+        """
+        DELETEs of the files' employee rows in id ranges of DELETE_BATCH_ROWS
+        rows, all in the caller's transaction (so every row stays locked
+        until it commits). The range bounds are read in one pass first, so
+        no statement rescans rows an earlier one deleted.
+        """
+        numbered = (
+            select(Employee.id, func.row_number().over(order_by=Employee.id).label('position'))
+            .where(Employee.insurance_file_id.in_(file_ids))
+            .subquery()
+        )
+        bounds = self.db.execute(
+            select(numbered.c.id)
+            .where(numbered.c.position % DELETE_BATCH_ROWS == 0)
+            .order_by(numbered.c.id)
+        ).scalars().all()
+        
+        rows_deleted = 0
+        lower = None
+        for upper in bounds + [None]:
+            conditions = [Employee.insurance_file_id.in_(file_ids)]
+            if lower is not None:
+                conditions.append(Employee.id > lower)
+            if upper is not None:
+                conditions.append(Employee.id <= upper)
+            rows_deleted += self.db.execute(
+                delete(Employee).where(*conditions),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            if progress:
+                progress(rows_deleted, rows_total)
+            lower = upper
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Employee partitions.
+
+On Postgres the employees table is LIST partitioned by insurance_file_id,
+one partition (employees_file_<id>) per uploaded file, with every index
+defined on the parent and so built in each partition:
+
+- An upload COPYs its rows into a standalone table and attaches it when it
+  is full. Attaching only takes a SHARE UPDATE EXCLUSIVE lock on employees,
+  so reads carry on during a long load, and the partition's indexes are
+  built once over the loaded rows instead of being maintained row by row.
+- Deleting a file drops its partition instead of deleting its rows.
+- Reads of given files (identity matching, deletes, the changes feed) are
+  pruned to those files' partitions.
+
+The primary key of the partitioned table is (id, insurance_file_id); ids
+still come from the one sequence, so the ORM keeps using id alone. Other
+engines, and databases not migrated yet, keep the plain table.
+"""
+import re
+from typing import List, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Employee
+
+EMPLOYEES = Employee.__tablename__
+PARTITION_KEY = 'insurance_file_id'
+
+
+def partition_name(insurance_file_id: int) -> str:
+    return f"{EMPLOYEES}_file_{int(insurance_file_id)}"
+
+
+def _is_partitioned(db: Union[Session, Connection]) -> bool:
+    return bool(db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {'table': EMPLOYEES}).scalar())
+
+
+def employees_partitioned(db: Session) -> bool:
+    return db.get_bind().dialect.name == 'postgresql' and _is_partitioned(db)
+
+
+def create_employee_partition(db: Session, insurance_file_id: int) -> str:
+    """
+    Empty standalone table for a new file's rows; fill it, then call
+    attach_employee_partition. Returns the table name.
+    """
+    name = partition_name(insurance_file_id)
+    db.execute(text(f"CREATE TABLE {name} (LIKE {EMPLOYEES} INCLUDING DEFAULTS INCLUDING GENERATED)"))
+    # Proves the partition bound, so attaching does not scan the rows to check it
+    db.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_bound "
+        f"CHECK ({PARTITION_KEY} IS NOT NULL AND {PARTITION_KEY} = {int(insurance_file_id)})"
+    ))
+    return name
+
+
+def attach_employee_partition(db: Session, insurance_file_id: int) -> None:
+    name = partition_name(insurance_file_id)
+    db.execute(text(f"ALTER TABLE {EMPLOYEES} ATTACH PARTITION {name} FOR VALUES IN ({int(insurance_file_id)})"))
+    db.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bound"))
+    # Plans for the new rows should not wait for autovacuum
+    db.execute(text(f"ANALYZE {name}"))
+
+
+def drop_employee_partition(db: Session, insurance_file_id: int) -> None:
+    """Remove every employee row of a file at once (locks employees until commit)"""
+    db.execute(text(f"DROP TABLE IF EXISTS {partition_name(insurance_file_id)}"))
+
+
+# Converting the table (used by the migration and the benchmark database)
+
+def _index_definitions(connection: Connection, table: str) -> List[str]:
+    """CREATE INDEX statements of a table's indexes, primary key excluded"""
+    definitions = connection.execute(text(
+        "SELECT indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = :table AND indexname <> :primary_key "
+        "ORDER BY indexname"
+    ), {'table': table, 'primary_key': f"{table}_pkey"}).scalars().all()
+    # Partitioned parents report "ON ONLY", which would skip the partitions
+    return [re.sub(r' ON (?:ONLY )?(\S+\.)?\S+ USING ', rf' ON \1{EMPLOYEES} USING ', definition)
+            for definition in definitions]
+
+
+def _rebuild_employees(connection: Connection, partitioned: bool) -> None:
+    """
+    Recreate employees, keeping its rows, columns, defaults, foreign keys and
+    indexes, as a table partitioned by file or as a plain table.
+    """
+    old = f"{EMPLOYEES}_unconverted"
+    indexes = _index_definitions(connection, EMPLOYEES)
+    foreign_keys = connection.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+    ), {'table': EMPLOYEES}).all()
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': EMPLOYEES}).scalar()
+    columns = ', '.join(connection.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER' "
+        "ORDER BY ordinal_position"
+    ), {'table': EMPLOYEES}).scalars())
+
+    connection.execute(text(f"ALTER TABLE {EMPLOYEES} RENAME TO {old}"))
+    partition_by = f" PARTITION BY LIST ({PARTITION_KEY})" if partitioned else ''
+    connection.execute(text(f"CREATE TABLE {EMPLOYEES} (LIKE {old} INCLUDING DEFAULTS INCLUDING GENERATED){partition_by}"))
+    if sequence:
+        # Otherwise dropping the old table would drop the id sequence with it
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {EMPLOYEES}.id"))
+
+    if partitioned:
+        file_ids = connection.execute(text(f"SELECT DISTINCT {PARTITION_KEY} FROM {old}")).scalars().all()
+        for file_id in file_ids:
+            connection.execute(text(
+                f"CREATE TABLE {partition_name(file_id)} PARTITION OF {EMPLOYEES} FOR VALUES IN ({int(file_id)})"
+            ))
+
+    connection.execute(text(f"INSERT INTO {EMPLOYEES} ({columns}) SELECT {columns} FROM {old}"))
+    # Drops the old partitions too when going back to a plain table
+    connection.execute(text(f"DROP TABLE {old}"))
+
+    primary_key = f"id, {PARTITION_KEY}" if partitioned else 'id'
+    connection.execute(text(f"ALTER TABLE {EMPLOYEES} ADD CONSTRAINT {EMPLOYEES}_pkey PRIMARY KEY ({primary_key})"))
+    for name, definition in foreign_keys:
+        connection.execute(text(f"ALTER TABLE {EMPLOYEES} ADD CONSTRAINT {name} {definition}"))
+    # On the partitioned table each index is built in every partition
+    for definition in indexes:
+        connection.execute(text(definition))
+    connection.execute(text(f"ANALYZE {EMPLOYEES}"))
+
+
+def check_employee_files(connection: Connection) -> None:
+    """Refuse to go on while employee rows without an insurance file exist (any engine)"""
+    orphans = connection.execute(text(f"SELECT count(*) FROM {EMPLOYEES} WHERE {PARTITION_KEY} IS NULL")).scalar()
+    if orphans:
+        raise RuntimeError(
+            f"{orphans} employee rows have no insurance file; delete them or assign them to a file first"
+        )
+
+
+def partition_employees(connection: Connection) -> None:
+    """Turn a plain employees table into one partitioned by file (Postgres only)"""
+    if connection.dialect.name != 'postgresql' or _is_partitioned(connection):
+        return
+    check_employee_files(connection)
+    _rebuild_employees(connection, partitioned=True)
+
+
+def unpartition_employees(connection: Connection) -> None:
+    if connection.dialect.name != 'postgresql' or not _is_partitioned(connection):
+        return
+    _rebuild_employees(connection, partitioned=False)
@@ -0,0 +1,14 @@
+"""
+Plan type keywords, shared by the row-wise classifier on InsuranceService
+and the vectorized one in app.services.ingest. Kept free of pandas so the
+API can classify without importing it.
+"""
+
+# UHG plan type keywords, checked in order against the plan/policy/description/coverage type text
+UHG_PLAN_KEYWORDS = [
+    ('UHG-DENTAL', ['DENTAL', 'DHMO', '0P369']),
+    ('UHG-VISION', ['VISION', 'VSP', 'S1107']),
+    ('UHG-LIFE', ['LIFE', 'GTL', 'NON-CONTRIBUTORY 15K FLAT BASIC LIFE']),
+    ('UHG-ADD', ['AD&D', 'ACCIDENTAL']),
+]
+UHG_DEFAULT_PLAN = 'UHG-OTHER'
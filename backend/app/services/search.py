@@ -0,0 +1,39 @@
+"""
+Employee search.
+
+The search box matches a substring of any of subscriber name, coverage type,
+plan, status or coverage dates. Those columns are concatenated into the
+generated Employee.search_document column, which has a pg_trgm GIN index,
+so a single ILIKE is served by the index instead of five scans.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+from app.models import Employee
+
+LIKE_ESCAPE = '\\'
+
+
+def _like_pattern(search_text: str) -> str:
+    escaped = (
+        search_text.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace('%', LIKE_ESCAPE + '%')
+        .replace('_', LIKE_ESCAPE + '_')
+    )
+    return f"%{escaped}%"
+
+
+def filter_employees(query: Query, search_text: str) -> Query:
+    """Restrict an Employee query to rows whose searchable text contains search_text"""
+    return query.filter(Employee.search_document.ilike(_like_pattern(search_text.strip()), escape=LIKE_ESCAPE))
+
+
+def rank_employees(query: Query, search_text: str) -> Query:
+    """
+    Order search results best match first, newest first within a rank.
+    Ranking uses pg_trgm word similarity, so other engines only get the id order.
+    """
+    if query.session.get_bind().dialect.name == 'postgresql':
+        rank = func.word_similarity(search_text.strip(), Employee.search_document)
+        return query.order_by(rank.desc(), Employee.id.desc())
+    return query.order_by(Employee.id.desc())
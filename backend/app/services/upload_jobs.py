@@ -0,0 +1,295 @@
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import InsuranceFile, UploadJob
+from app.services.insurance_analytics import InsuranceService
+
+# Postgres channel the worker LISTENs on for new jobs
+UPLOAD_JOBS_CHANNEL = "upload_jobs"
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+# Longest per-row error report kept on a job
+MAX_STORED_ERRORS = 1000
+
+# A running job whose worker has not reported for this long is presumed dead
+# and requeued, or failed once it has been claimed MAX_JOB_ATTEMPTS times
+JOB_HEARTBEAT_TIMEOUT = timedelta(seconds=int(os.getenv('UPLOAD_JOB_TIMEOUT_SECONDS', '1800')))
+MAX_JOB_ATTEMPTS = int(os.getenv('UPLOAD_JOB_MAX_ATTEMPTS', '3'))
+# How often a worker reports that a job is still running, whatever the load is doing
+JOB_HEARTBEAT_INTERVAL = JOB_HEARTBEAT_TIMEOUT / 3
+
+# Queued uploads wait here until the worker has loaded them; the API and the
+# worker must both see it (same host or a shared volume)
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'insurance-uploads'))
+UPLOAD_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _store_upload(file_buffer: BinaryIO) -> Tuple[str, str]:
+    """Copy an upload into UPLOAD_DIR chunk by chunk; returns (path, sha256)"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, prefix='upload-', delete=False) as stored:
+        for chunk in iter(lambda: file_buffer.read(UPLOAD_COPY_CHUNK_BYTES), b''):
+            digest.update(chunk)
+            stored.write(chunk)
+    return stored.name, digest.hexdigest()
+
+
+def _remove_upload(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Writes heartbeat_at for a running job every `interval` from its own
+    session, so a long parse or COPY that reports no progress is not taken
+    for a dead worker
+    """
+
+    def __init__(self, job_id: int, interval: Optional[timedelta] = None):
+        super().__init__(name=f"upload-job-{job_id}-heartbeat", daemon=True)
+        self.job_id = job_id
+        self.interval = (interval or JOB_HEARTBEAT_INTERVAL).total_seconds()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            db = SessionLocal()
+            try:
+                # A job that was reclaimed meanwhile stays reclaimed
+                db.query(UploadJob).filter_by(id=self.job_id, status='running').update(
+                    {'heartbeat_at': datetime.utcnow()}
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error writing heartbeat for upload job {self.job_id}: {str(e)}")
+            finally:
+                db.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class UploadJobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        file_buffer: BinaryIO,
+        plan_name: str,
+        file_name: Optional[str] = None,
+        replace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Store an upload in UPLOAD_DIR, queue it for the worker and return
+        immediately; only the file's path is kept on the job. The plan name
+        is checked against the file name (plan_name_error) before anything is
+        stored. With `replace` an existing plan name is corrected in place by
+        the worker, and a replacement identical to the stored file is
+        answered here without a job.
+        """
+        from app.services.ingest import plan_name_error
+
+        error = plan_name_error(plan_name, file_name)
+        if error:
+            return {"success": False, "error": error}
+
+        existing_file = (
+            self.db.query(InsuranceFile.id, InsuranceFile.content_hash).filter_by(plan_name=plan_name).first()
+        )
+        if existing_file and not replace:
+            return InsuranceService.existing_file_error(plan_name)
+
+        content_path, content_hash = _store_upload(file_buffer)
+        if existing_file and existing_file.content_hash == content_hash:
+            _remove_upload(content_path)
+            return InsuranceService.identical_file_result(plan_name)
+
+        job = UploadJob(
+            plan_name=plan_name,
+            file_name=file_name or plan_name,
+            content_path=content_path,
+            status='queued',
+            replace_existing=replace
+        )
+        try:
+            self.db.add(job)
+            self.db.flush()
+            if self.db.get_bind().dialect.name == "postgresql":
+                self.db.execute(text("SELECT pg_notify(:channel, :job_id)"),
+                                {"channel": UPLOAD_JOBS_CHANNEL, "job_id": str(job.id)})
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            _remove_upload(content_path)
+            raise
+
+        return {
+            "success": True,
+            "message": "Upload queued",
+            "jobId": job.id
+        }
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        job = (
+            self.db.query(
+                UploadJob.id, UploadJob.plan_name, UploadJob.file_name, UploadJob.status,
+                UploadJob.rows_parsed, UploadJob.rows_inserted, UploadJob.error_count,
+                UploadJob.errors, UploadJob.message, UploadJob.error,
+                UploadJob.created_at, UploadJob.started_at, UploadJob.finished_at
+            )
+            .filter(UploadJob.id == job_id)
+            .first()
+        )
+        if not job:
+            return None
+
+        def fmt(value: Optional[datetime]) -> Optional[str]:
+            return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+        return {
+            'id': job.id,
+            'planName': job.plan_name,
+            'fileName': job.file_name,
+            'status': job.status,
+            'rowsParsed': job.rows_parsed,
+            'rowsInserted': job.rows_inserted,
+            'errorCount': job.error_count,
+            'errors': job.errors or [],
+            'message': job.message,
+            'error': job.error,
+            'createdAt': fmt(job.created_at),
+            'startedAt': fmt(job.started_at),
+            'finishedAt': fmt(job.finished_at)
+        }
+
+    def reclaim_stale_jobs(self) -> int:
+        """
+        Requeue running jobs whose worker stopped reporting (crashed or was
+        killed mid-load; its transaction was rolled back), and fail those out
+        of attempts. Returns the number of jobs requeued or failed.
+        """
+        now = datetime.utcnow()
+        stale = (
+            self.db.query(UploadJob)
+            .filter(
+                UploadJob.status == 'running',
+                func.coalesce(UploadJob.heartbeat_at, UploadJob.started_at) < now - JOB_HEARTBEAT_TIMEOUT
+            )
+        )
+        if self.db.get_bind().dialect.name == "postgresql":
+            stale = stale.with_for_update(skip_locked=True)
+
+        jobs = stale.all()
+        for job in jobs:
+            print(f"Upload job {job.id} stopped reporting during attempt {job.attempts}")
+            if job.attempts >= MAX_JOB_ATTEMPTS:
+                _remove_upload(job.content_path)
+                job.status = 'failed'
+                job.error = f"The upload worker stopped while processing this job ({job.attempts} attempts)"
+                job.content = None
+                job.content_path = None
+                job.finished_at = now
+            else:
+                job.status = 'queued'
+        self.db.commit()
+        return len(jobs)
+
+    def claim_next(self) -> Optional[int]:
+        """Mark the oldest queued job as running; concurrent workers skip each other's claims"""
+        self.reclaim_stale_jobs()
+        query = (
+            self.db.query(UploadJob)
+            .filter(UploadJob.status == 'queued')
+            .order_by(UploadJob.id)
+            .limit(1)
+        )
+        if self.db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+
+        job = query.first()
+        if not job:
+            self.db.rollback()
+            return None
+
+        job.status = 'running'
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        job.attempts += 1
+        self.db.commit()
+        return job.id
+
+    def run(self, job_id: int) -> Dict[str, Any]:
+        """
+        Process a claimed job. The load runs in its own session and
+        transaction; progress is committed separately so pollers can see it,
+        and a _Heartbeat keeps the job claimed while the load runs.
+        """
+        job = self.db.query(UploadJob).filter_by(id=job_id).one()
+        content_path, plan_name, replace = job.content_path, job.plan_name, job.replace_existing
+
+        def report_progress(rows_parsed: int, rows_inserted: int) -> None:
+            # Progress is best effort and must never fail the load itself
+            try:
+                self.db.query(UploadJob).filter_by(id=job_id).update({
+                    'rows_parsed': rows_parsed,
+                    'rows_inserted': rows_inserted,
+                    'heartbeat_at': datetime.utcnow()
+                })
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"Error reporting progress for upload job {job_id}: {str(e)}")
+
+        heartbeat = _Heartbeat(job_id)
+        heartbeat.start()
+        work_db = SessionLocal()
+        try:
+            if content_path:
+                with open(content_path, 'rb') as file_buffer:
+                    result = InsuranceService(work_db).process_file_buffer(
+                        file_buffer, plan_name, progress=report_progress, replace=replace
+                    )
+            else:
+                # Queued before uploads were kept in UPLOAD_DIR
+                result = InsuranceService(work_db).process_file_buffer(
+                    io.BytesIO(job.content), plan_name, progress=report_progress, replace=replace
+                )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            work_db.close()
+            heartbeat.stop()
+
+        errors = result.get('errors', [])
+        updates = {
+            'status': 'succeeded' if result.get('success') else 'failed',
+            'message': result.get('message'),
+            'error': result.get('error'),
+            'error_count': len(errors),
+            'errors': errors[:MAX_STORED_ERRORS],
+            'content': None,
+            'content_path': None,
+            'finished_at': datetime.utcnow()
+        }
+        if result.get('success'):
+            updates['rows_inserted'] = result.get('rowsInserted', 0)
+        self.db.query(UploadJob).filter_by(id=job_id).update(updates)
+        self.db.commit()
+        _remove_upload(content_path)
+        return result
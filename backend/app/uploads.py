@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Form, UploadFile
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.upload_jobs import UploadJobService
+
+router = APIRouter()
+
+@router.post("/upload")
+def upload_invoice(
+    file: UploadFile = File(...),
+    planName: Optional[str] = Form(None),
+    replace: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """
+    Multipart upload for large invoices. The body is spooled to a temporary
+    file while it streams in, then copied chunk by chunk into UPLOAD_DIR,
+    where the upload worker reads it from disk, so the file is never held in
+    memory whole. Without `planName` the plan is read from the file name
+    (infer_plan_name); a plan name that does not match the file name is
+    refused before the upload is stored. With `replace`, an already uploaded
+    plan is corrected in place instead of being refused.
+    """
+    from app.services.ingest import infer_plan_name
+
+    file_name = file.filename or ''
+    plan_name = planName or infer_plan_name(file_name) or file_name.split('.')[0].strip()
+    service = UploadJobService(db)
+    result = service.enqueue(file.file, plan_name, file_name, replace)
+    
+    return {
+        'success': result.get('success', False),
+        'message': result.get('message'),
+        'error': result.get('error'),
+        'jobId': result.get('jobId')
+    }
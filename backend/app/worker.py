@@ -0,0 +1,67 @@
+"""
+Upload worker: runs queued upload jobs outside the API process.
+
+    python -m app.worker
+"""
+import select
+import time
+from app.database import SessionLocal, check_schema_revision, engine
+from app.services.upload_jobs import UploadJobService, UPLOAD_JOBS_CHANNEL
+
+POLL_INTERVAL = 5  # Seconds between checks when no NOTIFY arrives
+
+
+def _listen_connection():
+    """Dedicated autocommit connection that LISTENs for new jobs (Postgres only)"""
+    if engine.dialect.name != "postgresql":
+        return None
+    import psycopg2
+    import psycopg2.extensions
+
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    conn = psycopg2.connect(dsn)
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {UPLOAD_JOBS_CHANNEL}")
+    return conn
+
+
+def run_pending_jobs() -> int:
+    """Run queued jobs until none are left; returns how many ran"""
+    processed = 0
+    while True:
+        db = SessionLocal()
+        try:
+            service = UploadJobService(db)
+            job_id = service.claim_next()
+            if job_id is None:
+                return processed
+
+            started = time.perf_counter()
+            result = service.run(job_id)
+            status = "succeeded" if result.get('success') else f"failed: {result.get('error')}"
+            print(f"Upload job {job_id} {status} in {time.perf_counter() - started:.2f}s")
+            processed += 1
+        finally:
+            db.close()
+
+
+def main() -> None:
+    check_schema_revision()
+    listen_conn = _listen_connection()
+    print("Upload worker started")
+    while True:
+        run_pending_jobs()
+
+        if listen_conn is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        ready, _, _ = select.select([listen_conn], [], [], POLL_INTERVAL)
+        if ready:
+            listen_conn.poll()
+            listen_conn.notifies.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Synthetic carrier invoices for benchmarks.
+
+    python -m benchmarks.generate UHG-OCT-2024 --rows 1000000 --out bench_data
+
+Files follow the layout of the real invoices in Data/: the Policy ...
+Benefit Group 3 header on the first line, then the rows. UHG rows carry the voluntary dental,
+vision, life and AD&D product lines, UHC rows the medical plan of their
+deductible. Each subscriber has one current-month row per product line,
+and some also have retro adjustments (ADD/CHG/TRM) for an earlier coverage
+month, sometimes for part of a month. Output is deterministic for a given plan, size and seed.
+
+Rows are generated in chunks, so 10M row files are written without holding
+them in memory. CSV is the default; xlsx is limited to Excel's row count.
+"""
+import argparse
+import calendar
+import os
+import sys
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.ingest import MONTH_NUMBERS, parse_plan_name
+
+INVOICE_COLUMNS = [
+    'Policy', 'Plan', 'Customer Defined Sort', 'Subscriber Name', 'Coverage Dates', 'ID', 'Status',
+    "Volume (000's)", 'Charge Amount', 'Adj Code', 'Coverage Type',
+    'Benefit Group 1', 'Benefit Group 2', 'Benefit Group 3'
+]
+CHUNK_ROWS = 500000
+XLSX_MAX_ROWS = 1048576 - 1  # Header
+# Part of the cached file names; bumped whenever the generated files change
+CACHE_VERSION = 2
+
+LAST_NAMES = [
+    'ADDAGALLA', 'ADDALA', 'AKULA', 'ALAPARTHI', 'ARETI', 'AWASTHI', 'BANDARU', 'BOLLA', 'CHADALAWADA',
+    'CHAITANYA', 'CHIPPALA', 'DASARI', 'GADDAM', 'GARCIA', 'GUNTUPALLI', 'JOHNSON', 'KANDULA', 'KOLLI',
+    'KOVVALI', 'KUMAR', 'MADDALA', 'MARTIN', 'MUPPALA', 'NALLURI', 'PATEL', 'PEDDI', 'PONNADA', 'RAO',
+    'REDDY', 'SMITH', 'SUNKARA', 'TALLURI', 'THOMAS', 'VADLAMUDI', 'VEMURI', 'WILLIAMS', 'YADAV', 'YARLAGADDA'
+]
+FIRST_NAMES = [
+    'ANIL', 'ANJALI', 'ARUN', 'DEEPA', 'DAVID', 'HARISH', 'JAGADEESH', 'JENNIFER', 'KAVYA', 'KIRAN',
+    'LAKSHMI', 'MADHAVI', 'MARIA', 'MICHAEL', 'PRADEEP', 'PRIYA', 'RAMESH', 'RAVI', 'ROHITH', 'SAI',
+    'SANDEEP', 'SATYENDRA', 'SHRISH', 'SIRISHA', 'SRINIVASARAO', 'SUBRAHMANYAM', 'SURESH', 'SURYANARAYANA',
+    'SWATHI', 'VENKATA', 'VIJAY'
+]
+MIDDLE_NAMES = ['', '', '', '', 'KUMAR', 'NARAYANA', 'LAKSHMI', 'SAI', 'RAO', 'A', 'J', 'M']
+
+# Product line (plan description), Volume (000's), rate by coverage tier. A subscriber holds the
+# first 2, 4 or 6 lines; the VPPO/VOLUNTARY lines replace the dental/vision pair for a few of them.
+UHG_PRODUCTS = [
+    ('Non-Contributory 15K Flat Basic Life EE Only', 15, (1.35, 1.35, 1.35, 1.35)),
+    ('Non-Contributory 15K Flat AD&D EE Only', 15, (0.60, 0.60, 0.60, 0.60)),
+    ('Dental Voluntary 0P369', 0, (19.13, 38.26, 45.50, 68.09)),
+    ('Vision 100% Voluntary S1107', 0, (6.96, 13.19, 14.02, 21.77)),
+    ('Life by Flat Amount', 0, (1.20, 1.20, 1.20, 1.20)),
+    ('ADD by Flat Amount', 0, (0.60, 0.60, 0.60, 0.60)),
+    ('Dental VPPO', 0, (24.05, 48.10, 52.00, 81.45)),
+    ('Vision VOLUNTARY', 0, (7.50, 14.25, 15.10, 23.40)),
+]
+UHG_PRODUCT_COUNTS = ([2, 4, 6], [0.4, 0.5, 0.1])
+UHG_ALTERNATE_SHARE = 0.08
+UHG_TIERS = ['EMPLOYEE', 'EMPLOYEE & SPOUSE', 'EMPLOYEE AND ONE DEPENDENT', 'EMPLOYEE & FAMILY']
+UHG_TIER_WEIGHTS = [0.81, 0.04, 0.01, 0.14]
+
+UHC_TIERS = ['Employee Only', 'EE + Spouse', 'EE +1 or more Children', 'EE + Family']
+UHC_TIER_WEIGHTS = [0.48, 0.09, 0.09, 0.34]
+# Deductible -> plan description, benefit group, rate by coverage tier
+UHC_PLANS = {
+    '2000': ('EI 2019 CH+PS1 1968A MOD STANDARD80-2000', 'EI STANDARD (80-2000) - ACTIVE',
+             (363.21, 799.07, 690.10, 1125.96)),
+    '3000': ('EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000', 'EI BUY UP (100-3000) - ACTIVE',
+             (381.50, 839.30, 724.85, 1182.64)),
+}
+
+ADJUSTMENT_SHARE = {'UHG': 0.12, 'UHC': 0.05}
+ADJ_CODES = ['ADD', 'CHG', 'TRM']
+ADJ_CODE_WEIGHTS = [0.5, 0.25, 0.25]
+RETRO_MONTH_WEIGHTS = [0.45, 0.25, 0.15, 0.1, 0.05]  # 1..5 months before the invoice month
+
+
+def _month_range(year: int, month: int, first_day: int = 1, last_day: Optional[int] = None) -> str:
+    last_day = last_day or calendar.monthrange(year, month)[1]
+    return f"{month:02d}/{first_day:02d}/{year}-{month:02d}/{last_day:02d}/{year}"
+
+
+def _months_before(year: int, month: int, count: int):
+    index = year * 12 + (month - 1) - count
+    return index // 12, index % 12 + 1
+
+
+def _coverage_choices(year: int, month: int) -> List[str]:
+    """[current month, then per retro month: full month, first part, second part]"""
+    choices = [_month_range(year, month)]
+    for back in range(1, len(RETRO_MONTH_WEIGHTS) + 1):
+        retro_year, retro_month = _months_before(year, month, back)
+        last = calendar.monthrange(retro_year, retro_month)[1]
+        choices += [
+            _month_range(retro_year, retro_month),
+            _month_range(retro_year, retro_month, 1, 9),
+            _month_range(retro_year, retro_month, 10, last),
+        ]
+    return choices
+
+
+def _subscriber_names(subscribers: np.ndarray) -> np.ndarray:
+    """Stable "LAST, FIRST MIDDLE" per subscriber number, scrambled so neighbours differ"""
+    scrambled = (subscribers.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    last = np.asarray(LAST_NAMES, dtype=object)[scrambled % len(LAST_NAMES)]
+    first = np.asarray(FIRST_NAMES, dtype=object)[(scrambled // len(LAST_NAMES)) % len(FIRST_NAMES)]
+    middle = np.asarray(MIDDLE_NAMES, dtype=object)[
+        (scrambled // (len(LAST_NAMES) * len(FIRST_NAMES))) % len(MIDDLE_NAMES)
+    ]
+    names = pd.Series(last) + ', ' + pd.Series(first) + np.where(middle == '', '', ' ' + middle)
+    return names.to_numpy(dtype=object)
+
+
+def _subscriber_rows(rng: np.random.Generator, size: int, lines: np.ndarray, adjustment_share: float):
+    """
+    Lay out `size` rows over subscribers holding `lines` product lines each (a
+    sample to draw from): every line once for the current month, then retro
+    adjustments. Returns (subscriber per row, line slot per row, adjusted mask,
+    subscriber count).
+    """
+    # Enough subscribers to fill the chunk; the surplus is cut off below
+    estimate = int(size / (lines.mean() * (1 + adjustment_share))) + 16
+    while True:
+        held = rng.choice(lines, estimate)
+        counts = held + rng.binomial(held, adjustment_share)
+        ends = np.cumsum(counts)
+        if ends[-1] >= size:
+            break
+        estimate *= 2
+    subscriber_count = int(np.searchsorted(ends, size) + 1)
+    held, counts, ends = held[:subscriber_count], counts[:subscriber_count], ends[:subscriber_count]
+
+    subscribers = np.repeat(np.arange(subscriber_count), counts)[:size]
+    rank = np.arange(size) - (ends - counts)[subscribers]
+    adjusted = rank >= held[subscribers]
+    # Adjustments hit any of the subscriber's lines
+    slots = np.where(adjusted, rng.integers(0, held[subscribers]), rank)
+    return subscribers, slots, adjusted, subscriber_count
+
+
+def generate_invoice(plan_name: str, rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the invoice rows for `plan_name` (e.g. UHC-2000-OCT-2024) as INVOICE_COLUMNS frames"""
+    base_plan, month, year = parse_plan_name(plan_name)
+    month_number = MONTH_NUMBERS[month.upper()]
+    carrier = 'UHG' if base_plan == 'UHG' else 'UHC'
+    coverage_choices = np.asarray(_coverage_choices(year, month_number), dtype=object)
+    rng = np.random.default_rng([seed, sum(plan_name.encode()), rows])
+
+    subscriber_offset = 0
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+
+        if carrier == 'UHG':
+            line_counts = rng.choice(UHG_PRODUCT_COUNTS[0], 4096, p=UHG_PRODUCT_COUNTS[1])
+            local, slots, adjusted, subscriber_count = _subscriber_rows(
+                rng, size, line_counts, ADJUSTMENT_SHARE[carrier]
+            )
+            alternate = (rng.random(subscriber_count) < UHG_ALTERNATE_SHARE)[local]
+            products = np.where(alternate & ((slots == 2) | (slots == 3)), slots + 4, slots)
+            # Coverage tier belongs to the subscriber, not the row
+            tiers = rng.choice(len(UHG_TIERS), subscriber_count, p=UHG_TIER_WEIGHTS)[local]
+            rates = np.array([product[2] for product in UHG_PRODUCTS])
+            plan_text = np.asarray([product[0] for product in UHG_PRODUCTS], dtype=object)[products]
+            volume = np.array([product[1] for product in UHG_PRODUCTS])[products]
+            amounts = rates[products, tiers]
+            tier_text = np.asarray(UHG_TIERS, dtype=object)[tiers]
+            subscribers = subscriber_offset + local
+            policy = np.full(size, '1378214', dtype=object)
+            subscriber_ids = (61040000000 + subscribers * 7).astype(str)
+            benefit_group = np.full(size, '1378214-TABNER, INC', dtype=object)
+        else:
+            description, group, plan_rates = UHC_PLANS.get(base_plan.split('-')[1], UHC_PLANS['2000'])
+            local, slots, adjusted, subscriber_count = _subscriber_rows(
+                rng, size, np.ones(1, dtype=int), ADJUSTMENT_SHARE[carrier]
+            )
+            tiers = rng.choice(len(UHC_TIERS), subscriber_count, p=UHC_TIER_WEIGHTS)[local]
+            plan_text = np.full(size, description, dtype=object)
+            volume = np.zeros(size, dtype=int)
+            amounts = np.asarray(plan_rates)[tiers]
+            tier_text = np.asarray(UHC_TIERS, dtype=object)[tiers]
+            subscribers = subscriber_offset + local
+            policy = np.where(rng.random(subscriber_count) < 0.04, '0929376', '0924216').astype(object)[local]
+            subscriber_ids = (980000000 + subscribers).astype(str)
+            benefit_group = np.full(size, group, dtype=object)
+        subscriber_offset += subscriber_count
+
+        # Retro adjustments: earlier coverage month, sometimes a partial month; terminations are credits
+        retro_month = rng.choice(len(RETRO_MONTH_WEIGHTS), size, p=RETRO_MONTH_WEIGHTS)
+        part = np.where(adjusted, rng.choice(3, size, p=[0.8, 0.1, 0.1]), 0)
+        coverage = np.where(adjusted, coverage_choices[1 + retro_month * 3 + part], coverage_choices[0])
+        adj_code = np.where(adjusted, np.asarray(ADJ_CODES, dtype=object)[
+            rng.choice(len(ADJ_CODES), size, p=ADJ_CODE_WEIGHTS)
+        ], None)
+        amounts = np.where(adj_code == 'TRM', -amounts, amounts)
+        amounts = np.where(part > 0, np.round(amounts / 2, 2), amounts)
+
+        yield pd.DataFrame({
+            'Policy': policy,
+            'Plan': plan_text,
+            'Customer Defined Sort': None,
+            'Subscriber Name': _subscriber_names(subscribers),
+            'Coverage Dates': coverage,
+            'ID': subscriber_ids,
+            'Status': 'A',
+            "Volume (000's)": volume,
+            'Charge Amount': amounts,
+            'Adj Code': adj_code,
+            'Coverage Type': tier_text,
+            'Benefit Group 1': benefit_group,
+            'Benefit Group 2': None,
+            'Benefit Group 3': None,
+        }, columns=INVOICE_COLUMNS)
+
+
+def write_invoice(path: str, plan_name: str, rows: int, seed: int = 0) -> str:
+    """Write a generated invoice to `path` (.csv or .xlsx); returns the path"""
+    if path.lower().endswith('.xlsx'):
+        if rows > XLSX_MAX_ROWS:
+            raise ValueError(f"xlsx holds at most {XLSX_MAX_ROWS} invoice rows; use .csv for {rows}")
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(INVOICE_COLUMNS)
+        for chunk in generate_invoice(plan_name, rows, seed):
+            for row in chunk.itertuples(index=False):
+                sheet.append(list(row))
+        workbook.save(path)
+        return path
+
+    with open(path, 'w', newline='') as output:
+        header = True
+        for chunk in generate_invoice(plan_name, rows, seed):
+            chunk.to_csv(output, header=header, index=False)
+            header = False
+    return path
+
+
+def invoice_path(directory: str, plan_name: str, rows: int, seed: int = 0, extension: str = 'csv') -> str:
+    """Cached file for (plan, rows, seed), generated on first use"""
+    os.makedirs(directory, exist_ok=True)
+    name = f"{plan_name}-{rows}-s{seed}-v{CACHE_VERSION}"
+    path = os.path.join(directory, f"{name}.{extension}")
+    if not os.path.exists(path):
+        # An interrupted run must not leave a truncated file behind
+        partial = os.path.join(directory, f"{name}.partial.{extension}")
+        write_invoice(partial, plan_name, rows, seed)
+        os.replace(partial, path)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generate')
+    parser.add_argument('plan_name', nargs='+', help='e.g. UHG-OCT-2024 UHC-2000-OCT-2024')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--out', default='bench_data')
+    args = parser.parse_args(argv)
+
+    for plan_name in args.plan_name:
+        print(invoice_path(args.out, plan_name, args.rows, args.seed, args.format))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Cold start benchmark for the API process.
+
+    python -m benchmarks.startup --runs 5
+
+Each run starts a fresh interpreter that imports `main`, then sends the
+first /health request and the first GraphQL query straight to the ASGI app
+(no server or HTTP client needed). Timings are printed as JSON, together
+with the heavy modules that were already loaded before the first upload.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow')
+DEFAULT_QUERY = '{ getUploadedFiles { planName } }'
+
+
+async def _asgi_request(app, method: str, path: str, body: bytes = b'') -> Tuple[int, bytes]:
+    """One request through the ASGI app; returns (status, body)"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'status': 0, 'body': b''}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], response['body']
+
+
+def _timed(fn, *args) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def measure(query: str) -> Dict[str, Any]:
+    """Runs in the child interpreter"""
+    import_seconds, main = _timed(__import__, 'main')
+    loaded_at_import = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    health_seconds, (health_status, _) = _timed(asyncio.run, _asgi_request(main.app, 'GET', '/health'))
+    payload = json.dumps({'query': query}).encode()
+    graphql_seconds, (graphql_status, _) = _timed(
+        asyncio.run, _asgi_request(main.app, 'POST', '/graphql', payload)
+    )
+    loaded_before_upload = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    # What the first upload pays for on top of that
+    ingest_seconds, _ = _timed(__import__, 'app.services.ingest')
+
+    return {
+        'import_main_s': import_seconds,
+        'first_health_s': health_seconds,
+        'first_graphql_s': graphql_seconds,
+        'ready_s': import_seconds + health_seconds + graphql_seconds,
+        'first_upload_import_s': ingest_seconds,
+        'health_status': health_status,
+        'graphql_status': graphql_status,
+        'heavy_modules_at_import': loaded_at_import,
+        'heavy_modules_before_upload': loaded_before_upload,
+    }
+
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    timings = [key for key in runs[0] if key.endswith('_s')]
+    return {
+        'runs': len(runs),
+        'timings': {
+            key: {
+                'min': min(run[key] for run in runs),
+                'median': statistics.median(run[key] for run in runs),
+                'max': max(run[key] for run in runs),
+            }
+            for key in timings
+        },
+        'health_status': runs[-1]['health_status'],
+        'graphql_status': runs[-1]['graphql_status'],
+        'heavy_modules_at_import': runs[-1]['heavy_modules_at_import'],
+        'heavy_modules_before_upload': runs[-1]['heavy_modules_before_upload'],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--query', default=DEFAULT_QUERY, help='GraphQL query sent as the first request')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.query)))
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--child', '--query', args.query],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        # The app may print to stdout; the measurement is the last line
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps(_summarize(runs), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,22 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from strawberry.fastapi import GraphQLRouter
 from sqlalchemy.orm import Session
 from app.schema import schema
-from app.database import engine, Base, get_db
+from app.database import check_schema_revision, engine, get_db
 from app.context import get_graphql_context
+from app.uploads import router as upload_router
+from app.exports import router as export_router
+from app.services.cache import start_invalidation_listener, stop_invalidation_listener
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from app.response_cache import GraphQLResponseCache
 
 app = FastAPI()
 
+# ETag / 304 caching of GraphQL query responses, invalidated by uploads and deletes.
+# Added first so CORS wraps it and 304s carry the CORS headers too
+app.add_middleware(GraphQLResponseCache)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -17,8 +26,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic (alembic upgrade head), not created at startup;
+# refuse to serve a database that is not at the latest revision
+@app.on_event("startup")
+def check_schema():
+    check_schema_revision()
+
+# Listen for dataset changes made by other worker processes
+@app.on_event("startup")
+def start_cache_invalidation():
+    start_invalidation_listener(engine)
+
+@app.on_event("shutdown")
+def stop_cache_invalidation():
+    stop_invalidation_listener()
 
 # Create GraphQL context
 async def get_context(db: Session = Depends(get_db)):
@@ -33,7 +54,18 @@ graphql_app = GraphQLRouter(
 # Include GraphQL routes
 app.include_router(graphql_app, prefix="/graphql")
 
+# Multipart upload route for files too large for the uploadFile mutation
+app.include_router(upload_router)
+
+# Streaming employee export (csv, xlsx, parquet)
+app.include_router(export_router)
+
 # Add a health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+# Prometheus metrics for this worker process
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,99 @@
+"""add_typed_coverage_columns
+
+Revision ID: 3f6c2a9d8e41
+Revises: be5ad3436ca3
+Create Date: 2026-10-17 13:26:05.118472
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a9d8e41'
+down_revision: Union[str, None] = 'be5ad3436ca3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_ROWS = 10000
+
+
+def _date(text):
+    """Strict MM/DD/YYYY, like the format='%m/%d/%Y' parse in split_coverage_dates"""
+    try:
+        return datetime.strptime(text.strip(), '%m/%d/%Y').date()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _coverage_values(coverage_dates):
+    """Same rules as app.services.ingest.split_coverage_dates, kept inline so the migration stays frozen"""
+    values = {'coverage_start': None, 'coverage_end': None, 'coverage_month': None, 'fiscal_year': None}
+    if not coverage_dates:
+        return values
+
+    ranges = coverage_dates.strip().split('-')
+    values['coverage_start'] = _date(ranges[0])
+    if len(ranges) > 1:
+        values['coverage_end'] = _date(ranges[1])
+
+    parts = ranges[0].strip().split('/')
+    if len(parts) == 3:
+        try:
+            month, year = int(parts[0]), int(parts[2])
+        except ValueError:
+            return values
+        values['fiscal_year'] = year + 1 if month >= 10 else year
+        # pandas only assembles four digit years into coverage_month
+        if 1 <= month <= 12 and 1000 <= year <= 9999:
+            values['coverage_month'] = date(year, month, 1)
+    return values
+
+
+def upgrade() -> None:
+    op.add_column('employees', sa.Column('coverage_start', sa.Date(), nullable=True))
+    op.add_column('employees', sa.Column('coverage_end', sa.Date(), nullable=True))
+    op.add_column('employees', sa.Column('coverage_month', sa.Date(), nullable=True))
+    op.add_column('employees', sa.Column('fiscal_year', sa.Integer(), nullable=True))
+
+    # Backfill in id order, one batch per statement, so only a batch of rows is
+    # in memory at a time. It all runs in the migration's transaction, so the
+    # updated rows stay locked until it commits: run it when nothing is loading
+    connection = op.get_bind()
+    update = sa.text("""
+        UPDATE employees
+        SET coverage_start = :coverage_start, coverage_end = :coverage_end,
+            coverage_month = :coverage_month, fiscal_year = :fiscal_year
+        WHERE id = :row_id
+    """)
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT id, coverage_dates FROM employees WHERE id > :last_id ORDER BY id LIMIT :batch"
+            ),
+            {'last_id': last_id, 'batch': BACKFILL_BATCH_ROWS}
+        ).fetchall()
+        if not rows:
+            break
+        params = [
+            dict(_coverage_values(coverage_dates), row_id=row_id)
+            for row_id, coverage_dates in rows
+        ]
+        connection.execute(update, params)
+        last_id = rows[-1][0]
+
+    op.create_index('idx_fiscal_year_plan', 'employees', ['fiscal_year', 'plan'], unique=False)
+    op.create_index('idx_coverage_month', 'employees', ['coverage_month'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_coverage_month', table_name='employees')
+    op.drop_index('idx_fiscal_year_plan', table_name='employees')
+    op.drop_column('employees', 'fiscal_year')
+    op.drop_column('employees', 'coverage_month')
+    op.drop_column('employees', 'coverage_end')
+    op.drop_column('employees', 'coverage_start')
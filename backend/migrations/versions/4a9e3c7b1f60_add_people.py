@@ -0,0 +1,126 @@
+"""add_people
+
+Revision ID: 4a9e3c7b1f60
+Revises: e2b7940a6c1d
+Create Date: 2026-10-17 16:20:54.381907
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9e3c7b1f60'
+down_revision: Union[str, None] = 'e2b7940a6c1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_ROWS = 10000
+FIRST_NAME_DISTANCE_RATIO = 0.66
+
+
+# Same rules as app.services.identity at this revision, kept inline so the migration stays frozen
+
+def _levenshtein_distance(a, b):
+    a, b = a.lower(), b.lower()
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _first_names_match(a, b):
+    max_len = max(len(a), len(b))
+    return max_len == 0 or _levenshtein_distance(a, b) / max_len <= FIRST_NAME_DISTANCE_RATIO
+
+
+def _parse_name(raw):
+    """(FIRST, LAST) from "12345 - John Doe", "Doe, John" or "John Doe" """
+    name = raw
+    if ' - ' in raw:
+        name = raw.split(' - ')[1].strip()
+    if ',' in name:
+        parts = name.split(',')
+        return parts[1].strip().upper(), parts[0].strip().upper()
+    parts = name.split(' ')
+    if len(parts) >= 2:
+        return parts[0].strip().upper(), ' '.join(parts[1:]).strip().upper()
+    return name.upper(), ''
+
+
+class _People:
+    """People found so far, blocked by last name; new_people[i] gets key i"""
+
+    def __init__(self):
+        self._blocks = defaultdict(list)
+        self.new_people = []  # (first, last)
+
+    def match(self, display_name, row_id):
+        first_name, last_name = _parse_name(display_name or f"Employee {row_id}")
+        for key, person_first_name in self._blocks[last_name]:
+            if _first_names_match(person_first_name, first_name):
+                return key
+        self.new_people.append((first_name, last_name))
+        key = len(self.new_people) - 1
+        self._blocks[last_name].append((key, first_name))
+        return key
+
+
+def upgrade() -> None:
+    people_table = op.create_table('people',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(), nullable=False),
+    sa.Column('last_name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_people_id'), 'people', ['id'], unique=False)
+    op.create_index(op.f('ix_people_last_name'), 'people', ['last_name'], unique=False)
+    op.add_column('employees', sa.Column('person_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('employees_person_id_fkey', 'employees', 'people', ['person_id'], ['id'], ondelete='SET NULL')
+
+    # Resolve every existing row in id order, as the Master view grouped them
+    connection = op.get_bind()
+    people = _People()
+    person_ids = []  # Database id of each person in people.new_people
+    update = sa.text("UPDATE employees SET person_id = :person_id WHERE id = :row_id")
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT id, subscriber_display_name FROM employees WHERE id > :last_id ORDER BY id LIMIT :batch"
+            ),
+            {'last_id': last_id, 'batch': BACKFILL_BATCH_ROWS}
+        ).fetchall()
+        if not rows:
+            break
+
+        assignments = [(row_id, people.match(display_name, row_id)) for row_id, display_name in rows]
+        new_people = people.new_people[len(person_ids):]
+        if new_people:
+            person_ids.extend(connection.execute(
+                people_table.insert().returning(people_table.c.id, sort_by_parameter_order=True),
+                [{'first_name': first, 'last_name': last} for first, last in new_people]
+            ).scalars().all())
+
+        connection.execute(update, [
+            {'row_id': row_id, 'person_id': person_ids[key]}
+            for row_id, key in assignments
+        ])
+        last_id = rows[-1][0]
+
+    op.create_index(op.f('ix_employees_person_id'), 'employees', ['person_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_employees_person_id'), table_name='employees')
+    op.drop_constraint('employees_person_id_fkey', 'employees', type_='foreignkey')
+    op.drop_column('employees', 'person_id')
+    op.drop_index(op.f('ix_people_last_name'), table_name='people')
+    op.drop_index(op.f('ix_people_id'), table_name='people')
+    op.drop_table('people')
@@ -0,0 +1,35 @@
+"""partition_employees_by_file
+
+Revision ID: 5c8e1d94a7b2
+Revises: 9b0d6e2f4a83
+Create Date: 2026-10-17 18:12:07.530916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.partitions import check_employee_files, partition_employees, unpartition_employees
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e1d94a7b2'
+down_revision: Union[str, None] = '9b0d6e2f4a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every row needs a file to be partitioned by
+    check_employee_files(op.get_bind())
+    op.alter_column('employees', 'insurance_file_id', existing_type=sa.Integer(), nullable=False)
+
+    # Postgres only: one partition per insurance file, existing indexes rebuilt in each.
+    # Rewrites the table under an exclusive lock, so run it outside business hours.
+    partition_employees(op.get_bind())
+
+
+def downgrade() -> None:
+    unpartition_employees(op.get_bind())
+    op.alter_column('employees', 'insurance_file_id', existing_type=sa.Integer(), nullable=True)
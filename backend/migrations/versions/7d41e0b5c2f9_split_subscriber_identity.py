@@ -0,0 +1,61 @@
+"""split_subscriber_identity
+
+Revision ID: 7d41e0b5c2f9
+Revises: 3f6c2a9d8e41
+Create Date: 2026-10-17 14:02:18.540316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41e0b5c2f9'
+down_revision: Union[str, None] = '3f6c2a9d8e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_ROWS = 10000
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('employees')}
+    indexes = {index['name'] for index in inspector.get_indexes('employees')}
+
+    # 8aa7d574e1f5 added subscriber_id on databases built through Alembic, but
+    # tables created by metadata.create_all never had it
+    if 'subscriber_id' not in columns:
+        op.add_column('employees', sa.Column('subscriber_id', sa.String(), nullable=True))
+    op.add_column('employees', sa.Column('subscriber_display_name', sa.String(), nullable=True))
+
+    # Same split as app.services.ingest.split_subscriber, one id range per statement
+    connection = op.get_bind()
+    min_id, max_id = connection.execute(sa.text("SELECT min(id), max(id) FROM employees")).fetchone()
+    if min_id is not None:
+        for start in range(min_id, max_id + 1, BACKFILL_BATCH_ROWS):
+            connection.execute(
+                sa.text("""
+                    UPDATE employees
+                    SET subscriber_id = trim(split_part(subscriber_name, ' - ', 1)),
+                        subscriber_display_name = NULLIF(trim(split_part(subscriber_name, ' - ', 2)), '')
+                    WHERE id >= :start AND id < :stop
+                """),
+                {'start': start, 'stop': start + BACKFILL_BATCH_ROWS}
+            )
+
+    # The composite index serves subscriber_id lookups too
+    if 'ix_employees_subscriber_id' in indexes:
+        op.drop_index('ix_employees_subscriber_id', table_name='employees')
+    op.create_index(
+        'idx_subscriber_id_latest', 'employees',
+        ['subscriber_id', sa.text('id DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_subscriber_id_latest', table_name='employees')
+    op.create_index(op.f('ix_employees_subscriber_id'), 'employees', ['subscriber_id'], unique=False)
+    op.drop_column('employees', 'subscriber_display_name')
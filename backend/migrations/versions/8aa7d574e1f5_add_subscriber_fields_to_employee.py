@@ -19,22 +19,20 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade():
-    # Add new columns
-    op.add_column('employees', sa.Column('subscriber_id', sa.String(), nullable=True))
-    op.add_column('employees', sa.Column('subscriber_name', sa.String(), nullable=True))
-    
-    # Update existing data to copy subscriber_name from the existing field
-    op.execute("UPDATE employees SET subscriber_id = subscriber_name")
-    op.execute("UPDATE employees SET subscriber_name = subscriber_name")
-    
-    # Create indexes for the new columns
-    op.create_index(op.f('ix_employees_subscriber_id'), 'employees', ['subscriber_id'], unique=False)
-    op.create_index(op.f('ix_employees_subscriber_name'), 'employees', ['subscriber_name'], unique=False)
+    # subscriber_name and its index come from the initial migration; adding them
+    # again failed on a fresh database
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('employees')}
+    indexes = {index['name'] for index in inspector.get_indexes('employees')}
+
+    if 'subscriber_id' not in columns:
+        op.add_column('employees', sa.Column('subscriber_id', sa.String(), nullable=True))
+        op.execute("UPDATE employees SET subscriber_id = subscriber_name")
+    if 'ix_employees_subscriber_id' not in indexes:
+        op.create_index(op.f('ix_employees_subscriber_id'), 'employees', ['subscriber_id'], unique=False)
 
 
 def downgrade():
-    # Drop the added columns
-    op.drop_index(op.f('ix_employees_subscriber_name'), table_name='employees')
+    # subscriber_name stays: the initial migration owns it
     op.drop_index(op.f('ix_employees_subscriber_id'), table_name='employees')
-    op.drop_column('employees', 'subscriber_name')
     op.drop_column('employees', 'subscriber_id')
@@ -0,0 +1,45 @@
+"""add_dataset_changes
+
+Revision ID: 9b0d6e2f4a83
+Revises: 4a9e3c7b1f60
+Create Date: 2026-10-17 17:05:33.912450
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b0d6e2f4a83'
+down_revision: Union[str, None] = '4a9e3c7b1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dataset_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('insurance_file_id', sa.Integer(), nullable=False),
+    sa.Column('plan_name', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dataset_changes_id'), 'dataset_changes', ['id'], unique=False)
+    op.create_index(op.f('ix_dataset_changes_insurance_file_id'), 'dataset_changes', ['insurance_file_id'], unique=False)
+
+    # Files loaded before the log existed count as inserted at the first versions
+    op.execute("""
+        INSERT INTO dataset_changes (action, insurance_file_id, plan_name, created_at)
+        SELECT 'inserted', id, plan_name, upload_date
+        FROM insurance_files
+        ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_dataset_changes_insurance_file_id'), table_name='dataset_changes')
+    op.drop_index(op.f('ix_dataset_changes_id'), table_name='dataset_changes')
+    op.drop_table('dataset_changes')
@@ -0,0 +1,46 @@
+"""add_missing_model_indexes
+
+Revision ID: a7c3e9f1b254
+Revises: f1c8a3e5b702
+Create Date: 2026-10-18 14:05:31.417092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1b254'
+down_revision: Union[str, None] = 'f1c8a3e5b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes the models have declared since before the schema moved to Alembic. Tables
+# built by create_all have them; databases built by the migrations did not
+MODEL_INDEXES = [
+    ('insurance_files', 'ix_insurance_files_upload_date', ['upload_date']),
+    ('insurance_files', 'idx_month_year', ['month', 'year']),
+    ('employees', 'ix_employees_insurance_file_id', ['insurance_file_id']),
+    ('employees', 'idx_file_id_plan', ['insurance_file_id', 'plan']),
+    ('employees', 'idx_plan_month_year', ['plan', 'month', 'year']),
+    ('employees', 'idx_year_month', ['year', 'month']),
+    ('employees', 'idx_charge_year_month', ['charge_amount', 'year', 'month']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in {table for table, _, _ in MODEL_INDEXES}
+    }
+    for table, name, columns in MODEL_INDEXES:
+        if name not in existing[table]:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    # Kept: databases built by create_all had them before this revision
+    pass
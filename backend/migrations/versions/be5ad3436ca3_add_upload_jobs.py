@@ -0,0 +1,50 @@
+"""add_upload_jobs
+
+Revision ID: be5ad3436ca3
+Revises: ea21e43d3ce4
+Create Date: 2026-10-17 11:03:47.915530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be5ad3436ca3'
+down_revision: Union[str, None] = 'ea21e43d3ce4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('upload_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('plan_name', sa.String(), nullable=True),
+    sa.Column('file_name', sa.String(), nullable=True),
+    sa.Column('content', sa.LargeBinary(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('rows_parsed', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.JSON(), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_jobs_id'), 'upload_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_upload_jobs_plan_name'), 'upload_jobs', ['plan_name'], unique=False)
+    op.create_index(op.f('ix_upload_jobs_created_at'), 'upload_jobs', ['created_at'], unique=False)
+    op.create_index('idx_upload_jobs_status_id', 'upload_jobs', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_upload_jobs_status_id', table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_created_at'), table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_plan_name'), table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_id'), table_name='upload_jobs')
+    op.drop_table('upload_jobs')
@@ -0,0 +1,38 @@
+"""add_employee_search_document
+
+Revision ID: c58a1f93d7b2
+Revises: 7d41e0b5c2f9
+Create Date: 2026-10-17 14:48:40.226193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58a1f93d7b2'
+down_revision: Union[str, None] = '7d41e0b5c2f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = (
+    "coalesce(subscriber_name, '') || ' | ' || coalesce(coverage_type, '') || ' | ' || "
+    "coalesce(plan, '') || ' | ' || coalesce(status, '') || ' | ' || coalesce(coverage_dates, '')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Stored generated column: Postgres fills it for existing rows while adding it
+    op.add_column('employees', sa.Column('search_document', sa.Text(), sa.Computed(SEARCH_DOCUMENT, persisted=True), nullable=True))
+    op.create_index(
+        'idx_employee_search_trgm', 'employees', ['search_document'], unique=False,
+        postgresql_using='gin', postgresql_ops={'search_document': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_employee_search_trgm', table_name='employees')
+    op.drop_column('employees', 'search_document')
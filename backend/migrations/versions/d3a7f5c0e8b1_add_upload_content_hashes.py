@@ -0,0 +1,31 @@
+"""add_upload_content_hashes
+
+Revision ID: d3a7f5c0e8b1
+Revises: 5c8e1d94a7b2
+Create Date: 2026-10-17 19:26:41.208733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7f5c0e8b1'
+down_revision: Union[str, None] = '5c8e1d94a7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Files loaded before this have no hash; their first re-upload is diffed row by row
+    op.add_column('insurance_files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_insurance_files_content_hash'), 'insurance_files', ['content_hash'], unique=False)
+    op.add_column('upload_jobs', sa.Column('replace_existing', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_jobs', 'replace_existing')
+    op.drop_index(op.f('ix_insurance_files_content_hash'), table_name='insurance_files')
+    op.drop_column('insurance_files', 'content_hash')
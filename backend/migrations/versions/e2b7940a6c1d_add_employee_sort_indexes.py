@@ -0,0 +1,30 @@
+"""add_employee_sort_indexes
+
+Revision ID: e2b7940a6c1d
+Revises: c58a1f93d7b2
+Create Date: 2026-10-17 15:31:12.604857
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7940a6c1d'
+down_revision: Union[str, None] = 'c58a1f93d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_employee_name_id', 'employees', [sa.text("coalesce(subscriber_display_name, '')"), 'id'], unique=False)
+    op.create_index('idx_employee_charge_id', 'employees', ['charge_amount', 'id'], unique=False)
+    op.create_index('idx_employee_coverage_month_id', 'employees', [sa.text("coalesce(coverage_month, '0001-01-01')"), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_employee_coverage_month_id', table_name='employees')
+    op.drop_index('idx_employee_charge_id', table_name='employees')
+    op.drop_index('idx_employee_name_id', table_name='employees')
@@ -0,0 +1,27 @@
+"""store_upload_job_files_on_disk
+
+Revision ID: e6b2c9a4d1f7
+Revises: d3a7f5c0e8b1
+Create Date: 2026-10-18 09:14:52.306118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2c9a4d1f7'
+down_revision: Union[str, None] = 'd3a7f5c0e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # New jobs keep their upload in UPLOAD_DIR; content is only read for jobs already queued
+    op.add_column('upload_jobs', sa.Column('content_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_jobs', 'content_path')
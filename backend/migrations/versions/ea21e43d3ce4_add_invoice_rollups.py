@@ -0,0 +1,73 @@
+"""add_invoice_rollups
+
+Revision ID: ea21e43d3ce4
+Revises: 8aa7d574e1f5
+Create Date: 2026-10-17 09:12:31.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ea21e43d3ce4'
+down_revision: Union[str, None] = '8aa7d574e1f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('invoice_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('insurance_file_id', sa.Integer(), nullable=False),
+    sa.Column('plan', sa.String(), nullable=False),
+    sa.Column('fiscal_year', sa.Integer(), nullable=False),
+    sa.Column('current_month_total', sa.Float(), nullable=False),
+    sa.Column('previous_months_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['insurance_file_id'], ['insurance_files.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invoice_rollups_id'), 'invoice_rollups', ['id'], unique=False)
+    op.create_index('idx_rollup_file_plan_fiscal', 'invoice_rollups', ['insurance_file_id', 'plan', 'fiscal_year'], unique=True)
+    op.create_index('idx_rollup_plan', 'invoice_rollups', ['plan'], unique=False)
+
+    # Backfill from existing rows, using the same coverage date parsing and
+    # fiscal year rules as InsuranceService.process_file
+    op.execute(r"""
+        INSERT INTO invoice_rollups (insurance_file_id, plan, fiscal_year, current_month_total, previous_months_total)
+        SELECT
+            p.insurance_file_id,
+            p.plan,
+            CASE WHEN p.coverage_month >= 10 THEN p.coverage_year + 1 ELSE p.coverage_year END AS fiscal_year,
+            COALESCE(SUM(CASE WHEN p.coverage_month = p.file_month AND p.coverage_year = p.file_year
+                              THEN p.charge_amount ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN p.coverage_month = p.file_month AND p.coverage_year = p.file_year
+                              THEN 0 ELSE p.charge_amount END), 0)
+        FROM (
+            SELECT
+                e.insurance_file_id,
+                e.plan,
+                e.charge_amount,
+                f.year AS file_year,
+                array_position(
+                    ARRAY['JAN','FEB','MAR','APR','MAY','JUN','JUL','AUG','SEP','OCT','NOV','DEC'],
+                    upper(f.month)::text
+                ) AS file_month,
+                split_part(split_part(trim(e.coverage_dates), '-', 1), '/', 1)::int AS coverage_month,
+                split_part(split_part(trim(e.coverage_dates), '-', 1), '/', 3)::int AS coverage_year
+            FROM employees e
+            JOIN insurance_files f ON f.id = e.insurance_file_id
+            WHERE split_part(trim(e.coverage_dates), '-', 1) ~ '^\s*[+-]?\d+\s*/[^/]*/\s*[+-]?\d+\s*$'
+        ) p
+        WHERE p.plan IS NOT NULL
+        GROUP BY p.insurance_file_id, p.plan, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_rollup_plan', table_name='invoice_rollups')
+    op.drop_index('idx_rollup_file_plan_fiscal', table_name='invoice_rollups')
+    op.drop_index(op.f('ix_invoice_rollups_id'), table_name='invoice_rollups')
+    op.drop_table('invoice_rollups')
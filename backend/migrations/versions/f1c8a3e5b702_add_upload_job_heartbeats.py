@@ -0,0 +1,28 @@
+"""add_upload_job_heartbeats
+
+Revision ID: f1c8a3e5b702
+Revises: e6b2c9a4d1f7
+Create Date: 2026-10-18 09:48:20.775164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8a3e5b702'
+down_revision: Union[str, None] = 'e6b2c9a4d1f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.add_column('upload_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_jobs', 'attempts')
+    op.drop_column('upload_jobs', 'heartbeat_at')
@@ -0,0 +1,52 @@
+"""
+The tests run the app against a throwaway SQLite database. The migrations
+are written for Postgres, so tables come from the models instead.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Before anything imports app.database, which reads them once
+_TEST_DIR = tempfile.mkdtemp(prefix='insurance-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TEST_DIR, 'test.db')
+os.environ.pop('ASYNC_DATABASE_URL', None)
+os.environ['UPLOAD_DIR'] = os.path.join(_TEST_DIR, 'uploads')
+
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created, empty tables"""
+    import app.models  # noqa: F401  (registers the tables)
+    from app.database import Base, SessionLocal, engine
+    from app.services.cache import result_cache
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # Cached results of earlier tests were keyed by the versions of their data
+    result_cache.bump()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """The API on empty tables, marked as migrated to head so startup accepts them"""
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+    import main
+
+    config = Config(os.path.join(BACKEND_DIR, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(BACKEND_DIR, 'migrations'))
+    command.stamp(config, 'head')
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,87 @@
+import io
+
+import pandas as pd
+
+from app.models import InsuranceFile
+from app.services.changes import changes_since, current_version
+from app.services.insurance_analytics import InsuranceService
+
+HEADER = ['Policy', 'Plan', 'Subscriber Name', 'Coverage Dates', 'Status', 'Charge Amount', 'Coverage Type']
+PLAN = 'EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000'
+
+CHANGES_QUERY = '''
+    query($since: Int!) {
+        getEmployeeChanges(sinceVersion: $since) {
+            version changed reset insertedInsuranceFileIds removedInsuranceFileIds
+            insertedEmployees { subscriberId chargeAmount insuranceFileId }
+        }
+    }
+'''
+
+
+def _load(db, plan_name, amount='10.00', replace=False):
+    rows = [['0924216', PLAN, '10001 - DOE, JANE', '11/01/2024-11/30/2024', 'A', amount, 'EE']]
+    buffer = io.BytesIO(pd.DataFrame([HEADER] + rows).to_csv(header=False, index=False).encode())
+    assert InsuranceService(db).process_file_buffer(buffer, plan_name, replace=replace)['success']
+    return db.query(InsuranceFile.id).filter_by(plan_name=plan_name).scalar()
+
+
+def test_versions_count_loads_and_deletes(db):
+    assert current_version(db) == 0
+    assert changes_since(db, 0) == {
+        'version': 0, 'changed': False, 'reset': False, 'inserted_file_ids': [], 'removed_file_ids': []
+    }
+
+    october = _load(db, 'UHC-3000-OCT-2024')
+    november = _load(db, 'UHC-3000-NOV-2024')
+    assert current_version(db) == 2
+    assert changes_since(db, 0)['inserted_file_ids'] == [october, november]
+    assert changes_since(db, 1)['inserted_file_ids'] == [november]
+    assert changes_since(db, 2)['changed'] is False
+
+    InsuranceService(db).delete_file('UHC-3000-OCT-2024')
+    changes = changes_since(db, 2)
+    assert (changes['version'], changes['inserted_file_ids'], changes['removed_file_ids']) == (3, [], [october])
+
+
+def test_file_loaded_and_deleted_within_the_window_is_not_reported(db):
+    _load(db, 'UHC-3000-OCT-2024')
+    InsuranceService(db).delete_file('UHC-3000-OCT-2024')
+
+    changes = changes_since(db, 0)
+    assert changes['changed'] is True
+    assert (changes['inserted_file_ids'], changes['removed_file_ids']) == ([], [])
+
+
+def test_replaced_file_is_removed_and_inserted_again(db):
+    october = _load(db, 'UHC-3000-OCT-2024')
+    _load(db, 'UHC-3000-OCT-2024', amount='12.00', replace=True)
+
+    changes = changes_since(db, 1)
+    assert (changes['inserted_file_ids'], changes['removed_file_ids']) == ([october], [october])
+
+
+def test_unknown_version_resets(db):
+    october = _load(db, 'UHC-3000-OCT-2024')
+
+    changes = changes_since(db, 99)
+    assert (changes['reset'], changes['version'], changes['inserted_file_ids']) == (True, 1, [october])
+
+
+def test_get_employee_changes(client, db):
+    def poll(since):
+        return client.post('/graphql', json={'query': CHANGES_QUERY, 'variables': {'since': since}}).json()[
+            'data']['getEmployeeChanges']
+
+    october = _load(db, 'UHC-3000-OCT-2024')
+    first = poll(0)
+    assert (first['version'], first['insertedInsuranceFileIds']) == (1, [october])
+    assert first['insertedEmployees'] == [{'subscriberId': '10001', 'chargeAmount': 10.0, 'insuranceFileId': october}]
+
+    assert poll(first['version'])['changed'] is False
+
+    InsuranceService(db).delete_file('UHC-3000-OCT-2024')
+    november = _load(db, 'UHC-3000-NOV-2024')
+    later = poll(first['version'])
+    assert later['version'] == 3
+    assert (later['insertedInsuranceFileIds'], later['removedInsuranceFileIds']) == ([november], [october])
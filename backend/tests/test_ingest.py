@@ -0,0 +1,73 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.ingest import find_header_row, parse_invoice, read_invoice
+
+# The carrier files checked into the repository
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'Data')
+
+HEADER = [
+    'Policy', 'Plan', 'Customer Defined Sort', 'Subscriber Name', 'Coverage Dates', 'ID', 'Status',
+    "Volume (000's)", 'Charge Amount', 'Adj Code', 'Coverage Type', 'Benefit Group 1'
+]
+ROWS = [
+    ['0924216', 'EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000', '', 'DOE, JANE', '11/01/2024-11/30/2024',
+     '12345', 'ACTIVE', '', '512.40', '', 'EE', ''],
+    ['0924216', 'EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000', '', 'ROE, RICHARD', '10/01/2024-10/31/2024',
+     '12346', 'ACTIVE', '', 'n/a', 'ADD', 'EE', ''],
+]
+
+
+def _csv(rows) -> io.BytesIO:
+    return io.BytesIO(pd.DataFrame(rows).to_csv(header=False, index=False).encode())
+
+
+def _xlsx(rows) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, header=False, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize('write', [_csv, _xlsx])
+def test_header_on_first_line(write):
+    df = read_invoice(write([HEADER] + ROWS))
+
+    assert 'charge amount' in df.columns
+    parsed = parse_invoice(df, 'UHC-3000-NOV-2024')
+    assert len(parsed['employees']) == 1
+    # Header on line 1, so the second data row is line 3
+    assert [error['row'] for error in parsed['errors']] == [3]
+
+
+@pytest.mark.parametrize('write', [_csv, _xlsx])
+def test_title_line_above_header(write):
+    title = ['UHC-3000 invoice, November 2024'] + [''] * (len(HEADER) - 1)
+    df = read_invoice(write([title, HEADER] + ROWS))
+
+    assert 'charge amount' in df.columns
+    parsed = parse_invoice(df, 'UHC-3000-NOV-2024')
+    assert len(parsed['employees']) == 1
+    assert [error['row'] for error in parsed['errors']] == [4]
+
+
+def test_no_known_header_reports_first_row():
+    assert find_header_row([['a', 'b'], ['c', 'd']]) == 0
+    df = read_invoice(_csv([['Policy', 'Total'], ['1', '2']]))
+    with pytest.raises(ValueError, match='No amount column found'):
+        parse_invoice(df, 'UHC-3000-NOV-2024')
+
+
+@pytest.mark.parametrize('file_name', ['UHC-2000-NOV-2024.xlsx', 'UHC-3000-NOV-2024.xlsx'])
+def test_carrier_files(file_name):
+    path = os.path.join(DATA_DIR, 'NOV', file_name)
+    if not os.path.exists(path):
+        pytest.skip(f"{path} is not available")
+    with open(path, 'rb') as file_buffer:
+        parsed = parse_invoice(read_invoice(file_buffer), os.path.splitext(file_name)[0])
+
+    assert len(parsed['employees']) > 0
+    assert parsed['errors'] == []
@@ -0,0 +1,126 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.models import Employee
+from app.services.insurance_analytics import InsuranceService
+from app.services.pagination import decode_cursor, encode_cursor
+
+HEADER = ['Policy', 'Plan', 'Subscriber Name', 'Coverage Dates', 'Status', 'Charge Amount', 'Coverage Type']
+PLAN = 'EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000'
+
+# Ties on every sort key, subscribers without a display name (NULL) and
+# coverage dates that do not parse (NULL coverage month)
+ROWS = [
+    ['10001 - DOE, JANE', '11/01/2024-11/30/2024', '10.00'],
+    ['10002 - DOE, JANE', '10/01/2024-10/31/2024', '10.00'],
+    ['10003 - ROE, RICH', '11/01/2024-11/30/2024', '25.50'],
+    ['10004', '11/01/2024-11/30/2024', '10.00'],
+    ['10005', '09/01/2024-09/30/2024', '-5.00'],
+    ['10006 - ABLE, ANN', 'n/a', '25.50'],
+    ['10007 - ABLE, ANN', 'n/a', '0.00'],
+    ['10008 - ZED, ZOE', '10/01/2024-10/31/2024', '-5.00'],
+    ['10009 - DOE, JANE', '09/01/2024-09/30/2024', '99.99'],
+    ['10010', 'n/a', '10.00'],
+]
+
+SORT_KEYS = {
+    'name': lambda emp: emp.subscriber_display_name or '',
+    'month': lambda emp: emp.coverage_month or date(1, 1, 1),
+    'chargeAmount': lambda emp: emp.charge_amount,
+    None: lambda emp: 0,
+}
+
+
+@pytest.mark.parametrize('values', [
+    [12.5, 1],
+    ['', 2],
+    ['DOE, JANE', 3],
+    ['ÅSTRÖM, ÉMILE', 4],
+    ['2024-11-01', 5],
+    [None, 6],
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+    assert cursor.isascii() and '/' not in cursor and '+' not in cursor
+    assert decode_cursor(cursor) == values
+
+
+def test_cursor_of_a_date_is_its_iso_text():
+    assert decode_cursor(encode_cursor([date(2024, 11, 1), 7])) == ['2024-11-01', 7]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor({'a': 1})[:-2], 'eyJhIjoxfQ=='])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor)
+
+
+@pytest.fixture
+def employees(db):
+    frame = pd.DataFrame([HEADER] + [['0924216', PLAN, name, dates, 'A', amount, 'EE'] for name, dates, amount in ROWS])
+    buffer = io.BytesIO(frame.to_csv(header=False, index=False).encode())
+    assert InsuranceService(db).process_file_buffer(buffer, "UHC-3000-NOV-2024")["success"]
+    return db.query(Employee).all()
+
+
+@pytest.mark.parametrize('sort_by', ['name', 'month', 'chargeAmount', None])
+@pytest.mark.parametrize('sort_direction', ['asc', 'desc'])
+@pytest.mark.parametrize('limit', [1, 3, 4, 10])
+def test_cursor_pages_cover_every_row_once(db, employees, sort_by, sort_direction, limit):
+    descending = sort_direction == 'desc'
+    expected = [
+        emp.id for emp in sorted(employees, key=lambda emp: (SORT_KEYS[sort_by](emp), emp.id), reverse=descending)
+    ]
+    service = InsuranceService(db)
+
+    seen, after = [], None
+    while True:
+        page = service.get_employee_details(
+            limit=limit, sort_by=sort_by, sort_direction=sort_direction, after=after
+        )
+        assert page['total'] == len(ROWS)
+        seen += [emp['id'] for emp in page['employees']]
+        if len(page['employees']) < limit:
+            break
+        after = page['employees'][-1]['cursor']
+        assert len(seen) <= len(ROWS)
+
+    assert seen == expected
+    # Offset pages agree with the cursor pages
+    first_page = service.get_employee_details(limit=limit, sort_by=sort_by, sort_direction=sort_direction)
+    assert [emp['id'] for emp in first_page['employees']] == expected[:limit]
+
+
+def test_page_after_the_last_row_is_empty(db, employees):
+    service = InsuranceService(db)
+    last = service.get_employee_details(limit=len(ROWS), sort_by='name', sort_direction='asc')['employees'][-1]
+
+    assert service._employee_page(
+        db.query(Employee), 'all', 1, 5, None, 'name', 'asc', last['cursor']
+    )['employees'] == []
+
+
+def test_unknown_sort_and_malformed_cursor_are_refused(db, employees):
+    service = InsuranceService(db)
+    with pytest.raises(ValueError, match='Unknown sort'):
+        service._employee_page(db.query(Employee), 'all', 1, 5, None, 'plan', 'asc', None)
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        service._employee_page(db.query(Employee), 'all', 1, 5, None, 'name', 'asc', encode_cursor(['DOE, JANE']))
+
+
+def test_unique_employees_page_by_cursor(db, employees):
+    service = InsuranceService(db)
+    expected = [emp.id for emp in sorted(employees, key=lambda emp: (emp.charge_amount, emp.id), reverse=True)]
+
+    seen, after = [], None
+    for _ in range(len(ROWS)):
+        page = service.get_unique_employees(limit=4, sort_by='chargeAmount', after=after)
+        seen += [emp['id'] for emp in page['employees']]
+        if len(page['employees']) < 4:
+            break
+        after = page['employees'][-1]['cursor']
+
+    assert seen == expected
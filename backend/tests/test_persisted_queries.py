@@ -0,0 +1,106 @@
+import asyncio
+import json
+from collections import OrderedDict
+
+import pytest
+import strawberry
+
+from app.persisted_queries import (
+    PersistedQueries, PersistedQueryStore, load_manifest, persisted_queries, query_hash
+)
+
+QUERY = '{ getUploadedFiles { planName } }'
+
+
+def _persisted(sha256_hash, version=1):
+    return {'persistedQuery': {'version': version, 'sha256Hash': sha256_hash}}
+
+
+def _post(client, query=None, extensions=None):
+    return client.post('/graphql', json={'query': query, 'extensions': extensions}).json()
+
+
+def _code(body):
+    return body['errors'][0]['extensions']['code']
+
+
+def test_store_evicts_least_recently_used_but_keeps_preloaded():
+    store = PersistedQueryStore(max_entries=2, preloaded={'p': '{ p }'})
+    store.register('a', '{ a }')
+    store.register('b', '{ b }')
+    assert store.get('a') == '{ a }'  # now the most recently used
+    store.register('c', '{ c }')
+
+    assert (store.get('a'), store.get('b'), store.get('c')) == ('{ a }', None, '{ c }')
+    assert store.get('p') == '{ p }'
+    store.register('p', '{ changed }')
+    assert store.get('p') == '{ p }'
+
+
+def test_allow_list_store_registers_nothing():
+    store = PersistedQueryStore(preloaded={'p': '{ p }'}, allow_list_only=True)
+    store.register('a', '{ a }')
+
+    assert store.get('a') is None
+    assert store.allows('p') and not store.allows('a')
+
+
+@pytest.mark.parametrize('manifest', [
+    {query_hash(QUERY): QUERY},
+    {'format': 'apollo-persisted-query-manifest', 'version': 1,
+     'operations': [{'id': query_hash(QUERY), 'name': 'Files', 'type': 'query', 'body': QUERY}]},
+])
+def test_load_manifest(tmp_path, manifest):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(manifest))
+
+    assert load_manifest(str(path)) == {query_hash(QUERY): QUERY}
+
+
+def test_hash_is_registered_once_the_query_is_sent(client, monkeypatch):
+    monkeypatch.setattr(persisted_queries, '_entries', OrderedDict())
+    sha256_hash = query_hash(QUERY)
+
+    assert _code(_post(client, extensions=_persisted(sha256_hash))) == 'PERSISTED_QUERY_NOT_FOUND'
+    assert _post(client, QUERY, _persisted(sha256_hash))['data'] == {'getUploadedFiles': []}
+
+    by_hash = client.get('/graphql', params={'extensions': json.dumps(_persisted(sha256_hash))},
+                         headers={'accept': 'application/json'})
+    assert by_hash.json()['data'] == {'getUploadedFiles': []}
+
+
+def test_invalid_documents_are_not_registered(client, monkeypatch):
+    monkeypatch.setattr(persisted_queries, '_entries', OrderedDict())
+    invalid = '{ noSuchField }'
+
+    assert _post(client, invalid, _persisted(query_hash(invalid)))['errors']
+    assert persisted_queries.get(query_hash(invalid)) is None
+
+
+@pytest.mark.parametrize('query, extensions, code', [
+    (QUERY, _persisted(query_hash('{ other }')), 'PERSISTED_QUERY_HASH_MISMATCH'),
+    (QUERY, _persisted(query_hash(QUERY), version=2), 'PERSISTED_QUERY_UNSUPPORTED'),
+    (None, {'persistedQuery': {'version': 1}}, 'PERSISTED_QUERY_UNSUPPORTED'),
+])
+def test_malformed_persisted_queries_are_refused(client, query, extensions, code):
+    assert _code(_post(client, query, extensions)) == code
+
+
+def test_allow_list_only_accepts_preloaded_queries():
+    @strawberry.type
+    class Query:
+        @strawberry.field
+        def answer(self) -> int:
+            return 42
+
+    allowed = '{ answer }'
+    store = PersistedQueryStore(preloaded={query_hash(allowed): allowed}, allow_list_only=True)
+    schema = strawberry.Schema(query=Query, extensions=[lambda: PersistedQueries(store)])
+
+    async def run(query, sha256_hash=None):
+        extensions = _persisted(sha256_hash) if sha256_hash else None
+        return await schema.execute(query, operation_extensions=extensions)
+
+    assert asyncio.run(run(None, query_hash(allowed))).data == {'answer': 42}
+    for result in (asyncio.run(run(allowed)), asyncio.run(run('{ __typename }', query_hash('{ __typename }')))):
+        assert result.errors[0].extensions['code'] == 'PERSISTED_QUERY_NOT_ALLOWED'
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from graphql import parse
+
+from app import query_cost
+from app.query_cost import MAX_COST, estimate_cost
+
+
+def _cost(query, variables=None, operation_name=None):
+    return estimate_cost(parse(query), operation_name, variables)
+
+
+@pytest.mark.parametrize('query, cost', [
+    ('{ getUploadedFiles { planName } }', 1),
+    ('{ getFiscalYearTotals { fiscal2024Total } getInvoiceData { planType } }', 2 + 5),
+    ('{ getAllEmployees { id } }', 200),
+    # Every alias runs the resolver again
+    ('{ a: getAllEmployees { id } b: getAllEmployees { id } }', 400),
+    # Nested fields are free unless they do their own work
+    ('mutation { uploadFile(fileInput: {name: "a", content: "", planName: "a"}) '
+     '{ success insertedEmployees { id } } }', 20 + 50),
+])
+def test_field_costs(query, cost):
+    assert _cost(query) == cost
+
+
+@pytest.mark.parametrize('arguments, cost', [
+    ('', 1 + 1),
+    ('(limit: 100)', 1 + 1),
+    ('(limit: 101)', 1 + 2),
+    ('(limit: 1000)', 1 + 10),
+    # Clamped to the largest page the service returns, and to one row
+    ('(limit: 100000)', 1 + 10),
+    ('(limit: -5)', 1 + 1),
+    ('(limit: $limit)', 1 + 5),
+])
+def test_paginated_fields_scale_with_limit(arguments, cost):
+    query = f'query($limit: Int) {{ getEmployeeDetails{arguments} {{ total }} }}'
+    assert _cost(query, {'limit': 500}) == cost
+
+
+def test_fragments_are_counted_where_they_are_spread():
+    query = '''
+        query Two { ...Everyone ... on Query { getEmployeeGroups { personId } } }
+        query Other { getUploadedFiles { planName } }
+        fragment Everyone on Query { getAllEmployees { id } }
+    '''
+    assert _cost(query, operation_name='Two') == 200 + 100
+    assert _cost(query, operation_name='Other') == 1
+
+
+def test_fragment_cycles_terminate():
+    query = '''
+        { ...A }
+        fragment A on Query { getAllEmployees { id } ...B }
+        fragment B on Query { ...A }
+    '''
+    assert _cost(query) == 200
+
+
+def test_too_expensive_query_is_refused(client):
+    aliases = ' '.join(f'e{i}: getAllEmployees {{ id }}' for i in range(MAX_COST // 200 + 1))
+
+    response = client.post('/graphql', json={'query': f'{{ {aliases} }}'})
+
+    error = response.json()['errors'][0]
+    assert error['extensions']['code'] == 'QUERY_TOO_EXPENSIVE'
+    assert error['extensions']['cost'] > MAX_COST
+    assert response.json().get('data') is None
+
+
+def test_expensive_queries_wait_for_a_slot(monkeypatch):
+    from app.schema import schema
+
+    async def run():
+        # Every slot taken: only cheap operations get through
+        monkeypatch.setattr(query_cost, '_expensive_slots', asyncio.Semaphore(0))
+        cheap = await asyncio.wait_for(schema.execute('{ __typename }'), timeout=5)
+        assert cheap.data == {'__typename': 'Query'}
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(schema.execute('{ getAllEmployees { id } }'), timeout=0.2)
+
+    asyncio.run(run())
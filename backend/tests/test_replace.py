@@ -0,0 +1,94 @@
+import io
+
+import pandas as pd
+
+from app.models import Employee, InsuranceFile
+from app.services.ingest import diff_rows
+from app.services.insurance_analytics import InsuranceService
+
+HEADER = ['Policy', 'Plan', 'Subscriber Name', 'Coverage Dates', 'Status', 'Charge Amount', 'Coverage Type']
+PLAN = 'EI 2019 CH+ PS1 1968A MOD-BUYUP100-3000'
+
+
+def _row(name, amount, dates='11/01/2024-11/30/2024', status='A'):
+    return ['0924216', PLAN, name, dates, status, amount, 'EE']
+
+
+def _invoice(rows) -> io.BytesIO:
+    return io.BytesIO(pd.DataFrame([HEADER] + rows).to_csv(header=False, index=False).encode())
+
+
+def _stored_rows(db, plan_name):
+    rows = (
+        db.query(Employee.subscriber_name, Employee.coverage_dates, Employee.status, Employee.charge_amount)
+        .join(InsuranceFile)
+        .filter(InsuranceFile.plan_name == plan_name)
+        .all()
+    )
+    return sorted(tuple(row) for row in rows)
+
+
+def _frame(rows, ids=None):
+    frame = pd.DataFrame(rows, columns=['subscriber_name', 'plan', 'coverage_dates',
+                                       'coverage_type', 'status', 'charge_amount'])
+    if ids is not None:
+        frame.insert(0, 'id', ids)
+    return frame
+
+
+def test_diff_rows_pairs_duplicates_and_keys():
+    stored = _frame([
+        ['DOE, JANE', 'UHC-3000', '11/01/2024', 'EE', 'A', 10.0],
+        ['DOE, JANE', 'UHC-3000', '11/01/2024', 'EE', 'A', 10.0],
+        ['ROE, RICH', 'UHC-3000', '11/01/2024', 'EE', 'A', 20.0],
+        ['POE, EDGAR', 'UHC-3000', '11/01/2024', 'EE', 'A', 30.0],
+    ], ids=[11, 12, 13, 14])
+    new = _frame([
+        ['DOE, JANE', 'UHC-3000', '11/01/2024', 'EE', 'A', 10.0],
+        ['ROE, RICH', 'UHC-3000', '11/01/2024', 'EE', 'T', 25.0],
+        ['LOE, ANN', 'UHC-3000', '11/01/2024', 'EE', 'A', 40.0],
+    ])
+
+    diff = diff_rows(stored, new)
+
+    assert diff['unchanged'] == 1
+    # One of the two identical stored rows is left over; the first pairs up
+    assert diff['deleted_ids'] == [12, 14]
+    assert diff['updates'][['id', 'status', 'charge_amount']].values.tolist() == [[13, 'T', 25.0]]
+    assert diff['inserts']['subscriber_name'].tolist() == ['LOE, ANN']
+
+
+def test_replace_applies_only_the_differences(db):
+    service = InsuranceService(db)
+    original = [_row('10001 - DOE, JANE', '10.00'), _row('10002 - ROE, RICH', '20.00'), _row('10003 - POE, EDGAR', '30.00')]
+    corrected = [_row('10001 - DOE, JANE', '10.00'), _row('10002 - ROE, RICH', '25.00', status='T'), _row('10004 - LOE, ANN', '40.00')]
+    assert service.process_file_buffer(_invoice(original), 'UHC-3000-NOV-2024')['success']
+
+    result = service.process_file_buffer(_invoice(corrected), 'UHC-3000-NOV-2024', replace=True)
+
+    assert result['success'], result
+    assert (result['rowsInserted'], result['rowsUpdated'], result['rowsDeleted']) == (1, 1, 1)
+    replaced = _stored_rows(db, 'UHC-3000-NOV-2024')
+
+    # The same rows as a fresh load of the corrected invoice
+    assert service.process_file_buffer(_invoice(corrected), 'UHC-3000-DEC-2024')['success']
+    assert replaced == _stored_rows(db, 'UHC-3000-DEC-2024')
+
+
+def test_identical_bytes_are_a_no_op_only_for_the_same_plan(db):
+    service = InsuranceService(db)
+    rows = [_row('10001 - DOE, JANE', '10.00'), _row('10002 - ROE, RICH', '20.00')]
+    assert service.process_file_buffer(_invoice(rows), 'UHC-3000-OCT-2024')['success']
+
+    same_plan = service.process_file_buffer(_invoice(rows), 'UHC-3000-OCT-2024', replace=True)
+    assert same_plan['success'] and same_plan['rowsInserted'] == 0
+    assert 'nothing to load' in same_plan['message']
+
+    refused = service.process_file_buffer(_invoice(rows), 'UHC-3000-OCT-2024')
+    assert not refused['success'] and 'already exists' in refused['error']
+
+    # Byte-identical invoice for another month: stored, with a warning
+    other_plan = service.process_file_buffer(_invoice(rows), 'UHC-3000-NOV-2024')
+    assert other_plan['success'] and other_plan['rowsInserted'] == 2
+    assert "'UHC-3000-OCT-2024'" in other_plan['warnings'][0]
+    assert len(_stored_rows(db, 'UHC-3000-NOV-2024')) == 2
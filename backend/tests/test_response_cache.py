@@ -0,0 +1,51 @@
+import json
+
+from app.models import UploadJob
+from app.response_cache import _is_cacheable
+
+JOB_QUERY = 'query($jobId: Int!) { getUploadJob(jobId: $jobId) { status message } }'
+FILES_QUERY = '{ getUploadedFiles { planName } }'
+
+
+def _get(client, query, variables=None, etag=None):
+    params = {'query': query}
+    if variables:
+        params['variables'] = json.dumps(variables)
+    headers = {'accept': 'application/json'}
+    if etag:
+        headers['if-none-match'] = etag
+    return client.get('/graphql', params=params, headers=headers)
+
+
+def test_only_dataset_queries_are_cacheable():
+    assert _is_cacheable(FILES_QUERY, None)
+    assert _is_cacheable('query Q { ...Files } fragment Files on Query { getUploadedFiles { planName } }', 'Q')
+    assert not _is_cacheable(JOB_QUERY, None)
+    assert not _is_cacheable('{ getUploadedFiles { planName } ... on Query { getUploadJob(jobId: 1) { status } } }', None)
+    assert not _is_cacheable('query { ...Missing }', None)
+    assert not _is_cacheable('mutation { deleteFile(planName: "X") { success } }', None)
+
+
+def test_dataset_query_is_revalidated(client):
+    first = _get(client, FILES_QUERY)
+    assert first.status_code == 200 and first.headers.get('etag')
+
+    assert _get(client, FILES_QUERY, etag=first.headers['etag']).status_code == 304
+
+
+def test_polling_a_job_sees_its_status_change(client, db):
+    job = UploadJob(plan_name='UHC-3000-NOV-2024', file_name='UHC-3000-NOV-2024.xlsx', status='queued')
+    db.add(job)
+    db.commit()
+
+    queued = _get(client, JOB_QUERY, {'jobId': job.id})
+    assert queued.json()['data']['getUploadJob']['status'] == 'queued'
+    assert 'etag' not in queued.headers
+
+    # The worker finishes the job; no dataset change is recorded for that
+    job.status, job.message = 'failed', 'No data found in file'
+    db.commit()
+
+    polled = _get(client, JOB_QUERY, {'jobId': job.id}, etag=queued.headers.get('etag'))
+    assert polled.status_code == 200
+    assert polled.json()['data']['getUploadJob'] == {'status': 'failed', 'message': 'No data found in file'}
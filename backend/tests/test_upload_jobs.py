@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from app.database import SessionLocal
+from app.models import UploadJob
+from app.services import upload_jobs
+from app.services.insurance_analytics import InsuranceService
+from app.services.upload_jobs import UploadJobService
+
+
+def test_heartbeat_keeps_a_silent_load_claimed(db, monkeypatch):
+    monkeypatch.setattr(upload_jobs, 'JOB_HEARTBEAT_TIMEOUT', timedelta(seconds=0.5))
+    monkeypatch.setattr(upload_jobs, 'JOB_HEARTBEAT_INTERVAL', timedelta(seconds=0.05))
+    db.add(UploadJob(plan_name='UHC-2000-NOV-2024', file_name='UHC-2000-NOV-2024.xlsx', content=b'invoice'))
+    db.commit()
+    job_id = UploadJobService(db).claim_next()
+    reclaimed = []
+
+    def slow_load(self, file_buffer, plan_name, progress=None, replace=False):
+        # A long parse or COPY: no progress is reported meanwhile
+        time.sleep(1)
+        other_worker = SessionLocal()
+        try:
+            reclaimed.append(UploadJobService(other_worker).reclaim_stale_jobs())
+        finally:
+            other_worker.close()
+        return {'success': True, 'message': 'loaded', 'rowsInserted': 0}
+
+    monkeypatch.setattr(InsuranceService, 'process_file_buffer', slow_load)
+    UploadJobService(db).run(job_id)
+
+    db.expire_all()
+    assert reclaimed == [0]
+    job = db.get(UploadJob, job_id)
+    assert (job.status, job.attempts) == ('succeeded', 1)
@@ -0,0 +1,64 @@
+import io
+import os
+
+import pytest
+
+from app.models import UploadJob
+from app.services.ingest import plan_name_error
+from app.services.upload_jobs import UPLOAD_DIR
+
+
+def _stored_uploads():
+    return os.listdir(UPLOAD_DIR) if os.path.isdir(UPLOAD_DIR) else []
+
+
+@pytest.mark.parametrize('plan_name, file_name', [
+    ('UHC-2000-NOV-2024', 'UHC-2000-NOV-2024.xlsx'),
+    ('UHC-2000-NOV-2024', 'UHC-2000-NOV-2024 copy.xlsx'),
+    ('UHG-OCT-2024', 'invoice.csv'),
+    ('UHG-OCT-2024', None),
+])
+def test_plan_name_accepted(plan_name, file_name):
+    assert plan_name_error(plan_name, file_name) is None
+
+
+@pytest.mark.parametrize('plan_name, file_name', [
+    ('', 'UHC-2000-NOV-2024.xlsx'),
+    ('invoice', 'invoice.xlsx'),
+    ('UHC-2000-NOV-2024 copy', 'UHC-2000-NOV-2024 copy.xlsx'),
+    ('uhc-2000-nov-2024', 'UHC-2000-NOV-2024.xlsx'),
+    ('UHC-2000-OCT-2024', 'UHC-2000-NOV-2024.xlsx'),
+])
+def test_plan_name_refused(plan_name, file_name):
+    assert plan_name_error(plan_name, file_name)
+
+
+def test_multipart_plan_name_is_inferred_from_the_file_name(client, db):
+    response = client.post(
+        '/upload', files={'file': ('UHC-2000-NOV-2024 (1).xlsx', io.BytesIO(b'invoice'))}
+    )
+
+    assert response.json()['success']
+    assert db.get(UploadJob, response.json()['jobId']).plan_name == 'UHC-2000-NOV-2024'
+
+
+@pytest.mark.parametrize('path, upload', [
+    ('/upload', lambda client: client.post(
+        '/upload', data={'planName': 'UHC-2000-OCT-2024'},
+        files={'file': ('UHC-2000-NOV-2024.xlsx', io.BytesIO(b'invoice'))}
+    )),
+    ('/graphql', lambda client: client.post('/graphql', json={
+        'query': 'mutation($f: FileInput!) { uploadFile(fileInput: $f) { success error } }',
+        'variables': {'f': {'name': 'UHC-2000-NOV-2024.xlsx', 'planName': 'UHC-2000-OCT-2024',
+                            'content': 'data:x;base64,aW52b2ljZQ=='}},
+    })),
+])
+def test_mismatched_plan_name_is_refused_before_storing(client, db, path, upload):
+    before = _stored_uploads()
+
+    body = upload(client).json()
+    result = body['data']['uploadFile'] if path == '/graphql' else body
+
+    assert not result['success'] and 'does not match' in result['error']
+    assert _stored_uploads() == before
+    assert db.query(UploadJob).count() == 0
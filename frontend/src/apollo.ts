@@ -1,6 +1,8 @@
 import { ApolloClient, InMemoryCache } from '@apollo/client';
 
+export const API_BASE_URL = 'http://localhost:8000';
+
 export const client = new ApolloClient({
-  uri: 'http://localhost:8000/graphql',
+  uri: `${API_BASE_URL}/graphql`,
   cache: new InMemoryCache()
 });
\ No newline at end of file
@@ -22,7 +22,7 @@ import {
 } from "@mui/material";
 import { useQuery, useMutation } from "@apollo/client";
 import { GET_UPLOADED_FILES, GET_INVOICE_DATA } from "../graphql/queries";
-import { DELETE_FILE } from "../graphql/mutations";
+import { DELETE_FILES } from "../graphql/mutations";
 import FileUpload from "./FileUpload";
 import CircularProgress from "@mui/material/CircularProgress";
 import { Delete as DeleteIcon } from "@mui/icons-material";
@@ -41,9 +41,9 @@ const Datasets = () => {
     fetchPolicy: "network-only",
   });
 
-  const [deleteFile, { loading: deleteLoading }] = useMutation(DELETE_FILE, {
+  const [deleteFiles, { loading: deleteLoading }] = useMutation(DELETE_FILES, {
     onCompleted: (data) => {
-      if (data.deleteFile.success) {
+      if (data.deleteFiles.success) {
         setSnackbarMessage(
           selectedFiles.length > 1
             ? "Files deleted successfully"
@@ -55,7 +55,7 @@ const Datasets = () => {
         setSelectAll(false);
         refetch();
       } else {
-        setSnackbarMessage(data.deleteFile.message || "Failed to delete files");
+        setSnackbarMessage(data.deleteFiles.error || "Failed to delete files");
         setSnackbarSeverity("error");
         setSnackbarOpen(true);
       }
@@ -91,11 +91,10 @@ const Datasets = () => {
 
   const handleConfirmDelete = async () => {
     try {
-      for (const planName of selectedFiles) {
-        await deleteFile({
-          variables: { planName },
-        });
-      }
+      // One mutation and one transaction for the whole selection
+      await deleteFiles({
+        variables: { planNames: selectedFiles },
+      });
       setDeleteModalOpen(false);
     } catch (err) {
       console.error("Delete error:", err);
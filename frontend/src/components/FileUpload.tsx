@@ -1,6 +1,8 @@
 import React, { useState } from "react";
 import {
   Button,
+  Checkbox,
+  FormControlLabel,
   Tooltip,
   Box,
   Paper,
@@ -8,8 +10,9 @@ import {
   Typography,
   IconButton,
 } from "@mui/material";
-import { useMutation } from "@apollo/client";
-import { UPLOAD_FILE } from "../graphql/mutations";
+import { useApolloClient, useMutation } from "@apollo/client";
+import { API_BASE_URL } from "../apollo";
+import { GET_UPLOAD_JOB, UPLOAD_FILE } from "../graphql/mutations";
 import { GET_INVOICE_DATA, GET_UPLOADED_FILES } from "../graphql/queries";
 import {
   Upload as UploadIcon,
@@ -28,14 +31,75 @@ interface FileUploadProps {
   onUploadSuccess: () => void;
 }
 
+// Files above this size go to the multipart /upload route instead of being
+// base64 encoded into the uploadFile mutation
+const MULTIPART_UPLOAD_THRESHOLD = 2 * 1024 * 1024;
+
+interface UploadResult {
+  success: boolean;
+  error?: string | null;
+  jobId?: number | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Same rule as infer_plan_name on the server: "UHC-2000-NOV-2024 copy.xlsx" is UHC-2000-NOV-2024
+const PLAN_NAME_PATTERN = /^(UHG-[A-Z]{3}-\d{4}|[A-Z]+-\d+-[A-Z]{3}-\d{4})/i;
+
+const planNameOf = (fileName: string): string => {
+  const match = fileName.trim().match(PLAN_NAME_PATTERN);
+  return match ? match[1].toUpperCase() : fileName.split(".")[0].trim();
+};
+
+const uploadMultipart = async (
+  file: File,
+  planName: string,
+  replace: boolean
+): Promise<UploadResult> => {
+  const body = new FormData();
+  body.append("file", file);
+  body.append("planName", planName);
+  body.append("replace", String(replace));
+  const response = await fetch(`${API_BASE_URL}/upload`, {
+    method: "POST",
+    body,
+  });
+  if (!response.ok) {
+    return { success: false, error: `Upload failed (${response.status})` };
+  }
+  return response.json();
+};
+
 const FileUpload: React.FC<FileUploadProps> = ({ onUploadSuccess }) => {
   const [uploadStatuses, setUploadStatuses] = useState<UploadStatus[]>([]);
-  const [uploadFile] = useMutation(UPLOAD_FILE, {
-    refetchQueries: [
-      { query: GET_UPLOADED_FILES },
-      { query: GET_INVOICE_DATA },
-    ],
-  });
+  // Apply corrected invoices to already uploaded plans instead of refusing them
+  const [replaceExisting, setReplaceExisting] = useState(false);
+  const client = useApolloClient();
+  const [uploadFile] = useMutation(UPLOAD_FILE);
+
+  // Uploads are processed by the background worker; wait for the job to finish
+  const waitForJob = async (result: UploadResult): Promise<UploadResult> => {
+    if (!result.success || !result.jobId) return result;
+    for (;;) {
+      const { data } = await client.query({
+        query: GET_UPLOAD_JOB,
+        variables: { jobId: result.jobId },
+        fetchPolicy: "network-only",
+      });
+      const job = data?.getUploadJob;
+      if (!job) return { success: false, error: "Upload job not found" };
+      if (job.status === "succeeded") return { success: true };
+      if (job.status === "failed") {
+        return { success: false, error: job.error || "Upload failed" };
+      }
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  };
+
+  const refreshData = () =>
+    client.refetchQueries({
+      include: [GET_UPLOADED_FILES, GET_INVOICE_DATA],
+    });
 
   const removeStatus = (index: number) => {
     setUploadStatuses((prev) => prev.filter((_, i) => i !== index));
@@ -57,6 +121,30 @@ const FileUpload: React.FC<FileUploadProps> = ({ onUploadSuccess }) => {
     if (files.length === 0) return;
     event.target.value = "";
     for (const file of files) {
+      const planName = planNameOf(file.name);
+      if (file.size > MULTIPART_UPLOAD_THRESHOLD) {
+        try {
+          const result = await waitForJob(
+            await uploadMultipart(file, planName, replaceExisting)
+          );
+          addStatus({
+            fileName: file.name,
+            status: result.success ? "success" : "error",
+            message: result.success
+              ? "File uploaded successfully"
+              : result.error || "Upload failed",
+          });
+          await refreshData();
+          onUploadSuccess();
+        } catch (error) {
+          addStatus({
+            fileName: file.name,
+            status: "error",
+            message: error instanceof Error ? error.message : "Upload failed",
+          });
+        }
+        continue;
+      }
       try {
         const reader = new FileReader();
         reader.onload = async (e) => {
@@ -70,17 +158,22 @@ const FileUpload: React.FC<FileUploadProps> = ({ onUploadSuccess }) => {
             return;
           }
           try {
-            const planName = file.name.split(".")[0].trim();
             const response = await uploadFile({
               variables: {
                 fileInput: {
                   name: file.name,
                   content: content.toString().split(",")[1],
                   planName,
+                  replace: replaceExisting,
                 },
               },
             });
-            if (response.data?.uploadFile?.success) {
+            const result = await waitForJob({
+              success: Boolean(response.data?.uploadFile?.success),
+              error: response.data?.uploadFile?.error,
+              jobId: response.data?.uploadFile?.jobId,
+            });
+            if (result.success) {
               addStatus({
                 fileName: file.name,
                 status: "success",
@@ -90,9 +183,10 @@ const FileUpload: React.FC<FileUploadProps> = ({ onUploadSuccess }) => {
               addStatus({
                 fileName: file.name,
                 status: "error",
-                message: response.data?.uploadFile?.error || "Upload failed",
+                message: result.error || "Upload failed",
               });
             }
+            await refreshData();
             onUploadSuccess();
           } catch (error) {
             addStatus({
@@ -138,6 +232,19 @@ const FileUpload: React.FC<FileUploadProps> = ({ onUploadSuccess }) => {
           />
         </Button>
       </Tooltip>
+      <Tooltip title="Apply only the changed rows of corrected invoices to files already uploaded">
+        <FormControlLabel
+          sx={{ ml: 1 }}
+          control={
+            <Checkbox
+              size="small"
+              checked={replaceExisting}
+              onChange={(e) => setReplaceExisting(e.target.checked)}
+            />
+          }
+          label="Replace existing"
+        />
+      </Tooltip>
       <Box
         sx={{
           position: "fixed",
@@ -34,87 +34,59 @@ import ClearIcon from "@mui/icons-material/Clear";
 import InfoOutlinedIcon from "@mui/icons-material/InfoOutlined";
 import CircleIcon from "@mui/icons-material/Circle";
 
-// Define the GraphQL query using camelCase names
-const GET_ALL_EMPLOYEES = gql`
-  query GetAllEmployees {
-    getAllEmployees {
-      id
-      subscriberId
-      subscriberName
-      plan
+// Employees grouped into people on the server (identity resolution), with totals
+const GET_EMPLOYEE_GROUPS = gql`
+  query GetEmployeeGroups {
+    getEmployeeGroups {
+      personId
+      employeeName
+      firstName
+      lastName
       coverageType
-      status
-      coverageDates
-      chargeAmount
-      month
-      year
-      insuranceFileId
+      planCategory
+      lifeTotal
+      addTotal
+      dentalTotal
+      visionTotal
+      medicalTotal
+      grandTotal
+      terminated
+      latestMonth {
+        month
+        year
+        lifeTotal
+        addTotal
+        dentalTotal
+        visionTotal
+        medicalTotal
+        monthTotal
+      }
+      records {
+        id
+        subscriberId
+        subscriberName
+        plan
+        coverageType
+        status
+        coverageDates
+        chargeAmount
+        month
+        year
+        insuranceFileId
+      }
     }
   }
 `;
 
-// ---------- Utility Functions for Fuzzy Matching & Grouping ----------
-
-// Compute the Levenshtein Distance between two strings.
-function getLevenshteinDistance(a: string, b: string): number {
-  const m = a.length;
-  const n = b.length;
-  const dp: number[][] = Array.from({ length: m + 1 }, () =>
-    new Array(n + 1).fill(0)
-  );
-  for (let i = 0; i <= m; i++) dp[i][0] = i;
-  for (let j = 0; j <= n; j++) dp[0][j] = j;
-  for (let i = 1; i <= m; i++) {
-    for (let j = 1; j <= n; j++) {
-      const cost = a[i - 1].toLowerCase() === b[j - 1].toLowerCase() ? 0 : 1;
-      dp[i][j] = Math.min(
-        dp[i - 1][j] + 1,
-        dp[i][j - 1] + 1,
-        dp[i - 1][j - 1] + cost
-      );
+// Dataset version check for polling; no rows are transferred
+const GET_EMPLOYEE_CHANGES = gql`
+  query GetEmployeeChanges($sinceVersion: Int!) {
+    getEmployeeChanges(sinceVersion: $sinceVersion) {
+      version
+      changed
     }
   }
-  return dp[m][n];
-}
-
-// Fuzzy-match first names by comparing their Levenshtein distance ratio.
-function fuzzyMatchFirstNames(a: string, b: string, threshold = 0.66): boolean {
-  const dist = getLevenshteinDistance(a, b);
-  const maxLen = Math.max(a.length, b.length);
-  if (maxLen === 0) return true;
-  const ratio = dist / maxLen;
-  return ratio <= threshold;
-}
-
-// Parse a subscriber name and extract first and last names.
-// It handles formats like "12345 - John Doe", "Doe, John", or "John Doe".
-function parseName(raw: string): { firstName: string; lastName: string } {
-  let namePart = raw;
-  // If an ID is included (e.g. "12345 - John Doe"), use the part after the hyphen.
-  if (raw.includes(" - ")) {
-    const parts = raw.split(" - ");
-    if (parts.length >= 2) {
-      namePart = parts[1].trim();
-    }
-  }
-  // If the name is in "Last, First" format
-  if (namePart.includes(",")) {
-    const parts = namePart.split(",");
-    return {
-      lastName: parts[0].trim().toUpperCase(),
-      firstName: parts[1].trim().toUpperCase(),
-    };
-  }
-  // Otherwise assume "First Last"
-  const parts = namePart.split(" ");
-  if (parts.length >= 2) {
-    return {
-      firstName: parts[0].trim().toUpperCase(),
-      lastName: parts.slice(1).join(" ").trim().toUpperCase(),
-    };
-  }
-  return { firstName: namePart.toUpperCase(), lastName: "" };
-}
+`;
 
 // ---------- Type Definitions ----------
 
@@ -134,6 +106,8 @@ interface Employee {
 
 interface GroupedEmployee {
   id?: number; // Added ID for tracking status overrides
+  personId: number;
+  terminated: boolean;
   employeeName: string;
   firstName: string;
   lastName: string;
@@ -158,205 +132,10 @@ interface GroupedEmployee {
   };
 }
 
-// Group employees whose names match (by same last name and fuzzy similar first names)
-function fuzzyMatchEmployees(employees: Employee[]): GroupedEmployee[] {
-  const groups: GroupedEmployee[] = [];
-  employees.forEach((emp) => {
-    const { firstName, lastName } = parseName(emp.subscriberName);
-    // Try to find an existing group with the same last name and a matching first name
-    const existingGroup = groups.find(
-      (g) =>
-        g.lastName === lastName && fuzzyMatchFirstNames(g.firstName, firstName)
-    );
-    if (existingGroup) {
-      existingGroup.records.push(emp);
-    } else {
-      groups.push({
-        employeeName: `${firstName} ${lastName}`,
-        firstName,
-        lastName,
-        coverageType: emp.coverageType,
-        planCategory: "",
-        lifeTotal: 0,
-        addTotal: 0,
-        dentalTotal: 0,
-        visionTotal: 0,
-        medicalTotal: 0,
-        grandTotal: 0,
-        records: [emp],
-      });
-    }
-  });
-  return groups;
-}
-
-// Determine the latest month and year for each employee group
-function getLatestMonthData(group: GroupedEmployee): {
-  month: string;
-  year: number;
-  lifeTotal: number;
-  addTotal: number;
-  dentalTotal: number;
-  visionTotal: number;
-  medicalTotal: number;
-  monthTotal: number;
-} {
-  // Create a mapping of fiscal months to numbers for comparison
-  const fiscalMonthOrder = {
-    OCT: 1,
-    NOV: 2,
-    DEC: 3,
-    JAN: 4,
-    FEB: 5,
-    MAR: 6,
-    APR: 7,
-    MAY: 8,
-    JUN: 9,
-    JUL: 10,
-    AUG: 11,
-    SEP: 12,
-  };
-
-  // Group records by month and year
-  const monthYearGroups: Record<string, any> = {};
-
-  group.records.forEach((rec) => {
-    const key = `${rec.month}-${rec.year}`;
-    if (!monthYearGroups[key]) {
-      monthYearGroups[key] = {
-        month: rec.month,
-        year: rec.year,
-        monthOrder: fiscalMonthOrder[rec.month.toUpperCase()] || 0,
-        dental: 0,
-        vision: 0,
-        life: 0,
-        add: 0,
-        medical: 0,
-      };
-    }
-
-    // Add amount to appropriate category based on plan
-    const plan = rec.plan.toUpperCase();
-    if (plan.includes("DENTAL")) {
-      monthYearGroups[key].dental += rec.chargeAmount;
-    } else if (plan.includes("VISION")) {
-      monthYearGroups[key].vision += rec.chargeAmount;
-    } else if (plan.includes("LIFE")) {
-      monthYearGroups[key].life += rec.chargeAmount;
-    } else if (plan.includes("ADD")) {
-      monthYearGroups[key].add += rec.chargeAmount;
-    } else if (
-      plan.includes("2000") ||
-      plan.includes("3000") ||
-      plan.includes("UHC")
-    ) {
-      monthYearGroups[key].medical += rec.chargeAmount;
-    } else {
-      monthYearGroups[key].medical += rec.chargeAmount;
-    }
-  });
-
-  // Find the latest month-year combination
-  const monthYears = Object.values(monthYearGroups);
-
-  if (monthYears.length === 0) {
-    return {
-      month: "",
-      year: 0,
-      lifeTotal: 0,
-      addTotal: 0,
-      dentalTotal: 0,
-      visionTotal: 0,
-      medicalTotal: 0,
-      monthTotal: 0,
-    };
-  }
-
-  // Sort by year (descending) and then by month order (descending)
-  monthYears.sort((a, b) => {
-    if (a.year !== b.year) {
-      return b.year - a.year;
-    }
-    return b.monthOrder - a.monthOrder;
-  });
-
-  // Get the latest month data
-  const latest = monthYears[0];
-
-  return {
-    month: latest.month,
-    year: latest.year,
-    lifeTotal: latest.life,
-    addTotal: latest.add,
-    dentalTotal: latest.dental,
-    visionTotal: latest.vision,
-    medicalTotal: latest.medical,
-    monthTotal:
-      latest.life + latest.add + latest.dental + latest.vision + latest.medical,
-  };
-}
-
-// Aggregate coverage amounts and assign plan category.
-// If any record has "UHC-2000" then the category is "2000";
-// else if any record has "UHC-3000" then "3000";
-// otherwise, the category is "General".
-function groupCoverageAmounts(groups: GroupedEmployee[]): GroupedEmployee[] {
-  return groups.map((group) => {
-    const plans = group.records.map((r) => r.plan.toUpperCase());
-    let planCategory = "General";
-    if (plans.includes("UHC-2000")) {
-      planCategory = "2000";
-    } else if (plans.includes("UHC-3000")) {
-      planCategory = "3000";
-    }
-    group.planCategory = planCategory;
-    let lifeTotal = 0,
-      addTotal = 0,
-      dentalTotal = 0,
-      visionTotal = 0,
-      medicalTotal = 0;
-    group.records.forEach((r) => {
-      const plan = r.plan.toUpperCase();
-      const amt = r.chargeAmount || 0;
-      if (plan.includes("LIFE")) {
-        lifeTotal += amt;
-      } else if (plan.includes("ADD")) {
-        addTotal += amt;
-      } else if (plan.includes("DENTAL")) {
-        dentalTotal += amt;
-      } else if (plan.includes("VISION")) {
-        visionTotal += amt;
-      } else if (
-        plan.includes("2000") ||
-        plan.includes("3000") ||
-        plan.includes("UHC")
-      ) {
-        medicalTotal += amt;
-      } else {
-        medicalTotal += amt;
-      }
-    });
-    group.lifeTotal = lifeTotal;
-    group.addTotal = addTotal;
-    group.dentalTotal = dentalTotal;
-    group.visionTotal = visionTotal;
-    group.medicalTotal = medicalTotal;
-    group.grandTotal =
-      lifeTotal + addTotal + dentalTotal + visionTotal + medicalTotal;
-    // Use the coverageType from the first record
-    group.coverageType = group.records[0]?.coverageType || "EMPLOYEE";
-
-    // Calculate latest month data
-    group.latestMonth = getLatestMonthData(group);
-
-    return group;
-  });
-}
-
 // Determine whether a group is considered terminated.
-// For instance, if any record's status includes "TRM", consider that group inactive.
+// The server flags a group as terminated if any record's status includes "TRM".
 function isTerminated(group: GroupedEmployee): boolean {
-  return group.records.some((r) => r.status.toUpperCase().includes("TRM"));
+  return group.terminated;
 }
 
 // New function to manually control active status
@@ -1224,23 +1003,28 @@ const Master: React.FC = () => {
   }, [searchText]);
 
   // Query all employees from the server (using the correct camelCase fields)
-  const { data, loading, error, refetch } = useQuery(GET_ALL_EMPLOYEES, {
+  const { data, loading, error, refetch } = useQuery(GET_EMPLOYEE_GROUPS, {
     fetchPolicy: "network-only", // This ensures we don't use cached data
   });
 
-  // Set up an interval to periodically refresh the data
-  useEffect(() => {
-    // Initial data fetch when component mounts
-    refetch();
+  // Poll the dataset version every 10 seconds and only refetch the groups
+  // when files were loaded or deleted since the version we last saw
+  const [datasetVersion, setDatasetVersion] = useState<number | null>(null);
+  const { data: changesData } = useQuery(GET_EMPLOYEE_CHANGES, {
+    variables: { sinceVersion: datasetVersion ?? 0 },
+    fetchPolicy: "network-only",
+    pollInterval: 10000,
+  });
 
-    // Set up periodic refresh
-    const intervalId = setInterval(() => {
+  useEffect(() => {
+    const changes = changesData?.getEmployeeChanges;
+    if (!changes || changes.version === datasetVersion) return;
+    // The first response only records the version; the groups query is already loading
+    if (datasetVersion !== null && changes.changed) {
       refetch();
-    }, 10000); // Refetch every 10 seconds
-
-    // Clean up interval on component unmount
-    return () => clearInterval(intervalId);
-  }, [refetch]);
+    }
+    setDatasetVersion(changes.version);
+  }, [changesData, datasetVersion, refetch]);
 
   // State for grouped (fuzzy-matched) and aggregated employee data
   const [groupedEmployees, setGroupedEmployees] = useState<GroupedEmployee[]>(
@@ -1265,15 +1049,12 @@ const Master: React.FC = () => {
   const [availableTypes, setAvailableTypes] = useState<string[]>([]);
 
   useEffect(() => {
-    if (data && data.getAllEmployees) {
-      // Group employees using fuzzy matching and then aggregate coverage amounts.
-      const groups = fuzzyMatchEmployees(data.getAllEmployees);
-      const aggregated = groupCoverageAmounts(groups);
-
-      // Assign IDs to each group for tracking status overrides
-      aggregated.forEach((group, index) => {
-        group.id = index; // Add an ID to each group
-      });
+    if (data && data.getEmployeeGroups) {
+      // Groups and totals come from the server; the person id is stable
+      // across refreshes, so it keys the status overrides.
+      const aggregated: GroupedEmployee[] = data.getEmployeeGroups.map(
+        (group: GroupedEmployee) => ({ ...group, id: group.personId })
+      );
 
       setGroupedEmployees(aggregated);
 
@@ -6,6 +6,7 @@ export const UPLOAD_FILE = gql`
       success
       message
       error
+      jobId
     }
   }
 `;
@@ -18,4 +19,29 @@ export const DELETE_FILE = gql`
       error
     }
   }
-`;
\ No newline at end of file
+`;
+
+export const DELETE_FILES = gql`
+  mutation DeleteFiles($planNames: [String!]!) {
+    deleteFiles(planNames: $planNames) {
+      success
+      message
+      error
+      rowsDeleted
+    }
+  }
+`;
+
+export const GET_UPLOAD_JOB = gql`
+  query GetUploadJob($jobId: Int!) {
+    getUploadJob(jobId: $jobId) {
+      id
+      status
+      rowsParsed
+      rowsInserted
+      errorCount
+      message
+      error
+    }
+  }
+`;
@@ -1,11 +1,25 @@
 import React from "react";
 import ReactDOM from "react-dom/client";
 import App from "./App";
-import { ApolloClient, InMemoryCache, ApolloProvider } from "@apollo/client";
+import { ApolloClient, InMemoryCache, ApolloProvider, HttpLink } from "@apollo/client";
+import { createPersistedQueryLink } from "@apollo/client/link/persisted-queries";
 import { ThemeProvider, createTheme, CssBaseline } from "@mui/material";
 
+// Automatic persisted queries: send the query's SHA-256 and only fall back to
+// the full text when the server has not seen it yet. Hashed queries go out as
+// GET so the browser caches them and revalidates with If-None-Match (304s)
+const sha256 = async (query: string) => {
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(query));
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+};
+
 const client = new ApolloClient({
-  uri: "http://localhost:8000/graphql",
+  link: createPersistedQueryLink({ sha256, useGETForHashedQueries: true }).concat(
+    // Apollo's default "accept: */*" makes a GET without query text fetch GraphiQL
+    new HttpLink({ uri: "http://localhost:8000/graphql", headers: { accept: "application/json" } })
+  ),
   cache: new InMemoryCache(),
 });
 